@@ -5,7 +5,12 @@ from flask import Flask, session, request, redirect, url_for, jsonify
 from config import Config
 from auth import bp as auth_bp, limiter as auth_limiter
 import static_auth
-from discovery import find_orphaned_pages, get_page_metadata
+import static_files
+import models
+import email_service
+import outbox
+import discovery
+from invite import invite
 
 # Set up logging
 logging.basicConfig(
@@ -14,28 +19,73 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create Flask app
-app = Flask(__name__, template_folder='templates')
 
-# Load configuration
-app.config.from_object(Config)
-app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=Config.SESSION_TIMEOUT_DAYS)
+def create_app(config=None) -> Flask:
+    """
+    Create and configure the Flask app
+
+    Args:
+        config: Optional object whose upper-case attributes override Config
+            in this app's ``app.config`` only (Flask settings such as
+            SECRET_KEY; the rest of the backend reads Config directly)
+
+    Returns:
+        The configured Flask app
+    """
+    # A typo would otherwise silently fall back to X-Accel-Redirect
+    if Config.STATIC_OFFLOAD not in ('', 'x-accel', 'x-sendfile'):
+        raise ValueError(
+            f"STATIC_OFFLOAD must be '', 'x-accel' or 'x-sendfile', got {Config.STATIC_OFFLOAD!r}"
+        )
+
+    # No Flask static route: /static/ belongs to the Quartz build in public/
+    app = Flask(__name__, template_folder='templates', static_folder=None)
+
+    # Load configuration
+    app.config.from_object(Config)
+    if config is not None:
+        app.config.from_object(config)
+    app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=app.config['SESSION_TIMEOUT_DAYS'])
+
+    # Initialize (and migrate) the schema once at startup, then drop the
+    # connections so forked workers never share a SQLite handle
+    models.get_db()
+    models.close_all()
+
+    # Index public/ up front so the first requests do not pay for the walk
+    static_files.manifest.build()
+
+    # Return pooled database connections at the end of each request
+    models.init_app(app)
 
-# Initialize rate limiter
-auth_limiter.init_app(app)
+    # Initialize rate limiter
+    auth_limiter.init_app(app)
 
-# Register authentication blueprint
-app.register_blueprint(auth_bp)
+    # Register authentication blueprint
+    app.register_blueprint(auth_bp)
+
+    app.before_request(check_authentication)
+    app.register_error_handler(404, not_found)
+    app.register_error_handler(500, server_error)
+
+    # Catch-all route for serving static files
+    app.add_url_rule('/', 'serve_static', serve_static, defaults={'path': 'index.html'})
+    app.add_url_rule('/<path:path>', 'serve_static', serve_static)
+
+    app.add_url_rule('/api/orphans', 'get_orphans', get_orphans, methods=['GET'])
+    app.add_url_rule('/api/invites', 'create_invites', create_invites, methods=['POST'])
+    app.add_url_rule('/api/stats', 'get_stats', get_stats, methods=['GET'])
+
+    return app
 
 
-@app.before_request
 def check_authentication():
     """
     Run before every request.
 
     - Allow auth routes without authentication
-    - Check session validity for other routes
-    - Update session last_accessed timestamp
+    - Check session validity for other routes (cached on g for the request)
+    - Record session access (written to the database in batches)
     """
     # Allow auth routes without authentication
     if request.path.startswith('/auth/'):
@@ -46,40 +96,34 @@ def check_authentication():
         logger.info(f"Unauthenticated access to {request.path}, redirecting to login")
         return redirect(url_for('auth.login'))
 
-    # Update session last_accessed timestamp
+    # Record session access; last_accessed is flushed in the background
     session_id = session.get('session_id')
     if session_id:
         try:
             from models import Session as SessionModel
-            SessionModel.update_last_accessed(session_id)
+            SessionModel.touch(session_id)
         except Exception as e:
             logger.error(f"Error updating session: {e}")
 
     return None
 
 
-# Catch-all route for serving static files
-@app.route('/', defaults={'path': 'index.html'})
-@app.route('/<path:path>')
 def serve_static(path):
     """Serve static files from public/ with authentication"""
     return static_auth.serve_protected_static(path)
 
 
-@app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors by returning index.html (for SPA routing)"""
     return static_auth.serve_protected_static('index.html')
 
 
-@app.errorhandler(500)
 def server_error(error):
     """Handle 500 errors"""
     logger.error(f"Server error: {error}")
     return "Internal server error", 500
 
 
-@app.route('/api/orphans', methods=['GET'])
 def get_orphans():
     """
     Get list of orphaned pages (pages with no backlinks)
@@ -88,15 +132,18 @@ def get_orphans():
         JSON response with list of orphaned pages and metadata
     """
     try:
-        # Check authentication
+        # Check authentication (already computed by check_authentication)
         if not static_auth.is_authenticated():
             return jsonify({'error': 'Unauthorized'}), 401
 
-        # Find orphaned pages
-        orphans = find_orphaned_pages()
-
-        # Get metadata for all pages
-        metadata = get_page_metadata()
+        if Config.DISCOVERY_WATCH:
+            # The watcher keeps the index current; no disk access here
+            discovery.watcher.start()
+        else:
+            # Only files changed since the last call are re-read
+            discovery.vault_index.refresh()
+        orphans = discovery.vault_index.orphans()
+        metadata = discovery.vault_index.metadata()
 
         # Build response with metadata
         orphan_details = []
@@ -126,12 +173,77 @@ def get_orphans():
         return jsonify({'error': 'Failed to retrieve orphaned pages'}), 500
 
 
+def create_invites():
+    """
+    Send magic link invites to many addresses (admins only)
+
+    Expects JSON {"emails": [...]}.
+
+    Returns:
+        JSON response with a per-recipient status
+    """
+    if not static_auth.is_authenticated():
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    if session.get('email', '').lower() not in Config.ADMIN_EMAILS:
+        return jsonify({'error': 'Forbidden'}), 403
+
+    payload = request.get_json(silent=True) or {}
+    emails = payload.get('emails')
+    if not isinstance(emails, list) or not all(isinstance(e, str) for e in emails):
+        return jsonify({'error': 'Expected a JSON list of emails'}), 400
+
+    try:
+        results = invite(emails)
+    except Exception as e:
+        logger.error(f"Error sending invites: {e}")
+        return jsonify({'error': 'Failed to send invites'}), 500
+
+    logger.info(f"{session.get('email')} invited {len(emails)} addresses")
+    return jsonify({
+        'results': results,
+        'sent': sum(1 for r in results if r['status'] == 'sent'),
+        'failed': sum(1 for r in results if r['status'] != 'sent'),
+    })
+
+
+def get_stats():
+    """
+    Get runtime cache statistics for tuning (admins only)
+
+    Returns:
+        JSON response with hit/miss counters of in-process caches
+    """
+    if not static_auth.is_authenticated():
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    if session.get('email', '').lower() not in Config.ADMIN_EMAILS:
+        return jsonify({'error': 'Forbidden'}), 403
+
+    return jsonify({
+        'session_cache': models.session_cache.stats(),
+        'last_accessed_buffer': models.last_accessed_buffer.stats(),
+        'revocations': models.revocations.stats(),
+        'static_manifest': static_files.manifest.stats(),
+        'static_file_cache': static_files.file_cache.stats(),
+        'discovery_index': discovery.vault_index.stats(),
+        'discovery_watcher': discovery.watcher.stats(),
+        'email_outbox': models.EmailOutbox.counts(),
+        'email': email_service.metrics(),
+    })
+
+
 if __name__ == '__main__':
-    # Make sure database is initialized
-    from models import Database
-    db = Database()
+    # Development server; use gunicorn with wsgi.py in production (see SETUP.md)
+    app = create_app()
     logger.info(f"Database initialized at {Config.DATABASE_PATH}")
 
+    if Config.EMAIL_OUTBOX_ENABLED:
+        # Deliver anything still queued from before the restart
+        outbox.worker.start()
+    if Config.DISCOVERY_WATCH:
+        discovery.watcher.start()
+
     # Run Flask app
     logger.info("Starting Flask app...")
     app.run(
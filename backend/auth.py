@@ -2,8 +2,11 @@ from flask import Blueprint, render_template, request, redirect, url_for, sessio
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from email_service import send_magic_link, is_valid_email
-from models import MagicLink, Session, Database
+from models import MagicLink, Session, Database, EmailOutbox
+import outbox
 from config import Config
+from static_auth import stamp_session_expiry
+import ratelimit_storage  # registers the sqlite:// rate limit storage scheme
 import logging
 
 # Create blueprint
@@ -13,12 +16,14 @@ bp = Blueprint('auth', __name__, url_prefix='/auth')
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Rate limiter (will be initialized by app)
+# Rate limiter (will be initialized by app). Only the auth endpoints are
+# limited: static assets are fetched dozens of times per page view, and each
+# limited request costs writes to the shared counter store
 limiter = Limiter(
     key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
+    storage_uri=Config.RATELIMIT_STORAGE_URI
 )
+limiter.limit("200 per day;50 per hour")(bp)
 
 
 @bp.route('/login', methods=['GET'])
@@ -38,15 +43,31 @@ def request_magic_link():
         return render_template('error.html', message="Please enter a valid email address"), 400
 
     try:
+        # Reuse a link minted moments ago instead of creating another
+        token = None
+        if Config.MAGIC_LINK_REUSE in ('resend', 'suppress'):
+            token = MagicLink.find_recent(email, Config.MAGIC_LINK_REUSE_COOLDOWN_SECONDS)
+            if token and Config.MAGIC_LINK_REUSE == 'suppress':
+                logger.info(f"Magic link for {email} already outstanding, not resending")
+                return render_template('check_email.html', email=email)
+
         # Generate magic link token
-        token = MagicLink.create(
-            email,
-            expiration_minutes=Config.TOKEN_EXPIRATION_MINUTES
-        )
+        if token is None:
+            token = MagicLink.create(
+                email,
+                expiration_minutes=Config.TOKEN_EXPIRATION_MINUTES
+            )
 
         # Build magic link URL
         magic_link_url = f"{Config.BASE_URL}/auth/verify/{token}"
 
+        if Config.EMAIL_OUTBOX_ENABLED:
+            # Queue email; outbox workers deliver it in the background
+            EmailOutbox.enqueue(email, magic_link_url)
+            outbox.worker.notify()
+            logger.info(f"Magic link queued for {email}")
+            return render_template('check_email.html', email=email)
+
         # Send email
         success = send_magic_link(email, magic_link_url)
 
@@ -72,25 +93,20 @@ def request_magic_link():
 def verify_magic_link(token: str):
     """Verify magic link and create session"""
     try:
-        # Verify token
-        is_valid, email = MagicLink.verify(token)
+        # Consume token and create session atomically
+        email, session_id = MagicLink.redeem(token)
 
-        if not is_valid:
+        if not session_id:
             return render_template(
                 'error.html',
                 message="This link is invalid or has expired. Please request a new one."
             ), 400
 
-        # Mark token as used
-        MagicLink.mark_used(token)
-
-        # Create session
-        session_id = Session.create(email)
-
         # Set session cookie
         session['session_id'] = session_id
         session['email'] = email
         session.permanent = True
+        stamp_session_expiry(login=True)
 
         logger.info(f"User {email} logged in via magic link")
 
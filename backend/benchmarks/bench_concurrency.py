@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SQLite readers against a concurrent writer
+
+Runs N reader threads doing session lookups while one writer thread keeps
+updating last_accessed, once with SQLite's defaults (rollback journal) and
+once with the Config.SQLITE_PRAGMAS profile (WAL).
+
+Usage:
+    cd backend && python3 benchmarks/bench_concurrency.py [readers] [seconds]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import Config
+from models import Database
+
+DEFAULT_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 0}
+SESSIONS = 1000
+
+
+def seed(db: Database):
+    with db.connection() as conn:
+        conn.executemany(
+            "INSERT INTO sessions (session_id, email) VALUES (?, ?)",
+            [(f'sid-{i}', f'user{i}@example.com') for i in range(SESSIONS)]
+        )
+        conn.commit()
+
+
+def run_profile(name: str, pragmas: dict, readers: int, seconds: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, f'{name}.db'), pool_size=readers + 1, pragmas=pragmas)
+        seed(db)
+
+        stop = threading.Event()
+        lock_errors = 0
+        waits: list[float] = []
+        writes = 0
+        counter_lock = threading.Lock()
+
+        def reader(n: int):
+            nonlocal lock_errors
+            i = n
+            local_waits = []
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    with db.connection() as conn:
+                        conn.execute(
+                            "SELECT last_accessed FROM sessions WHERE session_id = ?",
+                            (f'sid-{i % SESSIONS}',)
+                        ).fetchone()
+                    local_waits.append(time.perf_counter() - start)
+                except sqlite3.OperationalError:
+                    with counter_lock:
+                        lock_errors += 1
+                i += readers
+            with counter_lock:
+                waits.extend(local_waits)
+
+        def writer():
+            nonlocal writes, lock_errors
+            i = 0
+            while not stop.is_set():
+                try:
+                    with db.connection() as conn:
+                        conn.execute(
+                            "UPDATE sessions SET last_accessed = ? WHERE session_id = ?",
+                            (int(time.time()), f'sid-{i % SESSIONS}')
+                        )
+                        conn.commit()
+                    writes += 1
+                except sqlite3.OperationalError:
+                    with counter_lock:
+                        lock_errors += 1
+                i += 1
+
+        threads = [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+        threads.append(threading.Thread(target=writer))
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        db.close_all()
+
+    waits.sort()
+    p99 = waits[int(len(waits) * 0.99)] * 1000 if waits else float('nan')
+    print(f"{name:<10}{len(waits) / seconds:>12.0f}{writes / seconds:>10.0f}"
+          f"{p99:>12.3f}{lock_errors:>14}")
+
+
+def run(readers: int, seconds: float):
+    print(f"{readers} readers, 1 writer, {seconds:.0f}s per profile")
+    print(f"{'profile':<10}{'reads/s':>12}{'writes/s':>10}{'p99 ms':>12}{'lock errors':>14}")
+    run_profile('default', DEFAULT_PRAGMAS, readers, seconds)
+    run_profile('tuned', Config.SQLITE_PRAGMAS, readers, seconds)
+
+
+if __name__ == '__main__':
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 5,
+    )
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SQLite connections opened per authenticated request
+
+Compares the legacy behaviour (a fresh Database, schema init and connection
+for every model call) against the shared, pooled Database.
+
+Usage:
+    cd backend && python3 benchmarks/bench_connections.py [requests]
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import models
+from config import Config
+
+
+def count_connects(client, n: int) -> tuple[float, float]:
+    """Return (connections per request, ms per request) for n requests"""
+    real_connect = sqlite3.connect
+    calls = 0
+
+    def counting_connect(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        return real_connect(*args, **kwargs)
+
+    with patch('models.sqlite3.connect', side_effect=counting_connect):
+        start = time.perf_counter()
+        for _ in range(n):
+            client.get('/style.css')
+        elapsed = time.perf_counter() - start
+
+    return calls / n, elapsed / n * 1000
+
+
+def run(n: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.PUBLIC_DIR = tmp
+        Config.DATABASE_PATH = os.path.join(tmp, 'bench.db')
+        # Measure the uncached path: every request validates and updates in SQLite
+        Config.SESSION_CACHE_TTL_SECONDS = 0
+        Config.SESSION_WRITE_BEHIND = False
+        with open(os.path.join(tmp, 'style.css'), 'w') as f:
+            f.write('body { color: black; }')
+        from app import create_app
+        app = create_app()
+        from auth import limiter
+        limiter.enabled = False
+        logging.disable(logging.INFO)
+
+        session_id = models.Session.create('bench@example.com')
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['session_id'] = session_id
+
+        # Legacy: every call builds a new Database (CREATE TABLE + connect)
+        with patch('models.get_db', side_effect=lambda path=None: models.Database(path, pool_size=0)), \
+                patch('models.has_app_context', return_value=False):
+            before = count_connects(client, n)
+
+        models.close_all()
+        after = count_connects(client, n)
+        models.close_all()
+
+    print(f"{'mode':<10}{'connects/request':>18}{'ms/request':>12}")
+    print(f"{'legacy':<10}{before[0]:>18.2f}{before[1]:>12.3f}")
+    print(f"{'pooled':<10}{after[0]:>18.2f}{after[1]:>12.3f}")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
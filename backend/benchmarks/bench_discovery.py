@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark: backlink resolution, linear stem scan vs LinkResolver
+
+Builds synthetic published pages in memory (no disk I/O) with five links
+each: filenames, titles, aliases and dangling links. Backlinks are then
+computed with the old algorithm, which scans every page for each link that
+does not match a title, and with the LinkResolver index. Above 1k pages the
+old algorithm is timed on a sample of LEGACY_SAMPLE source pages and
+extrapolated (marked ~), since a full run takes hours.
+
+Usage:
+    cd backend && python3 benchmarks/bench_discovery.py [sizes...]
+"""
+
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from discovery import PageRecord, VaultIndex
+
+LEGACY_SAMPLE = 100
+
+
+def synthetic_records(n: int) -> dict:
+    rng = random.Random(n)
+    records = {}
+    for i in range(n):
+        path = f"folder-{i % 100}/note-{i}.md"
+        links = []
+        for _ in range(5):
+            j = rng.randrange(n)
+            kind = rng.random()
+            if kind < 0.4:
+                links.append(f"note-{j}")
+            elif kind < 0.7:
+                links.append(f"Note {j}")
+            elif kind < 0.8:
+                links.append(f"alias-{j}")
+            else:
+                links.append(f"missing-{j}")
+        records[path] = PageRecord(
+            path, True, title=f"Note {i}", links=tuple(links), aliases=(f"alias-{i}",)
+        )
+    return records
+
+
+def legacy_backlinks(records: dict, sources: list = None) -> dict:
+    """The pre-index algorithm: title lookup, then a scan of every page"""
+    published = list(records.values())
+    titles = {r.title: r.path for r in published if r.title}
+    backlinks = {r.path: set() for r in published}
+    for record in sources or published:
+        for page_name in record.links:
+            target = titles.get(page_name)
+            if target is None:
+                for candidate in published:
+                    if page_name.lower() == Path(candidate.path).stem.lower():
+                        target = candidate.path
+                        break
+            if target and target != record.path:
+                backlinks[target].add(record.path)
+    return backlinks
+
+
+def run(sizes: list[int]):
+    print(f"{'pages':>8}{'links':>10}{'linear scan s':>16}{'index s':>10}")
+    for n in sizes:
+        index = VaultIndex()
+        index.records = synthetic_records(n)
+
+        start = time.perf_counter()
+        index.backlinks()
+        indexed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if n <= 1_000:
+            legacy_backlinks(index.records)
+            legacy = f"{time.perf_counter() - start:.2f}"
+        else:
+            sample = list(index.records.values())[:LEGACY_SAMPLE]
+            legacy_backlinks(index.records, sample)
+            legacy = f"~{(time.perf_counter() - start) * n / LEGACY_SAMPLE:.0f}"
+
+        print(f"{n:>8}{n * 5:>10}{legacy:>16}{indexed:>10.3f}")
+
+
+if __name__ == '__main__':
+    run([int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000])
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold discovery scan, serial vs process pool
+
+Writes a synthetic vault (see bench_vault_index.write_vault) and times
+VaultIndex.scan() with 1, 2, 4, ... workers up to max_workers (default: the
+CPU count), split into parse time (reading and regex work, the parallel
+part) and total time including link resolution in the main process. The
+page cache is warmed first, so this measures CPU, not disk.
+
+Usage:
+    cd backend && python3 benchmarks/bench_parallel_scan.py [notes] [chunk_size] [max_workers]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_vault_index import write_vault
+from discovery import VaultIndex
+
+
+def worker_counts(max_workers: int) -> list[int]:
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    return counts + [max_workers]
+
+
+def run(n: int, chunk_size: int, max_workers: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = os.path.join(tmp, 'content')
+        write_vault(content_dir, n)
+        # Warm the page cache so the first row is not penalised
+        VaultIndex(content_dir)._stat_tree()
+        for root, _, files in os.walk(content_dir):
+            for name in files:
+                with open(os.path.join(root, name), 'rb') as f:
+                    f.read()
+
+        print(f"{n} notes, chunk size {chunk_size}, {os.cpu_count()} CPUs")
+        print(f"{'workers':>8}{'parse s':>10}{'total s':>10}{'speedup':>10}")
+        baseline = None
+        for workers in worker_counts(max_workers):
+            index = VaultIndex(content_dir, scan_workers=workers, scan_chunk_size=chunk_size)
+            paths = sorted(index._stat_tree())
+
+            start = time.perf_counter()
+            index._parse_files(paths)
+            parse = time.perf_counter() - start
+
+            start = time.perf_counter()
+            index.scan()
+            total = time.perf_counter() - start
+
+            baseline = baseline or total
+            print(f"{workers:>8}{parse:>10.2f}{total:>10.2f}{baseline / total:>9.2f}x")
+
+
+if __name__ == '__main__':
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 1_000,
+        int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 1,
+    )
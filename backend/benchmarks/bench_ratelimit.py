@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark: rate limit checks shared across worker processes
+
+Starts P processes that each hit the same limit M times and reports the
+per-check cost and how many hits were let through in total. With
+memory:// every process enforces the limit on its own; with sqlite:// the
+limit holds for all of them together.
+
+Usage:
+    cd backend && python3 benchmarks/bench_ratelimit.py [processes] [hits] [limit]
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def worker(uri: str, hits: int, limit: int, results):
+    import ratelimit_storage  # noqa: F401 - registers sqlite://
+    from limits import RateLimitItemPerHour
+    from limits.storage import storage_from_string
+    from limits.strategies import FixedWindowRateLimiter
+
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    item = RateLimitItemPerHour(limit)
+    allowed = 0
+    start = time.perf_counter()
+    for _ in range(hits):
+        allowed += limiter.hit(item, '127.0.0.1')
+    results.put((allowed, time.perf_counter() - start))
+
+
+def run_backend(name: str, uri: str, processes: int, hits: int, limit: int):
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(uri, hits, limit, results)) for _ in range(processes)]
+    for p in procs:
+        p.start()
+    outcomes = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    allowed = sum(a for a, _ in outcomes)
+    per_check_us = sum(t for _, t in outcomes) / (processes * hits) * 1e6
+    print(f"{name:<10}{per_check_us:>14.1f}{allowed:>10}{limit:>8}")
+
+
+def run(processes: int, hits: int, limit: int):
+    print(f"{processes} processes x {hits} hits on one key")
+    print(f"{'storage':<10}{'us/check':>14}{'allowed':>10}{'limit':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        run_backend('memory', 'memory://', processes, hits, limit)
+        run_backend('sqlite', f"sqlite:///{tmp}/ratelimit.db", processes, hits, limit)
+
+
+if __name__ == '__main__':
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 4,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5000,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 1000,
+    )
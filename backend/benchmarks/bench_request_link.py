@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /auth/request-link latency with a slow Mailgun
+
+Serves a local fake Mailgun that takes a fixed time to answer, then times
+POST /auth/request-link with synchronous sending and with the email outbox.
+
+Usage:
+    cd backend && python3 benchmarks/bench_request_link.py [requests] [mailgun_delay_seconds]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import models
+import outbox
+from config import Config
+from tests.fake_mailgun import FakeMailgun
+
+
+def time_requests(client, n: int) -> list[float]:
+    latencies = []
+    for i in range(n):
+        start = time.perf_counter()
+        resp = client.post('/auth/request-link', data={'email': f'user{i}@example.com'})
+        latencies.append(time.perf_counter() - start)
+        assert resp.status_code == 200, resp.status_code
+    return sorted(latencies)
+
+
+def report(name: str, latencies: list[float]):
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"{name:<12}{p50:>10.1f}{p99:>10.1f}")
+
+
+def run(n: int, delay: float):
+    logging.disable(logging.WARNING)
+    mailgun = FakeMailgun().start()
+    mailgun.delay = delay
+    Config.MAILGUN_API_KEY = 'bench-key'
+    Config.MAILGUN_DOMAIN = 'mg.example.com'
+    Config.MAILGUN_API_BASE = mailgun.api_base
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Config.DATABASE_PATH = os.path.join(tmp, 'bench.db')
+        from app import create_app
+        app = create_app()
+        from auth import limiter
+        limiter.enabled = False
+        client = app.test_client()
+
+        print(f"Mailgun delay {delay * 1000:.0f} ms, {n} requests")
+        print(f"{'mode':<12}{'p50 ms':>10}{'p99 ms':>10}")
+
+        Config.EMAIL_OUTBOX_ENABLED = False
+        report('synchronous', time_requests(client, n))
+
+        Config.EMAIL_OUTBOX_ENABLED = True
+        report('outbox', time_requests(client, n))
+
+        # Let the background workers deliver what was queued
+        deadline = time.time() + n * delay + 10
+        while models.EmailOutbox.counts().get('sent', 0) < n and time.time() < deadline:
+            time.sleep(0.1)
+        outbox.worker.stop()
+        print(f"outbox delivered {models.EmailOutbox.counts().get('sent', 0)}/{n}")
+        models.close_all()
+
+    mailgun.stop()
+
+
+if __name__ == '__main__':
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.5,
+    )
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark: large file downloads with and without sendfile()
+
+Serves one large file from a temporary public/ under gunicorn, first with
+sendfile enabled (the default) and then with --no-sendfile. Concurrent
+clients each download the whole file, plus an open-ended range from the
+middle, while the server's total RSS is sampled.
+
+Usage:
+    cd backend && python3 benchmarks/bench_sendfile.py [size_mb] [clients]
+"""
+
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench_serving import BACKEND_DIR, free_port, make_cookie, wait_for_port
+
+
+def server_rss_mb(pid: int) -> float:
+    """Resident memory of a process and all of its children"""
+    pids = {pid}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            pids.add(int(entry))
+
+    total_kb = 0
+    for p in pids:
+        try:
+            with open(f'/proc/{p}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            pass
+    return total_kb / 1024
+
+
+def download(port: int, cookie: str, headers: dict) -> int:
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    conn.request('GET', '/large.bin', headers={'Cookie': cookie, **headers})
+    resp = conn.getresponse()
+    received = 0
+    while chunk := resp.read(1024 * 1024):
+        received += len(chunk)
+    conn.close()
+    return received
+
+
+def run_mode(name: str, extra_args: list, env: dict, cookie: str, size: int, clients: int):
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--access-logfile', '/dev/null', '-b', f'127.0.0.1:{port}',
+         *extra_args, 'wsgi:app'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_for_port(port)
+        # Warm the ETag and page cache so the timed run measures transfer only
+        download(port, cookie, {'Range': 'bytes=0-0'})
+        time.sleep(0.5)
+        baseline = server_rss_mb(proc.pid)
+
+        peak = baseline
+        done = threading.Event()
+
+        def sample():
+            nonlocal peak
+            while not done.is_set():
+                peak = max(peak, server_rss_mb(proc.pid))
+                time.sleep(0.1)
+
+        sampler = threading.Thread(target=sample)
+        sampler.start()
+
+        received = []
+        headers = [{} if n % 2 == 0 else {'Range': f'bytes={size // 2}-'} for n in range(clients)]
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=lambda h=h: received.append(download(port, cookie, h)))
+            for h in headers
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        done.set()
+        sampler.join()
+
+        total_mb = sum(received) / (1024 * 1024)
+        print(f"{name:<14}{total_mb / elapsed:>10.0f}{baseline:>14.0f}{peak:>12.0f}")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def run(size_mb: int, clients: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        public = os.path.join(tmp, 'public')
+        os.mkdir(public)
+        with open(os.path.join(public, 'index.html'), 'w') as f:
+            f.write('<html></html>')
+        size = size_mb * 1024 * 1024
+        with open(os.path.join(public, 'large.bin'), 'wb') as f:
+            block = os.urandom(1024 * 1024)
+            for _ in range(size_mb):
+                f.write(block)
+
+        env = {
+            **os.environ,
+            'DATABASE_PATH': os.path.join(tmp, 'bench.db'),
+            'PUBLIC_DIR': public,
+            'SECRET_KEY': 'bench-secret',
+            'RATELIMIT_ENABLED': 'False',
+            'EMAIL_OUTBOX_WORKERS': '0',
+        }
+        cookie = make_cookie(env)
+
+        print(f"{clients} clients downloading a {size_mb} MB file "
+              f"(half of them from the middle with a Range request)")
+        print(f"{'mode':<14}{'MB/s':>10}{'idle RSS MB':>14}{'peak RSS MB':>12}")
+        run_mode('sendfile', [], env, cookie, size, clients)
+        run_mode('no sendfile', ['--no-sendfile'], env, cookie, size, clients)
+
+
+if __name__ == '__main__':
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+    )
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Load test: Flask development server vs gunicorn
+
+Starts each server on a free local port, then runs concurrent keep-alive
+clients issuing authenticated GETs for a fixed time and reports
+throughput and latency percentiles.
+
+Usage:
+    cd backend && python3 benchmarks/bench_serving.py [clients] [seconds] [path]
+"""
+
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def make_cookie(env: dict) -> str:
+    """Create a session in the benchmark database and sign a cookie for it"""
+    os.environ.update(env)
+    from config import Config
+    Config.DATABASE_PATH = env['DATABASE_PATH']
+    Config.SECRET_KEY = env['SECRET_KEY']
+    import models
+    from app import create_app
+
+    app = create_app()
+    session_id = models.Session.create('bench@example.com')
+    serializer = app.session_interface.get_signing_serializer(app)
+    models.close_all()
+    cookie = serializer.dumps({'session_id': session_id, 'email': 'bench@example.com'})
+    return f"session={cookie}"
+
+
+def load(port: int, cookie: str, path: str, clients: int, seconds: float):
+    stop = time.time() + seconds
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def client():
+        nonlocal errors
+        local = []
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        while time.time() < stop:
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path, headers={'Cookie': cookie})
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status != 200:
+                    raise RuntimeError(resp.status)
+                local.append(time.perf_counter() - start)
+            except Exception:
+                with lock:
+                    errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    if not latencies:
+        return 0.0, float('nan'), float('nan'), errors
+    return (
+        len(latencies) / seconds,
+        latencies[len(latencies) // 2] * 1000,
+        latencies[int(len(latencies) * 0.99)] * 1000,
+        errors,
+    )
+
+
+def run(clients: int, seconds: float, path: str):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            'DATABASE_PATH': os.path.join(tmp, 'bench.db'),
+            'SECRET_KEY': 'bench-secret',
+            'RATELIMIT_ENABLED': 'False',
+            'EMAIL_OUTBOX_WORKERS': '0',
+            # /api/stats is admin only
+            'ADMIN_EMAILS': 'bench@example.com',
+        }
+        cookie = make_cookie(env)
+
+        servers = {
+            'flask dev': [
+                sys.executable, '-c',
+                "import sys, logging; from app import create_app; "
+                "logging.getLogger('werkzeug').setLevel(logging.ERROR); "
+                "create_app().run(host='127.0.0.1', port=int(sys.argv[1]))",
+            ],
+            'gunicorn': [
+                sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                '--access-logfile', '/dev/null', '--error-logfile', '/dev/null',
+                '-b', '127.0.0.1:{port}', 'wsgi:app',
+            ],
+        }
+
+        print(f"{clients} keep-alive clients, {seconds:.0f}s, GET {path}, "
+              f"gunicorn {env.get('WEB_WORKERS', 'default')} workers")
+        print(f"{'server':<12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for name, cmd in servers.items():
+            port = free_port()
+            cmd = [c.format(port=port) for c in cmd]
+            if name == 'flask dev':
+                cmd.append(str(port))
+            proc = subprocess.Popen(
+                cmd, cwd=BACKEND_DIR, env=env,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            try:
+                wait_for_port(port)
+                rps, p50, p99, errors = load(port, cookie, path, clients, seconds)
+                print(f"{name:<12}{rps:>10.0f}{p50:>10.2f}{p99:>10.2f}{errors:>8}")
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 16,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 10,
+        sys.argv[3] if len(sys.argv) > 3 else '/api/stats',
+    )
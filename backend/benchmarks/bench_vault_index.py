@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark: persistent discovery index, cold scan vs warm restart
+
+Writes a synthetic vault of markdown notes to a temporary directory, then
+times a cold scan (parse everything, save to SQLite), a warm restart (a new
+VaultIndex loading the store and stat-ing the tree) and a refresh after a
+single note changed.
+
+Usage:
+    cd backend && python3 benchmarks/bench_vault_index.py [notes]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from discovery import VaultIndex
+
+
+def write_vault(content_dir: str, n: int):
+    """n published notes in 100 folders, each with five wikilinks"""
+    rng = random.Random(n)
+    for i in range(n):
+        folder = os.path.join(content_dir, f"folder-{i % 100}")
+        os.makedirs(folder, exist_ok=True)
+        links = ' '.join(f"[[note-{rng.randrange(n)}]]" for _ in range(5))
+        with open(os.path.join(folder, f"note-{i}.md"), 'w') as f:
+            f.write(
+                f"---\ntitle: Note {i}\ntags: [t{i % 20}]\ndate: 2024-01-01\n"
+                f"publish: true\n---\n# Note {i}\n\n{'Lorem ipsum dolor sit amet. ' * 20}\n\n"
+                f"See {links}.\n"
+            )
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run(n: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        content_dir = os.path.join(tmp, 'content')
+        store = os.path.join(tmp, 'discovery.db')
+        write_vault(content_dir, n)
+
+        cold, _ = timed(lambda: VaultIndex(content_dir, store_path=store).refresh())
+
+        warm_index = VaultIndex(content_dir, store_path=store)
+        warm, changes = timed(warm_index.refresh)
+        assert not any(changes.values()), changes
+
+        path = os.path.join(content_dir, 'folder-0', 'note-0.md')
+        with open(path, 'a') as f:
+            f.write("\n[[note-1]]\n")
+        one, changes = timed(warm_index.refresh)
+        assert changes['changed'] == 1, changes
+
+        print(f"{n} notes")
+        print(f"  cold scan + save      {cold:8.2f}s")
+        print(f"  warm restart          {warm:8.2f}s")
+        print(f"  refresh, 1 changed    {one:8.2f}s")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
@@ -11,7 +11,7 @@ Usage:
 
 import sys
 from pathlib import Path
-from models import MagicLink, Session
+from models import MagicLink, Session, EmailOutbox
 from config import Config
 
 def cleanup_database():
@@ -27,6 +27,10 @@ def cleanup_database():
         old_sessions_count = Session.delete_old(days=30)
         print(f"✓ Deleted {old_sessions_count} old sessions")
 
+        # Delete delivered outbox emails (older than 7 days)
+        sent_count = EmailOutbox.delete_sent(days=7)
+        print(f"✓ Deleted {sent_count} sent outbox emails")
+
         # Get database size
         db_path = Path(Config.DATABASE_PATH)
         if db_path.exists():
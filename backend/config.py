@@ -13,16 +13,152 @@ class Config:
 
     # Database
     DATABASE_PATH = os.getenv('DATABASE_PATH', 'backend/database.db')
+    DATABASE_POOL_SIZE = int(os.getenv('DATABASE_POOL_SIZE', '8'))
+
+    # SQLite pragmas applied to every new connection. WAL lets readers
+    # proceed while a writer commits; busy_timeout makes writers wait for
+    # the lock instead of failing with "database is locked".
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+        'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', '-16000')),
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024))),
+        'temp_store': os.getenv('SQLITE_TEMP_STORE', 'MEMORY'),
+    }
 
     # Mailgun settings
     MAILGUN_API_KEY = os.getenv('MAILGUN_API_KEY', '')
     MAILGUN_DOMAIN = os.getenv('MAILGUN_DOMAIN', '')
+    MAILGUN_API_BASE = os.getenv('MAILGUN_API_BASE', 'https://api.mailgun.net/v3')
+    MAILGUN_POOL_SIZE = int(os.getenv('MAILGUN_POOL_SIZE', '4'))
+    # Recipients per batch-sending API call (Mailgun allows up to 1000)
+    MAILGUN_BATCH_SIZE = int(os.getenv('MAILGUN_BATCH_SIZE', '1000'))
+    MAILGUN_RETRIES = int(os.getenv('MAILGUN_RETRIES', '2'))
+    MAILGUN_CONNECT_TIMEOUT = float(os.getenv('MAILGUN_CONNECT_TIMEOUT', '3'))
+    MAILGUN_READ_TIMEOUT = float(os.getenv('MAILGUN_READ_TIMEOUT', '10'))
+    # Fail fast after this many consecutive send failures; retry after the reset period
+    MAILGUN_BREAKER_THRESHOLD = int(os.getenv('MAILGUN_BREAKER_THRESHOLD', '5'))
+    MAILGUN_BREAKER_RESET_SECONDS = float(os.getenv('MAILGUN_BREAKER_RESET_SECONDS', '30'))
     FROM_EMAIL = os.getenv('FROM_EMAIL', 'noreply@example.com')
 
+    # Email outbox: /auth/request-link queues the email and background
+    # workers send it, retrying with exponential backoff
+    EMAIL_OUTBOX_ENABLED = os.getenv('EMAIL_OUTBOX_ENABLED', 'True') == 'True'
+    EMAIL_OUTBOX_WORKERS = int(os.getenv('EMAIL_OUTBOX_WORKERS', '2'))
+    EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv('EMAIL_OUTBOX_POLL_SECONDS', '5'))
+    EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', '6'))
+    EMAIL_OUTBOX_BACKOFF_SECONDS = float(os.getenv('EMAIL_OUTBOX_BACKOFF_SECONDS', '10'))
+    EMAIL_OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv('EMAIL_OUTBOX_BACKOFF_MAX_SECONDS', '3600'))
+
     # Authentication settings
     TOKEN_EXPIRATION_MINUTES = int(os.getenv('TOKEN_EXPIRATION_MINUTES', '15'))
     SESSION_TIMEOUT_DAYS = int(os.getenv('SESSION_TIMEOUT_DAYS', '7'))
 
+    # Repeated link requests within the cooldown: 'off' mints a new link,
+    # 'resend' mails the outstanding link again, 'suppress' sends nothing
+    MAGIC_LINK_REUSE = os.getenv('MAGIC_LINK_REUSE', 'off')
+    MAGIC_LINK_REUSE_COOLDOWN_SECONDS = int(os.getenv('MAGIC_LINK_REUSE_COOLDOWN_SECONDS', '300'))
+
+    # Bulk invites: who may send them and how long invite links stay valid
+    ADMIN_EMAILS = {
+        e.strip().lower() for e in os.getenv('ADMIN_EMAILS', '').split(',') if e.strip()
+    }
+    INVITE_EXPIRATION_MINUTES = int(os.getenv('INVITE_EXPIRATION_MINUTES', str(7 * 24 * 60)))
+
+    # Session validation mode: 'database' checks every request against the
+    # sessions table; 'signed' trusts the signed cookie's expiry and only
+    # consults an in-memory revocation set
+    SESSION_MODE = os.getenv('SESSION_MODE', 'database')
+    SESSION_REVOCATION_REFRESH_SECONDS = float(os.getenv('SESSION_REVOCATION_REFRESH_SECONDS', '30'))
+
+    # In-process cache of validated sessions (TTL 0 disables it). A logout
+    # clears only its own worker's cache; other workers keep accepting the
+    # session until their entry expires, so keep the TTL short
+    SESSION_CACHE_TTL_SECONDS = float(os.getenv('SESSION_CACHE_TTL_SECONDS', '5'))
+    SESSION_CACHE_MAX_ENTRIES = int(os.getenv('SESSION_CACHE_MAX_ENTRIES', '10000'))
+
+    # Write-behind batching of sessions.last_accessed updates
+    SESSION_WRITE_BEHIND = os.getenv('SESSION_WRITE_BEHIND', 'True') == 'True'
+    SESSION_TOUCH_FLUSH_SECONDS = float(os.getenv('SESSION_TOUCH_FLUSH_SECONDS', '5'))
+    SESSION_TOUCH_MAX_PENDING = int(os.getenv('SESSION_TOUCH_MAX_PENDING', '1000'))
+    SESSION_TOUCH_GRANULARITY_SECONDS = float(os.getenv('SESSION_TOUCH_GRANULARITY_SECONDS', '60'))
+
+    # Rate limit counters. memory:// is per process; gunicorn.conf.py switches
+    # to sqlite:// next to DATABASE_PATH when WEB_WORKERS > 1 and this is unset
+    RATELIMIT_STORAGE_URI = os.getenv('RATELIMIT_STORAGE_URI', 'memory://')
+    RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'True') == 'True'
+
+    # Built Quartz site. The URL manifest is re-checked for a rebuild at
+    # most this often
+    PUBLIC_DIR = os.getenv(
+        'PUBLIC_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'public')
+    )
+    STATIC_MANIFEST_REFRESH_SECONDS = float(os.getenv('STATIC_MANIFEST_REFRESH_SECONDS', '5'))
+
+    # Cache-Control per file in public/: 'glob=value' rules separated by ';',
+    # first match wins. Only content-hashed names (name.<8+ hex>.ext) are
+    # immutable: Quartz rewrites static/contentIndex.json, postscript.js and
+    # the rest under their own names on every build, so those are short-lived
+    # or revalidated with their ETag
+    STATIC_CACHE_CONTROL = [
+        tuple(part.strip() for part in rule.split('=', 1))
+        for rule in os.getenv(
+            'STATIC_CACHE_CONTROL',
+            'static/contentIndex.json=private, no-cache;'
+            '*.html=private, max-age=60;'
+            '*.[0-9a-f][0-9a-f][0-9a-f][0-9a-f][0-9a-f][0-9a-f][0-9a-f][0-9a-f]*.*'
+            '=private, max-age=31536000, immutable;'
+            'static/*=private, max-age=3600;'
+            '*=private, no-cache'
+        ).split(';')
+        if '=' in rule
+    ]
+
+    # Let the front proxy send file bytes: 'x-accel' (nginx X-Accel-Redirect),
+    # 'x-sendfile' (Apache/lighttpd X-Sendfile) or '' to serve in-process.
+    # Only files matching one of the ';'-separated globs are offloaded;
+    # X-Accel-Redirect points at STATIC_OFFLOAD_PREFIX + the path in public/
+    STATIC_OFFLOAD = os.getenv('STATIC_OFFLOAD', '')
+    STATIC_OFFLOAD_PATTERNS = [
+        p.strip() for p in os.getenv('STATIC_OFFLOAD_PATTERNS', '*').split(';') if p.strip()
+    ]
+    STATIC_OFFLOAD_PREFIX = os.getenv('STATIC_OFFLOAD_PREFIX', '/_protected/')
+
+    # In-memory cache of small static files (a budget of 0 disables it)
+    STATIC_CACHE_MAX_BYTES = int(os.getenv('STATIC_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    STATIC_CACHE_MAX_FILE_BYTES = int(os.getenv('STATIC_CACHE_MAX_FILE_BYTES', str(1024 * 1024)))
+
+    # Persistent discovery index (parsed pages and link graph); '' keeps it
+    # in memory only. With DISCOVERY_HASH_CONTENT, files whose mtime changed
+    # but whose content did not are not re-parsed
+    DISCOVERY_INDEX_PATH = os.getenv(
+        'DISCOVERY_INDEX_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'discovery.db')
+    )
+    DISCOVERY_HASH_CONTENT = os.getenv('DISCOVERY_HASH_CONTENT', 'False') == 'True'
+    # Cold scans (and large refreshes) parse notes in this many processes,
+    # DISCOVERY_SCAN_CHUNK_SIZE files per task; 0 means one per CPU, 1
+    # parses in the server process
+    DISCOVERY_SCAN_WORKERS = int(os.getenv('DISCOVERY_SCAN_WORKERS', '1'))
+    DISCOVERY_SCAN_CHUNK_SIZE = int(os.getenv('DISCOVERY_SCAN_CHUNK_SIZE', '1000'))
+
+    # Keep the discovery index current from a background watcher instead of
+    # a stat pass per /api/orphans request. Backend is 'auto' (inotify where
+    # available, else polling), 'inotify' or 'poll'
+    DISCOVERY_WATCH = os.getenv('DISCOVERY_WATCH', 'False') == 'True'
+    DISCOVERY_WATCH_BACKEND = os.getenv('DISCOVERY_WATCH_BACKEND', 'auto')
+    DISCOVERY_WATCH_DEBOUNCE_SECONDS = float(os.getenv('DISCOVERY_WATCH_DEBOUNCE_SECONDS', '1'))
+    DISCOVERY_WATCH_POLL_SECONDS = float(os.getenv('DISCOVERY_WATCH_POLL_SECONDS', '5'))
+
+    # Production server (gunicorn.conf.py)
+    WEB_BIND = os.getenv('WEB_BIND', '0.0.0.0:5000')
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', str(min(2 * (os.cpu_count() or 1) + 1, 8))))
+    WEB_THREADS = int(os.getenv('WEB_THREADS', '4'))
+    WEB_TIMEOUT = int(os.getenv('WEB_TIMEOUT', '30'))
+    WEB_GRACEFUL_TIMEOUT = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '30'))
+    WEB_PRELOAD = os.getenv('WEB_PRELOAD', 'True') == 'True'
+
     # Base URL
     BASE_URL = os.getenv('BASE_URL', 'http://localhost:5000')
 
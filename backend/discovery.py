@@ -1,166 +1,1083 @@
+import ctypes
+import ctypes.util
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
 import re
+import select
+import sqlite3
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, List, Set
+from typing import Dict, List, NamedTuple, Optional, Set
 
+from config import Config
 
-def find_orphaned_pages(content_dir: str = None) -> List[str]:
+TITLE_RE = re.compile(r'title:\s*([^\n]+)')
+TAGS_RE = re.compile(r'tags:\s*\[(.*?)\]', re.DOTALL)
+DATE_RE = re.compile(r'date:\s*([^\n]+)')
+WIKILINK_RE = re.compile(r'\[\[([^\]]+)\]\]')
+FRONTMATTER_RE = re.compile(r'\A---\s*\n(.*?)\n---', re.DOTALL)
+# aliases: [a, b] | aliases: a | aliases:\n  - a\n  - b
+ALIASES_RE = re.compile(
+    r'^(?:aliases|alias):[ \t]*(?:\[(.*?)\]|(\S[^\n]*)|((?:\n[ \t]*-[^\n]*)+))',
+    re.MULTILINE | re.DOTALL
+)
+DISPLAY_TEXT_RE = re.compile(r'\\?\|')
+WHITESPACE_RE = re.compile(r'\s')
+
+
+class PageRecord(NamedTuple):
+    """Everything discovery needs from one markdown file"""
+    path: str
+    published: bool
+    title: Optional[str] = None
+    tags: tuple = ()
+    date: Optional[str] = None
+    links: tuple = ()
+    aliases: tuple = ()
+
+
+def default_content_dir() -> Path:
+    """The content/ directory next to the backend"""
+    return Path(__file__).parent.parent / 'content'
+
+
+def _strip_quotes(value: str) -> str:
+    return value.strip().strip('"\'')
+
+
+def parse_aliases(content: str) -> tuple:
+    """Frontmatter aliases (inline list, block list or single value)"""
+    frontmatter = FRONTMATTER_RE.match(content)
+    if not frontmatter:
+        return ()
+    match = ALIASES_RE.search(frontmatter.group(1))
+    if not match:
+        return ()
+    inline, single, block = match.groups()
+    if inline is not None:
+        values = inline.split(',')
+    elif single is not None:
+        values = [single]
+    else:
+        values = [line.strip()[1:] for line in block.strip().splitlines()]
+    return tuple(v for v in (_strip_quotes(v) for v in values) if v)
+
+
+def parse_page(path: str, content: str) -> PageRecord:
     """
-    Find published pages with no incoming backlinks
+    Extract the publish flag, metadata and outgoing wikilinks of a page
+
+    Args:
+        path: Page path relative to the content directory
+        content: Markdown source
+
+    Returns:
+        PageRecord (unpublished pages carry only the flag)
+    """
+    if 'publish: true' not in content:
+        return PageRecord(path, False)
+
+    title_match = TITLE_RE.search(content)
+    tags_match = TAGS_RE.search(content)
+    date_match = DATE_RE.search(content)
+
+    return PageRecord(
+        path=path,
+        published=True,
+        title=title_match.group(1).strip() if title_match else None,
+        tags=tuple(t.strip().strip('"\'') for t in tags_match.group(1).split(',')) if tags_match else (),
+        date=date_match.group(1).strip() if date_match else None,
+        # Link targets without their #anchor or |display text
+        links=tuple(
+            DISPLAY_TEXT_RE.split(link, maxsplit=1)[0].split('#')[0].strip()
+            for link in WIKILINK_RE.findall(content)
+        ),
+        aliases=parse_aliases(content),
+    )
 
-    Analyzes all markdown files in the content directory, finds [[wikilinks]],
-    and identifies pages that have no other pages linking to them.
+
+def read_page(content_dir: str, rel_path: str, hash_content: bool = False) -> Optional[tuple]:
+    """
+    Read and parse one markdown file
 
     Args:
-        content_dir: Path to content directory (defaults to ../content)
+        content_dir: Vault root
+        rel_path: File path relative to content_dir
+        hash_content: Also return a blake2b digest of the raw bytes
 
     Returns:
-        List of orphaned page paths relative to content_dir
+        (PageRecord, digest or None), or None if the file cannot be read
     """
-    if content_dir is None:
-        # Find content dir relative to backend directory
-        backend_dir = Path(__file__).parent
-        content_dir = backend_dir.parent / 'content'
-    else:
-        content_dir = Path(content_dir)
+    full_path = os.path.join(content_dir, rel_path)
+    try:
+        with open(full_path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest() if hash_content else None
+        # Universal newlines, as open() in text mode would give
+        content = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+        return parse_page(rel_path, content), digest
+    except Exception as e:
+        print(f"Error reading {full_path}: {e}")
+        return None
 
-    if not content_dir.exists():
-        return []
 
-    # Find all published markdown files
-    published_pages = []
-    page_titles = {}  # Map title to file path
+def parse_chunk(content_dir: str, rel_paths: List[str], hash_content: bool = False) -> List[tuple]:
+    """Process pool entry point: read_page over a shard of the vault"""
+    results = []
+    for rel_path in rel_paths:
+        parsed = read_page(content_dir, rel_path, hash_content)
+        if parsed is not None:
+            results.append((rel_path, parsed))
+    return results
 
-    for md_file in content_dir.rglob('*.md'):
-        try:
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
 
-                # Check if published
-                if 'publish: true' not in content:
-                    continue
+def slugify_path(path: str) -> str:
+    """Quartz's slugifyFilePath: site slug of a vault path or link target"""
+    path = path.strip('/')
+    for ext in ('.md', '.html'):
+        if path.endswith(ext):
+            path = path[:-len(ext)]
+            break
+    # Quartz slugifies each segment, but no replacement involves '/'
+    slug = (
+        WHITESPACE_RE.sub('-', path).replace('&', '-and-').replace('%', '-percent')
+        .replace('?', '').replace('#', '').rstrip('/')
+    )
+    if slug == '_index' or slug.endswith('/_index'):
+        slug = slug[:-len('_index')] + 'index'
+    return slug
 
-                published_pages.append(md_file)
 
-                # Extract title from frontmatter or filename
-                title_match = re.search(r'title:\s*([^\n]+)', content)
-                if title_match:
-                    title = title_match.group(1).strip()
-                    page_titles[title] = md_file
-        except Exception as e:
-            print(f"Error reading {md_file}: {e}")
-            continue
+@functools.lru_cache(maxsize=1 << 18)
+def link_slug(link: str) -> str:
+    """Slug a wikilink target resolves against (relative segments dropped, like Quartz)"""
+    segments = [s for s in link.split('/') if s not in ('', '.', '..')]
+    slug = slugify_path('/'.join(segments))
+    # simplifySlug: a folder's index page is addressed by the folder
+    if slug == 'index' or slug.endswith('/index'):
+        slug = slug[:-len('index')].rstrip('/')
+    return slug
 
-    # Build backlink graph
-    backlinks: Dict[Path, Set[Path]] = {page: set() for page in published_pages}
 
-    for page in published_pages:
-        try:
-            with open(page, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-                # Find all [[wikilinks]]
-                wikilinks = re.findall(r'\[\[([^\]]+)\]\]', content)
-
-                for link in wikilinks:
-                    # Extract just the page name (remove anchors)
-                    page_name = link.split('#')[0].strip()
-
-                    # Try to find the target page
-                    # First try exact title match
-                    target = None
-                    if page_name in page_titles:
-                        target = page_titles[page_name]
-                    else:
-                        # Try to find by filename (case-insensitive)
-                        for published_page in published_pages:
-                            page_stem = published_page.stem
-                            if page_name.lower() == page_stem.lower():
-                                target = published_page
-                                break
-
-                    if target and target != page:
-                        backlinks[target].add(page)
-        except Exception as e:
-            print(f"Error processing backlinks for {page}: {e}")
-            continue
+class LinkResolver:
+    """
+    Constant-time wikilink resolution over a set of pages
 
-    # Find orphans (pages with no backlinks)
-    orphans = []
-    for page in published_pages:
-        # Home page is never considered orphaned
-        if page.name == 'index.md':
-            continue
+    Follows Quartz's ``markdownLinkResolution: "shortest"``: a bare name
+    that is the last slug segment of exactly one page (or alias) links to
+    it, anything else is a path from the vault root. Links the site cannot
+    resolve fall back to an exact frontmatter title, then to a
+    case-insensitive filename.
 
-        # Check if page has no backlinks
-        if not backlinks[page]:
-            # Get relative path
-            rel_path = page.relative_to(content_dir)
-            orphans.append(str(rel_path))
+    Pages can be added and removed one at a time; ``keys`` reports which
+    lookups a page takes part in, so callers can re-resolve just the links
+    that a change can affect.
+    """
 
-    return sorted(orphans)
+    def __init__(self, records=()):
+        self.slugs: Dict[str, Set[str]] = {}
+        self.names: Dict[str, Set[str]] = {}
+        self.folders: Dict[str, Set[str]] = {}
+        self.titles: Dict[str, Set[str]] = {}
+        self.stems: Dict[str, Set[str]] = {}
+        for record in records:
+            self.add(record)
 
+    @staticmethod
+    def _entries(record: PageRecord):
+        """(index name, key) pairs a page is registered under"""
+        slug = slugify_path(record.path.replace(os.sep, '/'))
+        slugs = {slug}
+        if record.published:
+            slugs.update(slugify_path(alias) for alias in record.aliases)
+        entries = [('slugs', s) for s in slugs]
+        if slug == 'index' or slug.endswith('/index'):
+            entries.append(('folders', slug[:-len('index')].rstrip('/')))
+        if record.published:
+            if record.title:
+                entries.append(('titles', record.title))
+            entries.append(('stems', os.path.splitext(os.path.basename(record.path))[0].casefold()))
+        return entries
 
-def get_page_metadata(content_dir: str = None) -> Dict[str, dict]:
+    @staticmethod
+    def keys(record: PageRecord) -> Set[tuple]:
+        """
+        Lookup keys (see link_keys) whose resolution a page can change
+        """
+        keys = set()
+        for index, key in LinkResolver._entries(record):
+            if index in ('slugs', 'folders'):
+                keys.add(('slug', key))
+                keys.add(('slug', key.rsplit('/', 1)[-1]))
+            elif index == 'titles':
+                keys.add(('title', key))
+            else:
+                keys.add(('stem', key))
+        return keys
+
+    def add(self, record: PageRecord):
+        """Make a page resolvable"""
+        for index, key in self._entries(record):
+            paths = getattr(self, index).setdefault(key, set())
+            paths.add(record.path)
+            if index == 'slugs':
+                # Quartz de-duplicates slugs, so the same slug twice is one match
+                self.names.setdefault(key.rsplit('/', 1)[-1], set()).add(key)
+
+    def remove(self, record: PageRecord):
+        """Forget a page previously passed to add"""
+        for index, key in self._entries(record):
+            table = getattr(self, index)
+            paths = table.get(key)
+            if paths is None:
+                continue
+            paths.discard(record.path)
+            if paths:
+                continue
+            del table[key]
+            if index == 'slugs':
+                name = key.rsplit('/', 1)[-1]
+                self.names[name].discard(key)
+                if not self.names[name]:
+                    del self.names[name]
+
+    def resolve(self, link: str) -> Optional[str]:
+        """
+        Resolve a wikilink target (anchor and display text removed)
+
+        Ties between several pages go to the smallest path, so the result
+        does not depend on the order pages were added in.
+
+        Returns:
+            Path of the linked page, or None if nothing matches
+        """
+        slug = link_slug(link)
+        if '/' not in slug:
+            matches = self.names.get(slug)
+            if matches is not None and len(matches) == 1:
+                return min(self.slugs[next(iter(matches))])
+
+        paths = (self.slugs.get(slug) or self.folders.get(slug)
+                 or self.titles.get(link) or self.stems.get(link.casefold()))
+        return min(paths) if paths else None
+
+
+def link_keys(link: str) -> tuple:
+    """Lookup keys LinkResolver.resolve may consult for link"""
+    return (('slug', link_slug(link)), ('title', link), ('stem', link.casefold()))
+
+
+class IndexStore:
     """
-    Get metadata for all published pages
+    SQLite file persisting parsed page records and the resolved link graph
 
-    Args:
-        content_dir: Path to content directory
+    The file is a cache: it is rebuilt from scratch if its format version
+    or content directory does not match.
+    """
 
-    Returns:
-        Dict mapping page path to metadata (title, tags, date)
+    VERSION = 1
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] != self.VERSION:
+            conn.executescript(f"""
+                DROP TABLE IF EXISTS vault_meta;
+                DROP TABLE IF EXISTS vault_pages;
+                DROP TABLE IF EXISTS vault_links;
+                CREATE TABLE vault_meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE vault_pages (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    hash TEXT,
+                    record TEXT NOT NULL
+                );
+                CREATE TABLE vault_links (
+                    source TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    PRIMARY KEY (source, target)
+                ) WITHOUT ROWID;
+                PRAGMA user_version = {self.VERSION};
+            """)
+        return conn
+
+    def load(self, content_dir: str):
+        """
+        Load a previously saved index
+
+        Returns:
+            (records, stats, outgoing) or None if nothing usable is stored
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM vault_meta WHERE key = 'content_dir'").fetchone()
+            if row is None or row[0] != content_dir:
+                return None
+
+            records, stats = {}, {}
+            for path, mtime_ns, size, digest, record in conn.execute(
+                "SELECT path, mtime_ns, size, hash, record FROM vault_pages"
+            ):
+                fields = json.loads(record)
+                records[path] = PageRecord(path, *(
+                    tuple(v) if isinstance(v, list) else v for v in fields
+                ))
+                stats[path] = (mtime_ns, size, digest)
+
+            outgoing: Dict[str, Set[str]] = {}
+            for source, target in conn.execute("SELECT source, target FROM vault_links"):
+                outgoing.setdefault(source, set()).add(target)
+            return records, stats, outgoing
+        finally:
+            conn.close()
+
+    def forget(self):
+        """Best effort: mark the stored index unusable so the next load rescans"""
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM vault_meta")
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+
+    def save(self, content_dir: str, pages: dict, removed, outgoing: dict, replace: bool = False):
+        """
+        Write changed pages and the link sets of re-resolved sources
+
+        Args:
+            content_dir: Directory the index describes
+            pages: path -> (record, (mtime_ns, size, hash)) to insert or update
+            removed: Paths to delete
+            outgoing: source -> set of targets, replacing the stored links
+            replace: Discard everything stored first (after a cold scan)
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                if replace:
+                    conn.execute("DELETE FROM vault_pages")
+                    conn.execute("DELETE FROM vault_links")
+                conn.execute(
+                    "INSERT OR REPLACE INTO vault_meta (key, value) VALUES ('content_dir', ?)",
+                    (content_dir,)
+                )
+                conn.executemany("DELETE FROM vault_pages WHERE path = ?", [(p,) for p in removed])
+                conn.executemany("DELETE FROM vault_links WHERE source = ?", [(p,) for p in removed])
+                conn.executemany(
+                    "INSERT OR REPLACE INTO vault_pages (path, mtime_ns, size, hash, record) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(path, *stat, json.dumps(record[1:])) for path, (record, stat) in pages.items()]
+                )
+                conn.executemany(
+                    "DELETE FROM vault_links WHERE source = ?", [(s,) for s in outgoing]
+                )
+                conn.executemany(
+                    "INSERT INTO vault_links (source, target) VALUES (?, ?)",
+                    [(s, t) for s, targets in outgoing.items() for t in targets]
+                )
+        finally:
+            conn.close()
+
+
+class VaultIndex:
     """
-    if content_dir is None:
-        backend_dir = Path(__file__).parent
-        content_dir = backend_dir.parent / 'content'
-    else:
-        content_dir = Path(content_dir)
+    Parsed view of the content directory
+
+    ``scan`` reads every markdown file once into a PageRecord. ``refresh``
+    keeps the index up to date incrementally: it stats the tree, re-parses
+    only added or changed files and re-resolves only the links those
+    changes can affect. With a store the records and link graph survive
+    restarts, so a warm start on an unchanged vault is a stat pass.
+    Orphans, metadata and any other queries are answered from the records.
+    """
+
+    def __init__(self, content_dir: str = None, store_path: str = None,
+                 hash_content: bool = None, persistent: bool = False,
+                 scan_workers: int = None, scan_chunk_size: int = None):
+        self._content_dir = Path(content_dir) if content_dir is not None else None
+        self._store_path = store_path
+        self._persistent = persistent
+        self._hash_content = hash_content
+        self._scan_workers = scan_workers
+        self._scan_chunk_size = scan_chunk_size
+        # Set when the store could not be written; the index then lives in memory only
+        self._store_failed = False
+        self.records: Dict[str, PageRecord] = {}
+        self._stats: Dict[str, tuple] = {}
+        self._loaded_for = None
+        self._resolver = None
+        self._outgoing: Dict[str, Set[str]] = {}
+        self._backlinks: Optional[Dict[str, Set[str]]] = None
+        self._sources_by_key: Optional[Dict[tuple, Set[str]]] = None
+        self._last_resolved: Set[str] = set()
+        self._lock = threading.RLock()
+        self.generation = 0
+
+    @property
+    def content_dir(self) -> Path:
+        return self._content_dir if self._content_dir is not None else default_content_dir()
 
-    metadata = {}
+    @property
+    def hash_content(self) -> bool:
+        return Config.DISCOVERY_HASH_CONTENT if self._hash_content is None else self._hash_content
 
-    for md_file in content_dir.rglob('*.md'):
+    @property
+    def scan_workers(self) -> int:
+        """Processes parsing in parallel (0 means one per CPU, 1 parses in-process)"""
+        workers = Config.DISCOVERY_SCAN_WORKERS if self._scan_workers is None else self._scan_workers
+        return workers or os.cpu_count() or 1
+
+    @property
+    def scan_chunk_size(self) -> int:
+        if self._scan_chunk_size is None:
+            return Config.DISCOVERY_SCAN_CHUNK_SIZE
+        return self._scan_chunk_size
+
+    @property
+    def store(self) -> Optional[IndexStore]:
+        """Where the index is persisted (DISCOVERY_INDEX_PATH if persistent)"""
+        path = self._store_path
+        if path is None and self._persistent:
+            path = Config.DISCOVERY_INDEX_PATH
+        return IndexStore(path) if path and not self._store_failed else None
+
+    def _save(self, *args, **kwargs):
+        """IndexStore.save, falling back to memory only if the store is unusable"""
+        store = self.store
+        if store is None:
+            return
         try:
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
+            store.save(*args, **kwargs)
+        except sqlite3.Error as e:
+            print(f"Error saving discovery index to {store.db_path}, keeping it in memory: {e}")
+            # The stored graph no longer matches; make sure a later start rescans
+            store.forget()
+            self._store_failed = True
+
+    def _parse_files(self, paths: List[str]) -> Dict[str, tuple]:
+        """
+        Parse files, sharded across a process pool when there are enough
+
+        Returns:
+            path -> (record, digest or None) for every readable file
+        """
+        content_dir = str(self.content_dir)
+        workers, chunk_size = self.scan_workers, self.scan_chunk_size
+        if workers <= 1 or len(paths) <= chunk_size:
+            return dict(parse_chunk(content_dir, paths, self.hash_content))
+
+        chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+        parsed = {}
+        # spawn, not fork: forking a threaded server process can leave a
+        # child waiting on a lock some other thread held
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(chunks)),
+            mp_context=multiprocessing.get_context('spawn'),
+        ) as pool:
+            for results in pool.map(parse_chunk, repeat(content_dir), chunks,
+                                    repeat(self.hash_content)):
+                parsed.update(results)
+        return parsed
+
+    def _stat_tree(self) -> Dict[str, tuple]:
+        """Map every markdown file to (mtime_ns, size) without reading it"""
+        stats = {}
+        root = str(self.content_dir)
+        if not os.path.isdir(root):
+            return stats
+        prefix = len(os.path.join(root, ''))
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                if name.endswith('.md'):
+                    full = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(full)
+                    except OSError:
+                        continue
+                    stats[full[prefix:]] = (st.st_mtime_ns, st.st_size)
+        return stats
+
+    def scan(self) -> 'VaultIndex':
+        """
+        Read every markdown file under content_dir once
+
+        With DISCOVERY_SCAN_WORKERS the files are parsed in parallel in
+        chunks of DISCOVERY_SCAN_CHUNK_SIZE; links are resolved afterwards
+        in this process.
+        """
+        with self._lock:
+            on_disk = self._stat_tree()
+            records, stats = {}, {}
+            for path, (record, digest) in self._parse_files(sorted(on_disk)).items():
+                records[path] = record
+                stats[path] = (*on_disk[path], digest)
+            self.records = records
+            self._stats = stats
+            self._loaded_for = str(self.content_dir)
+            self.rebuild()
+            self._save(
+                self._loaded_for,
+                {p: (r, stats[p]) for p, r in records.items()},
+                (), self._outgoing, replace=True
+            )
+            return self
+
+    def _load(self) -> bool:
+        """Restore records and link graph from the store"""
+        if self.store is None:
+            return False
+        try:
+            loaded = self.store.load(str(self.content_dir))
+        except sqlite3.Error as e:
+            print(f"Error loading discovery index, keeping it in memory: {e}")
+            self._store_failed = True
+            return False
+        if loaded is None:
+            return False
+
+        self.records, self._stats, outgoing = loaded
+        self._loaded_for = str(self.content_dir)
+        # The resolver is only needed once something changes
+        self._resolver = None
+        self._sources_by_key = None
+        self._outgoing = {}
+        self._backlinks = {r.path: set() for r in self.records.values() if r.published}
+        for path in self._backlinks:
+            self._outgoing[path] = set()
+        for source, targets in outgoing.items():
+            if source in self._outgoing:
+                self._set_outgoing(source, targets & self._backlinks.keys())
+        return True
+
+    def _stat_paths(self, paths) -> Dict[str, tuple]:
+        """Like _stat_tree, for just the given relative paths (missing ones left out)"""
+        stats = {}
+        for path in paths:
+            try:
+                st = os.stat(os.path.join(self.content_dir, path))
+            except OSError:
+                continue
+            stats[path] = (st.st_mtime_ns, st.st_size)
+        return stats
+
+    def refresh(self, paths=None) -> Dict[str, int]:
+        """
+        Bring the index up to date with the files on disk
+
+        Args:
+            paths: Only check these files, relative to content_dir (as
+                reported by a watcher); by default the whole tree is stat'ed
 
-                # Check if published
-                if 'publish: true' not in content:
+        Returns:
+            Counts of 'added', 'changed' and 'removed' files
+        """
+        with self._lock:
+            if self._loaded_for != str(self.content_dir) and not self._load():
+                self.scan()
+                self.generation += 1
+                return {'added': len(self.records), 'changed': 0, 'removed': 0}
+
+            self._last_resolved = set()
+            if paths is None:
+                on_disk = self._stat_tree()
+                removed = [p for p in self._stats if p not in on_disk]
+            else:
+                paths = {p for p in paths if p.endswith('.md')}
+                on_disk = self._stat_paths(paths)
+                removed = [p for p in paths if p in self._stats and p not in on_disk]
+            added, changed, touched = [], [], {}
+            for path, (mtime_ns, size) in on_disk.items():
+                known = self._stats.get(path)
+                if known is None:
+                    added.append(path)
+                elif known[:2] != (mtime_ns, size):
+                    changed.append(path)
+
+            updated = {}
+            for path, (record, digest) in self._parse_files(added + changed).items():
+                stat = (*on_disk[path], digest)
+                if digest is not None and path in self._stats and self._stats[path][2] == digest:
+                    # Touched but identical (e.g. a git checkout): just record the new stat
+                    touched[path] = (self.records[path], stat)
+                else:
+                    updated[path] = record
+                self._stats[path] = stat
+
+            if updated or removed:
+                self.apply(list(updated.values()), removed)
+            for path in removed:
+                self._stats.pop(path, None)
+
+            if updated or removed or touched:
+                pages = {p: (r, self._stats[p]) for p, r in updated.items()}
+                pages.update(touched)
+                self._save(
+                    self._loaded_for, pages, removed,
+                    {s: self._outgoing.get(s, set()) for s in self._last_resolved}
+                )
+            if updated or removed:
+                self.generation += 1
+            return {'added': len(added), 'changed': len(changed), 'removed': len(removed)}
+
+    def rebuild(self):
+        """Rebuild the resolver and backlinks from the records"""
+        with self._lock:
+            self._build_lookup()
+            self._outgoing = {}
+            self._backlinks = {r.path: set() for r in self.records.values() if r.published}
+            for path in self._backlinks:
+                self._outgoing[path] = set()
+            for record in self.records.values():
+                if record.published:
+                    self._resolve_source(record)
+
+    def _build_lookup(self):
+        """Index the records for link resolution"""
+        self._resolver = LinkResolver(self.records.values())
+        # Only incremental updates need sources by link key; built on demand
+        self._sources_by_key = None
+
+    def _index_sources(self):
+        """Index published pages by the lookup keys their links use"""
+        self._sources_by_key = {}
+        for record in self.records.values():
+            if record.published:
+                self._index_links(record)
+
+    def _index_links(self, record: PageRecord, remove: bool = False):
+        for link in record.links:
+            for key in link_keys(link):
+                if remove:
+                    sources = self._sources_by_key.get(key)
+                    if sources is not None:
+                        sources.discard(record.path)
+                        if not sources:
+                            del self._sources_by_key[key]
+                else:
+                    self._sources_by_key.setdefault(key, set()).add(record.path)
+
+    def _set_outgoing(self, source: str, targets: Set[str]):
+        old = self._outgoing.get(source, set())
+        for target in old - targets:
+            if target in self._backlinks:
+                self._backlinks[target].discard(source)
+        for target in targets - old:
+            self._backlinks[target].add(source)
+        self._outgoing[source] = targets
+
+    def _resolve_source(self, record: PageRecord):
+        targets = set()
+        for link in record.links:
+            target = self._resolver.resolve(link)
+            if target in self._backlinks and target != record.path:
+                targets.add(target)
+        self._set_outgoing(record.path, targets)
+
+    def apply(self, updated: List[PageRecord], removed: List[str]):
+        """
+        Apply added/changed records and deletions incrementally
+
+        Only links whose lookups involve a changed page are re-resolved.
+        """
+        with self._lock:
+            if self._backlinks is None:
+                self.rebuild()
+            elif self._resolver is None:
+                self._build_lookup()
+            if self._sources_by_key is None:
+                self._index_sources()
+
+            affected_keys: Set[tuple] = set()
+            resolve: Set[str] = set()
+
+            for path in removed + [r.path for r in updated]:
+                old = self.records.pop(path, None)
+                if old is None:
                     continue
+                affected_keys |= LinkResolver.keys(old)
+                self._resolver.remove(old)
+                if old.published:
+                    self._index_links(old, remove=True)
+                    self._set_outgoing(path, set())
+                    del self._outgoing[path]
+                    # Sources that linked here are re-resolved via affected_keys
+                    for source in self._backlinks.pop(path):
+                        self._outgoing[source].discard(path)
+
+            for record in updated:
+                self.records[record.path] = record
+                affected_keys |= LinkResolver.keys(record)
+                self._resolver.add(record)
+                if record.published:
+                    self._backlinks[record.path] = set()
+                    self._outgoing[record.path] = set()
+                    self._index_links(record)
+                    resolve.add(record.path)
+
+            for key in affected_keys:
+                resolve |= self._sources_by_key.get(key, set())
+
+            for path in resolve:
+                self._resolve_source(self.records[path])
+            self._last_resolved = resolve
 
-                # Extract metadata
-                title_match = re.search(r'title:\s*([^\n]+)', content)
-                title = title_match.group(1).strip() if title_match else md_file.stem
+    def published(self) -> List[PageRecord]:
+        return [record for record in self.records.values() if record.published]
 
-                tags_match = re.search(r'tags:\s*\[(.*?)\]', content, re.DOTALL)
-                tags = []
-                if tags_match:
-                    tags_str = tags_match.group(1)
-                    tags = [t.strip().strip('"\'') for t in tags_str.split(',')]
+    def backlinks(self) -> Dict[str, Set[str]]:
+        """
+        Map each published page to the published pages linking to it
 
-                date_match = re.search(r'date:\s*([^\n]+)', content)
-                date = date_match.group(1).strip() if date_match else None
+        Links are resolved with LinkResolver, as the built site does.
+        """
+        with self._lock:
+            if self._backlinks is None:
+                self.rebuild()
+            return self._backlinks
 
-                rel_path = str(md_file.relative_to(content_dir))
-                metadata[rel_path] = {
-                    'title': title,
-                    'tags': tags,
-                    'date': date,
+    def orphans(self) -> List[str]:
+        """Published pages, other than index.md files, with no backlinks"""
+        with self._lock:
+            return sorted(
+                path for path, sources in self.backlinks().items()
+                if not sources and Path(path).name != 'index.md'
+            )
+
+    def metadata(self) -> Dict[str, dict]:
+        """Title, tags and date of every published page"""
+        with self._lock:
+            return {
+                record.path: {
+                    'title': record.title or Path(record.path).stem,
+                    'tags': list(record.tags),
+                    'date': record.date,
                 }
+                for record in self.published()
+            }
+
+    def stats(self) -> dict:
+        return {
+            'pages': len(self.records),
+            'published': sum(1 for r in self.records.values() if r.published),
+            'generation': self.generation,
+        }
+
+
+vault_index = VaultIndex(persistent=True)
+
+
+class Inotify:
+    """
+    Minimal inotify binding (Linux, via libc) for watching a directory tree
+
+    Raises OSError from the constructor where inotify is not available.
+    """
+
+    MODIFY = 0x2
+    ATTRIB = 0x4
+    CLOSE_WRITE = 0x8
+    MOVED_FROM = 0x40
+    MOVED_TO = 0x80
+    CREATE = 0x100
+    DELETE = 0x200
+    DELETE_SELF = 0x400
+    MOVE_SELF = 0x800
+    Q_OVERFLOW = 0x4000
+    IGNORED = 0x8000
+    ISDIR = 0x40000000
+
+    WATCH_MASK = (ATTRIB | CLOSE_WRITE | MOVED_FROM | MOVED_TO | CREATE
+                  | DELETE | DELETE_SELF | MOVE_SELF)
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self):
+        if not hasattr(os, 'O_CLOEXEC'):
+            raise OSError("inotify is not available on this platform")
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify is not available on this platform")
+        self._libc = libc
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs: Dict[int, str] = {}
+        # Writing to the pipe wakes a blocked read (used to stop the watcher)
+        self._wake_r, self._wake_w = os.pipe()
+
+    def wake(self):
+        os.write(self._wake_w, b'x')
+
+    def watch_tree(self, root: str):
+        """Watch root and every non-hidden directory below it (idempotent)"""
+        for dirpath, dirnames, _ in os.walk(root):
+            # content/ is a git checkout; .git churns on every pull
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dirpath), self.WATCH_MASK)
+            if wd >= 0:
+                self.dirs[wd] = dirpath
+
+    def read(self, timeout: float) -> List[tuple]:
+        """
+        Wait up to timeout seconds for events
+
+        Returns:
+            (mask, path) pairs; path is None for a queue overflow
+        """
+        ready = select.select([self.fd, self._wake_r], [], [], timeout)[0]
+        if self._wake_r in ready:
+            os.read(self._wake_r, 64)
+        if self.fd not in ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events, offset = [], 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & self.Q_OVERFLOW:
+                events.append((mask, None))
+                continue
+            directory = self.dirs.get(wd)
+            if mask & self.IGNORED:
+                self.dirs.pop(wd, None)
+            if directory is not None:
+                path = os.path.join(directory, os.fsdecode(name)) if name else directory
+                events.append((mask, path))
+        return events
+
+    def close(self):
+        for fd in (self.fd, self._wake_r, self._wake_w):
+            os.close(fd)
+
+
+class VaultWatcher:
+    """
+    Background thread keeping vault_index in step with content/
+
+    Uses inotify where available and otherwise polls with a stat pass every
+    DISCOVERY_WATCH_POLL_SECONDS. Changes are applied once the vault has
+    been quiet for DISCOVERY_WATCH_DEBOUNCE_SECONDS, so a ``git pull`` that
+    touches hundreds of notes becomes one incremental update (one
+    generation bump) instead of hundreds.
+    """
+
+    # Apply a burst that never goes quiet after this many debounce periods
+    MAX_DELAY_PERIODS = 10
+
+    def __init__(self, index: VaultIndex = None, backend: str = None,
+                 debounce_seconds: float = None, poll_seconds: float = None):
+        self.index = index if index is not None else vault_index
+        self._backend = backend
+        self._debounce_seconds = debounce_seconds
+        self._poll_seconds = poll_seconds
+        self._thread: Optional[threading.Thread] = None
+        self._inotify: Optional[Inotify] = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.mode = None
+        self.events = 0
+        self.batches = 0
+        self.last_applied = None
+
+    @property
+    def backend(self) -> str:
+        return Config.DISCOVERY_WATCH_BACKEND if self._backend is None else self._backend
+
+    @property
+    def debounce_seconds(self) -> float:
+        if self._debounce_seconds is None:
+            return Config.DISCOVERY_WATCH_DEBOUNCE_SECONDS
+        return self._debounce_seconds
+
+    @property
+    def poll_seconds(self) -> float:
+        if self._poll_seconds is None:
+            return Config.DISCOVERY_WATCH_POLL_SECONDS
+        return self._poll_seconds
+
+    @property
+    def running(self) -> bool:
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Bring the index up to date and start watching, unless already running in this process"""
+        if self.running:
+            return
+        with self._lock:
+            if self.running:
+                return
+            # Threads do not survive fork, so a forked worker starts its own
+            inotify = None
+            if self.backend in ('auto', 'inotify'):
+                try:
+                    inotify = Inotify()
+                    inotify.watch_tree(str(self.index.content_dir))
+                except OSError as e:
+                    if self.backend == 'inotify':
+                        raise
+                    print(f"inotify unavailable ({e}), polling {self.index.content_dir}")
+                    inotify = None
+            # Watches are in place first, so nothing changes unseen after this
+            self.index.refresh()
+            self.mode = 'inotify' if inotify is not None else 'poll'
+            self._inotify = inotify
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run_inotify if inotify is not None else self._run_poll,
+                name='vault-watcher', daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        """Stop watching (pending changes are dropped; the next start re-syncs)"""
+        self._stop.set()
+        if self._inotify is not None and self.running:
+            self._inotify.wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        self._inotify = None
+
+    def _apply(self, paths=None):
+        try:
+            changes = self.index.refresh(paths)
         except Exception as e:
-            print(f"Error extracting metadata from {md_file}: {e}")
-            continue
+            print(f"Error updating discovery index: {e}")
+            return
+        if any(changes.values()):
+            self.batches += 1
+            self.last_applied = time.time()
+
+    def _run_inotify(self):
+        inotify = self._inotify
+        root = str(self.index.content_dir)
+        prefix = len(os.path.join(root, ''))
+        pending: Set[str] = set()
+        full = False
+        first_event = last_event = None
+        try:
+            while not self._stop.is_set():
+                timeout = 1.0
+                if last_event is not None:
+                    deadline = min(last_event + self.debounce_seconds,
+                                   first_event + self.debounce_seconds * self.MAX_DELAY_PERIODS)
+                    timeout = max(0.0, min(timeout, deadline - time.monotonic()))
+                    if timeout == 0.0:
+                        self._apply(None if full else pending)
+                        pending, full = set(), False
+                        first_event = last_event = None
+                        continue
+
+                events = inotify.read(timeout)
+                if not events:
+                    continue
+                now = time.monotonic()
+                first_event = first_event or now
+                last_event = now
+                for mask, path in events:
+                    self.events += 1
+                    if path is None or mask & (Inotify.ISDIR | Inotify.DELETE_SELF | Inotify.MOVE_SELF):
+                        # Directory created, moved or removed: re-stat the whole tree
+                        full = True
+                        if path is None or mask & (Inotify.CREATE | Inotify.MOVED_TO):
+                            inotify.watch_tree(root)
+                    elif path.endswith('.md') and path.startswith(root):
+                        pending.add(path[prefix:])
+        finally:
+            inotify.close()
+
+    def _run_poll(self):
+        while not self._stop.wait(self.poll_seconds):
+            with self.index._lock:
+                indexed = {path: stat[:2] for path, stat in self.index._stats.items()}
+            snapshot = self.index._stat_tree()
+            if snapshot == indexed:
+                continue
+            # Wait for the tree to stop changing before applying
+            started = time.monotonic()
+            while not self._stop.wait(self.debounce_seconds):
+                latest = self.index._stat_tree()
+                if latest == snapshot:
+                    break
+                snapshot = latest
+                if time.monotonic() - started >= self.debounce_seconds * self.MAX_DELAY_PERIODS:
+                    break
+            if not self._stop.is_set():
+                self.events += 1
+                self._apply()
+
+    def stats(self) -> dict:
+        return {
+            'running': self.running,
+            'mode': self.mode,
+            'events': self.events,
+            'batches': self.batches,
+            'last_applied': self.last_applied,
+        }
+
+
+watcher = VaultWatcher()
+
+
+def find_orphaned_pages(content_dir: str = None) -> List[str]:
+    """
+    Find published pages with no incoming backlinks
 
-    return metadata
+    Analyzes all markdown files in the content directory, finds [[wikilinks]],
+    and identifies pages that have no other pages linking to them.
+
+    Args:
+        content_dir: Path to content directory (defaults to ../content)
+
+    Returns:
+        List of orphaned page paths relative to content_dir
+    """
+    return VaultIndex(content_dir).scan().orphans()
+
+
+def get_page_metadata(content_dir: str = None) -> Dict[str, dict]:
+    """
+    Get metadata for all published pages
+
+    Args:
+        content_dir: Path to content directory
+
+    Returns:
+        Dict mapping page path to metadata (title, tags, date)
+    """
+    return VaultIndex(content_dir).scan().metadata()
 
 
 if __name__ == '__main__':
     # Test the discovery functions
-    orphans = find_orphaned_pages()
+    index = VaultIndex().scan()
+    orphans = index.orphans()
     print(f"Found {len(orphans)} orphaned pages:")
     for orphan in orphans:
         print(f"  - {orphan}")
 
     print("\nPage metadata:")
-    metadata = get_page_metadata()
-    for page, data in metadata.items():
+    for page, data in index.metadata().items():
         print(f"  {page}: {data}")
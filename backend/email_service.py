@@ -1,23 +1,208 @@
+import json
+import os
+import threading
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 from config import Config
 
 
-def send_magic_link(email: str, magic_link_url: str, blog_title: str = "My Blog") -> bool:
+# Mailgun refused the message itself (bad recipient, too large, ...).
+# 401/403/404 are not in here: they mean a wrong API key or domain, which
+# affects every message and should be retried once the config is fixed
+REJECTED_STATUSES = frozenset({400, 413, 422})
+
+
+class MailgunRejected(Exception):
+    """Mailgun refused the message itself (REJECTED_STATUSES); resending cannot help"""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"Mailgun rejected the message ({status_code}): {message}")
+        self.status_code = status_code
+
+
+class CircuitBreaker:
     """
-    Send a magic link via Mailgun
+    Fail fast while Mailgun is down
 
-    Args:
-        email: Recipient email address
-        magic_link_url: Full URL to the magic link (e.g., https://yourdomain.com/auth/verify/token)
-        blog_title: Name of the blog
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    sends are rejected immediately. Once ``reset_seconds`` have passed it
+    half-opens and lets a single trial request through: success closes it,
+    failure opens it again.
+    """
 
-    Returns:
-        True if email was sent successfully, False otherwise
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = None, reset_seconds: float = None):
+        self._failure_threshold = failure_threshold
+        self._reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def failure_threshold(self) -> int:
+        if self._failure_threshold is None:
+            return Config.MAILGUN_BREAKER_THRESHOLD
+        return self._failure_threshold
+
+    @property
+    def reset_seconds(self) -> float:
+        if self._reset_seconds is None:
+            return Config.MAILGUN_BREAKER_RESET_SECONDS
+        return self._reset_seconds
+
+    def reset(self):
+        """Close the breaker and forget past failures"""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = 0.0
+            self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Return True if a request may be attempted now"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                return False
+            # Half-open: let exactly one trial request through
+            if self._trial_in_flight:
+                return False
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        state = self.state
+        with self._lock:
+            return {'state': state, 'consecutive_failures': self._failures}
+
+
+class SendMetrics:
+    """Counters and latency totals for Mailgun sends"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.sent = 0
+            self.failed = 0
+            self.rejected = 0
+            self.latency_total = 0.0
+            self.latency_max = 0.0
+
+    def record(self, ok: bool, latency: float):
+        with self._lock:
+            if ok:
+                self.sent += 1
+            else:
+                self.failed += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            attempts = self.sent + self.failed
+            return {
+                'sent': self.sent,
+                'failed': self.failed,
+                'rejected_by_breaker': self.rejected,
+                'latency_avg_ms': self.latency_total / attempts * 1000 if attempts else 0.0,
+                'latency_max_ms': self.latency_max * 1000,
+            }
+
+
+breaker = CircuitBreaker()
+send_metrics = SendMetrics()
+
+_http_session = None
+_http_session_pid = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
     """
-    if not Config.MAILGUN_API_KEY or not Config.MAILGUN_DOMAIN:
-        print("Warning: Mailgun not configured. Email not sent.")
-        return False
+    Shared keep-alive session for Mailgun
+
+    Connections are pooled so consecutive sends reuse the TCP+TLS connection.
+    Only connection errors, 429 and 503 are retried: Mailgun never accepted
+    those messages, so retrying cannot duplicate mail. 502/504 are not, as a
+    gateway timeout does not prove the message was refused. Retry-After is
+    ignored: a long wait would block the sender (or the login request)
+    past the outbox lease, so longer pauses are left to the outbox backoff.
+    """
+    global _http_session, _http_session_pid
+
+    if _http_session is not None and _http_session_pid == os.getpid():
+        return _http_session
+
+    with _http_session_lock:
+        # Sockets must not be shared with a forked parent
+        if _http_session is None or _http_session_pid != os.getpid():
+            retry = Retry(
+                total=Config.MAILGUN_RETRIES,
+                connect=Config.MAILGUN_RETRIES,
+                read=0,
+                status_forcelist=(429, 503),
+                allowed_methods=frozenset({'POST'}),
+                backoff_factor=0.2,
+                respect_retry_after_header=False,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=Config.MAILGUN_POOL_SIZE,
+                max_retries=retry,
+            )
+            http = requests.Session()
+            http.mount('https://', adapter)
+            http.mount('http://', adapter)
+            _http_session = http
+            _http_session_pid = os.getpid()
+
+    return _http_session
+
+
+def metrics() -> dict:
+    """Send latency and circuit breaker state"""
+    return {**send_metrics.stats(), 'breaker': breaker.stats()}
+
 
+def _render_magic_link(magic_link_url: str, blog_title: str, expires_in: str) -> tuple[str, str]:
+    """Build the (text, html) bodies of a magic link email"""
     html_content = f"""
     <html>
         <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
@@ -35,7 +220,7 @@ def send_magic_link(email: str, magic_link_url: str, blog_title: str = "My Blog"
                 {magic_link_url}
             </p>
             <p style="color: #999; font-size: 12px;">
-                This link expires in 15 minutes. If you didn't request this link, you can safely ignore this email.
+                This link expires in {expires_in}. If you didn't request this link, you can safely ignore this email.
             </p>
         </body>
     </html>
@@ -47,29 +232,140 @@ Welcome to {blog_title}
 Click the link below to log in:
 {magic_link_url}
 
-This link expires in 15 minutes.
+This link expires in {expires_in}.
 If you didn't request this link, you can safely ignore this email.
     """
 
+    return text_content, html_content
+
+
+def _post_message(data: dict, raise_on_reject: bool = False) -> bool:
+    """
+    POST a message to Mailgun through the circuit breaker
+
+    A status in REJECTED_STATUSES means Mailgun is up but refused this
+    message and does not count toward opening the breaker. Everything else
+    that is not a 200 (connection errors, timeouts, 429, 5xx, and 401/403/404
+    from a wrong API key or domain) does.
+
+    Args:
+        data: Form fields of the message
+        raise_on_reject: Raise MailgunRejected for such a refusal instead of
+            returning False
+
+    Returns:
+        True if Mailgun accepted the message
+    """
+    if not breaker.allow():
+        print("Warning: Mailgun circuit breaker is open. Email not sent.")
+        send_metrics.record_rejected()
+        return False
+
+    start = time.monotonic()
+    rejected = None
     try:
-        response = requests.post(
-            f"https://api.mailgun.net/v3/{Config.MAILGUN_DOMAIN}/messages",
+        response = get_http_session().post(
+            f"{Config.MAILGUN_API_BASE}/{Config.MAILGUN_DOMAIN}/messages",
             auth=("api", Config.MAILGUN_API_KEY),
-            data={
-                "from": f"{blog_title} <{Config.FROM_EMAIL}>",
-                "to": email,
-                "subject": f"Your login link for {blog_title}",
-                "text": text_content,
-                "html": html_content,
-            },
-            timeout=10
+            data=data,
+            timeout=(Config.MAILGUN_CONNECT_TIMEOUT, Config.MAILGUN_READ_TIMEOUT)
         )
-
-        return response.status_code == 200
+        ok = response.status_code == 200
+        if response.status_code in REJECTED_STATUSES:
+            rejected = MailgunRejected(response.status_code, response.text[:200])
+        elif not ok:
+            print(f"Error sending email: Mailgun returned {response.status_code}")
     except Exception as e:
         print(f"Error sending email: {e}")
+        ok = False
+
+    send_metrics.record(ok, time.monotonic() - start)
+    if ok or rejected is not None:
+        breaker.record_success()
+    else:
+        breaker.record_failure()
+
+    if rejected is not None:
+        print(f"Error sending email: {rejected}")
+        if raise_on_reject:
+            raise rejected
+    return ok
+
+
+def send_magic_link(email: str, magic_link_url: str, blog_title: str = "My Blog",
+                    raise_on_reject: bool = False) -> bool:
+    """
+    Send a magic link via Mailgun
+
+    Args:
+        email: Recipient email address
+        magic_link_url: Full URL to the magic link (e.g., https://yourdomain.com/auth/verify/token)
+        blog_title: Name of the blog
+        raise_on_reject: Raise MailgunRejected if Mailgun refuses the
+            message (e.g. a bad recipient) rather than returning False
+
+    Returns:
+        True if email was sent successfully, False otherwise
+    """
+    if not Config.MAILGUN_API_KEY or not Config.MAILGUN_DOMAIN:
+        print("Warning: Mailgun not configured. Email not sent.")
         return False
 
+    text_content, html_content = _render_magic_link(magic_link_url, blog_title, "15 minutes")
+
+    return _post_message({
+        "from": f"{blog_title} <{Config.FROM_EMAIL}>",
+        "to": email,
+        "subject": f"Your login link for {blog_title}",
+        "text": text_content,
+        "html": html_content,
+    }, raise_on_reject=raise_on_reject)
+
+
+def send_magic_links_batch(links: dict[str, str], blog_title: str = "My Blog",
+                           expires_in: str = "15 minutes", progress=None) -> dict[str, bool]:
+    """
+    Send many magic links with Mailgun batch sending
+
+    Each API call carries up to MAILGUN_BATCH_SIZE recipients; Mailgun
+    substitutes every recipient's own link via ``recipient-variables``, and
+    each recipient only sees their own address.
+
+    Args:
+        links: Mapping of recipient email to magic link URL
+        blog_title: Name of the blog
+        expires_in: Human readable link lifetime shown in the email
+        progress: Optional callback(done, total) called after each batch
+
+    Returns:
+        Dict mapping each email to True if its batch was accepted
+    """
+    results = {email: False for email in links}
+    if not Config.MAILGUN_API_KEY or not Config.MAILGUN_DOMAIN:
+        print("Warning: Mailgun not configured. Email not sent.")
+        return results
+
+    text_content, html_content = _render_magic_link("%recipient.link%", blog_title, expires_in)
+    emails = list(links)
+    batch_size = max(1, min(Config.MAILGUN_BATCH_SIZE, 1000))
+
+    for start in range(0, len(emails), batch_size):
+        batch = emails[start:start + batch_size]
+        ok = _post_message({
+            "from": f"{blog_title} <{Config.FROM_EMAIL}>",
+            "to": batch,
+            "subject": f"Your login link for {blog_title}",
+            "text": text_content,
+            "html": html_content,
+            "recipient-variables": json.dumps({email: {"link": links[email]} for email in batch}),
+        })
+        for email in batch:
+            results[email] = ok
+        if progress:
+            progress(start + len(batch), len(emails))
+
+    return results
+
 
 def is_valid_email(email: str) -> bool:
     """Basic email validation"""
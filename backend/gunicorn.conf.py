@@ -0,0 +1,68 @@
+"""
+Gunicorn settings for production
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Worker and thread counts come from Config (WEB_* environment variables).
+With more than one worker, rate limit counters default to a SQLite file next
+to DATABASE_PATH unless RATELIMIT_STORAGE_URI is set.
+With WEB_PRELOAD the app is imported and the database migrated once in the
+master before workers are forked.
+
+Signals:
+    HUP   start fresh workers, then gracefully stop the old ones once their
+          in-flight requests finish (code is re-imported only when
+          WEB_PRELOAD=False)
+    USR2  start a new master with the new code; follow with WINCH and QUIT
+          to the old master for a zero-downtime code upgrade
+    TERM  graceful shutdown, waiting up to WEB_GRACEFUL_TIMEOUT seconds
+"""
+
+import os
+
+from config import Config
+
+bind = Config.WEB_BIND
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+worker_class = 'gthread'
+timeout = Config.WEB_TIMEOUT
+graceful_timeout = Config.WEB_GRACEFUL_TIMEOUT
+keepalive = 5
+preload_app = Config.WEB_PRELOAD
+accesslog = '-'
+
+# memory:// would count the login rate limit separately in every worker, so
+# unless a store was chosen explicitly share a SQLite file next to the database
+if workers > 1 and not os.getenv('RATELIMIT_STORAGE_URI'):
+    _ratelimit_dir = os.path.dirname(os.path.abspath(Config.DATABASE_PATH))
+    os.makedirs(_ratelimit_dir, exist_ok=True)
+    Config.RATELIMIT_STORAGE_URI = 'sqlite:///' + os.path.join(_ratelimit_dir, 'ratelimit.db')
+
+
+def post_fork(server, worker):
+    # Connections and threads never survive fork; make sure nothing from the
+    # master is reused (pools and workers restart lazily in each process)
+    import models
+    models.close_all()
+
+    # Drain messages left queued, backed off or mid-lease by the previous
+    # worker instead of waiting for the next /auth/request-link
+    if Config.EMAIL_OUTBOX_ENABLED:
+        import outbox
+        outbox.worker.start()
+
+    # Each worker watches content/ for its own in-memory discovery index
+    if Config.DISCOVERY_WATCH:
+        import discovery
+        discovery.watcher.start()
+
+
+def worker_exit(server, worker):
+    # Write buffered session activity and let queued emails finish
+    import discovery
+    import models
+    import outbox
+    models.last_accessed_buffer.flush()
+    outbox.worker.stop()
+    discovery.watcher.stop()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Bulk invite script
+
+Mints magic links for a list of email addresses in one database
+transaction and mails them with Mailgun batch sending.
+
+Usage:
+    python3 invite.py emails.txt        # one address per line
+    python3 invite.py - < emails.txt
+"""
+
+import sys
+from email_service import is_valid_email, send_magic_links_batch
+from models import MagicLink
+from config import Config
+
+
+def _describe_minutes(minutes: int) -> str:
+    """Human readable link lifetime, e.g. '15 minutes' or '7 days'"""
+    for unit, size in (('day', 24 * 60), ('hour', 60)):
+        if minutes >= size and minutes % size == 0:
+            count = minutes // size
+            return f"{count} {unit}{'s' if count != 1 else ''}"
+    return f"{minutes} minute{'s' if minutes != 1 else ''}"
+
+
+def invite(emails: list[str], progress=None) -> list[dict]:
+    """
+    Create and send magic links for many recipients
+
+    Args:
+        emails: Recipient addresses (normalized, de-duplicated and validated here)
+        progress: Optional callback(done, total) called after each Mailgun batch
+
+    Returns:
+        One result per input address: {'email', 'status'} where status is
+        'sent', 'failed', 'invalid' or 'duplicate'
+    """
+    results = []
+    valid = []
+    seen = set()
+
+    for raw in emails:
+        email = raw.strip().lower()
+        if not email or not is_valid_email(email):
+            results.append({'email': raw.strip(), 'status': 'invalid'})
+        elif email in seen:
+            results.append({'email': email, 'status': 'duplicate'})
+        else:
+            seen.add(email)
+            valid.append(email)
+            results.append({'email': email, 'status': None})
+
+    if valid:
+        tokens = MagicLink.create_many(valid, expiration_minutes=Config.INVITE_EXPIRATION_MINUTES)
+        links = {
+            email: f"{Config.BASE_URL}/auth/verify/{token}"
+            for email, token in tokens.items()
+        }
+        sent = send_magic_links_batch(
+            links,
+            expires_in=_describe_minutes(Config.INVITE_EXPIRATION_MINUTES),
+            progress=progress,
+        )
+        for result in results:
+            if result['status'] is None:
+                result['status'] = 'sent' if sent[result['email']] else 'failed'
+
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(2)
+
+    source = sys.stdin if sys.argv[1] == '-' else open(sys.argv[1], encoding='utf-8')
+    with source:
+        addresses = [line for line in source if line.strip()]
+
+    results = invite(
+        addresses,
+        progress=lambda done, total: print(f"… sent batch ({done}/{total})")
+    )
+
+    for result in results:
+        mark = '✓' if result['status'] == 'sent' else '✗'
+        print(f"{mark} {result['email']}: {result['status']}")
+
+    failed = sum(1 for r in results if r['status'] != 'sent')
+    print(f"✓ Invited {len(results) - failed} of {len(results)} addresses")
+    sys.exit(0 if failed == 0 else 1)
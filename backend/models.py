@@ -1,53 +1,295 @@
+import atexit
+import logging
+import queue
 import sqlite3
 import secrets
 import string
-from datetime import datetime, timedelta
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
+from flask import g, has_app_context
 from config import Config
 
+logger = logging.getLogger(__name__)
+
+# Unix epoch seconds, evaluated by SQLite
+_EPOCH_NOW = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+# Schema migrations; MIGRATIONS[n] upgrades a database from user_version n to n + 1
+MIGRATIONS = [
+    # 1: Original schema with text timestamps
+    [
+        """
+        CREATE TABLE IF NOT EXISTS magic_links (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT NOT NULL,
+            token TEXT NOT NULL UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP NOT NULL,
+            used BOOLEAN DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL UNIQUE,
+            email TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS revoked_sessions (
+            session_id TEXT PRIMARY KEY,
+            revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ],
+    # 2: Integer epoch timestamps and secondary indexes
+    [
+        f"""
+        CREATE TABLE magic_links_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT NOT NULL,
+            token TEXT NOT NULL UNIQUE,
+            created_at INTEGER NOT NULL DEFAULT ({_EPOCH_NOW}),
+            expires_at INTEGER NOT NULL,
+            used INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        f"""
+        INSERT INTO magic_links_new (id, email, token, created_at, expires_at, used)
+        SELECT id, email, token,
+               COALESCE(CAST(strftime('%s', created_at) AS INTEGER), {_EPOCH_NOW}),
+               COALESCE(CAST(strftime('%s', expires_at) AS INTEGER), 0),
+               COALESCE(used, 0)
+        FROM magic_links
+        """,
+        "DROP TABLE magic_links",
+        "ALTER TABLE magic_links_new RENAME TO magic_links",
+        f"""
+        CREATE TABLE sessions_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL UNIQUE,
+            email TEXT NOT NULL,
+            created_at INTEGER NOT NULL DEFAULT ({_EPOCH_NOW}),
+            last_accessed INTEGER NOT NULL DEFAULT ({_EPOCH_NOW})
+        )
+        """,
+        f"""
+        INSERT INTO sessions_new (id, session_id, email, created_at, last_accessed)
+        SELECT id, session_id, email,
+               COALESCE(CAST(strftime('%s', created_at) AS INTEGER), {_EPOCH_NOW}),
+               COALESCE(CAST(strftime('%s', last_accessed) AS INTEGER), {_EPOCH_NOW})
+        FROM sessions
+        """,
+        "DROP TABLE sessions",
+        "ALTER TABLE sessions_new RENAME TO sessions",
+        f"""
+        CREATE TABLE revoked_sessions_new (
+            session_id TEXT PRIMARY KEY,
+            revoked_at INTEGER NOT NULL DEFAULT ({_EPOCH_NOW})
+        )
+        """,
+        f"""
+        INSERT INTO revoked_sessions_new (session_id, revoked_at)
+        SELECT session_id, COALESCE(CAST(strftime('%s', revoked_at) AS INTEGER), {_EPOCH_NOW})
+        FROM revoked_sessions
+        """,
+        "DROP TABLE revoked_sessions",
+        "ALTER TABLE revoked_sessions_new RENAME TO revoked_sessions",
+        "CREATE INDEX idx_magic_links_expires_at ON magic_links (expires_at)",
+        "CREATE INDEX idx_magic_links_email ON magic_links (email)",
+        "CREATE INDEX idx_sessions_created_at ON sessions (created_at)",
+        "CREATE INDEX idx_sessions_last_accessed ON sessions (last_accessed)",
+        "CREATE INDEX idx_sessions_email ON sessions (email)",
+        "CREATE INDEX idx_revoked_sessions_revoked_at ON revoked_sessions (revoked_at)",
+    ],
+    # 3: Outbox of magic link emails waiting to be sent
+    [
+        f"""
+        CREATE TABLE email_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT NOT NULL,
+            magic_link_url TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at INTEGER NOT NULL DEFAULT ({_EPOCH_NOW}),
+            last_error TEXT,
+            created_at INTEGER NOT NULL DEFAULT ({_EPOCH_NOW}),
+            sent_at INTEGER
+        )
+        """,
+        "CREATE INDEX idx_email_outbox_due ON email_outbox (status, next_attempt_at)",
+    ],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Bring a database up to SCHEMA_VERSION
+
+    The current version is tracked in ``PRAGMA user_version``. Each step runs
+    in its own ``BEGIN IMMEDIATE`` transaction, so concurrent workers starting
+    up at once apply every migration exactly once.
+
+    Returns:
+        The schema version after migrating
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    while version < SCHEMA_VERSION:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-read under the write lock in case another process migrated
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                for statement in MIGRATIONS[version]:
+                    conn.execute(statement)
+                version += 1
+                conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info(f"Database migrated to schema version {version}")
+    return version
+
+
 class Database:
-    """Database initialization and connection"""
+    """Database initialization and pooled connections
 
-    def __init__(self, db_path: str = None):
+    Connections are kept in a small per-database pool and reused across
+    calls instead of being opened and closed for every query. Inside a Flask
+    app context a single connection is checked out for the whole request and
+    returned to the pool on teardown (see ``init_app``).
+    """
+
+    def __init__(self, db_path: str = None, pool_size: int = None, pragmas: dict = None):
         self.db_path = db_path or Config.DATABASE_PATH
+        self.pool_size = Config.DATABASE_POOL_SIZE if pool_size is None else pool_size
+        self.pragmas = Config.SQLITE_PRAGMAS if pragmas is None else pragmas
+        self._pool = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self.connections_opened = 0
         self.init_db()
 
-    def get_connection(self):
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
+    def _open(self) -> sqlite3.Connection:
+        """Open a new connection that may be shared between threads"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
         conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        with self._lock:
+            self.connections_opened += 1
         return conn
 
+    def acquire(self) -> sqlite3.Connection:
+        """Check a connection out of the pool, opening one if none is idle"""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._open()
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool, closing it if the pool is full"""
+        if conn.in_transaction:
+            conn.rollback()
+        if self._pool.qsize() < self.pool_size:
+            self._pool.put(conn)
+        else:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a ``with`` block
+
+        Within a Flask app context the connection is bound to ``g`` so every
+        query in the request shares it; it is released by ``close_request_connections``.
+        """
+        if has_app_context():
+            conns = g.setdefault('_db_connections', {})
+            conn = conns.get(self.db_path)
+            if conn is None:
+                conn = conns[self.db_path] = self.acquire()
+            yield conn
+            return
+
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def get_connection(self):
+        """Get a new, unpooled database connection (caller must close it)"""
+        return self._open()
+
+    def close_all(self):
+        """Close every idle pooled connection"""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+
     def init_db(self):
-        """Initialize database with required tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # Create magic_links table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS magic_links (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT NOT NULL,
-                token TEXT NOT NULL UNIQUE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                expires_at TIMESTAMP NOT NULL,
-                used BOOLEAN DEFAULT 0
-            )
-        """)
-
-        # Create sessions table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT NOT NULL UNIQUE,
-                email TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_accessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        """Initialize or upgrade the schema in place (see ``MIGRATIONS``)"""
+        with self.connection() as conn:
+            migrate(conn)
+
+
+_databases: dict[str, Database] = {}
+_databases_lock = threading.Lock()
+
+
+def get_db(db_path: str = None) -> Database:
+    """
+    Get the shared Database for a path
+
+    The schema is initialized once, the first time a path is requested,
+    rather than on every query.
+    """
+    db_path = db_path or Config.DATABASE_PATH
+    db = _databases.get(db_path)
+    if db is None:
+        with _databases_lock:
+            db = _databases.get(db_path)
+            if db is None:
+                db = _databases[db_path] = Database(db_path)
+    return db
+
+
+def close_request_connections(exc=None):
+    """Return connections checked out by the current app context to their pools"""
+    conns = g.pop('_db_connections', None)
+    if not conns:
+        return
+    for db_path, conn in conns.items():
+        db = _databases.get(db_path)
+        if db is not None:
+            db.release(conn)
+        else:
+            conn.close()
+
+
+def close_all():
+    """Close idle connections of every shared Database (e.g. at shutdown)"""
+    with _databases_lock:
+        databases = list(_databases.values())
+        _databases.clear()
+    for db in databases:
+        db.close_all()
+
 
-        conn.commit()
-        conn.close()
+def init_app(app):
+    """Release connections checked out during a request on app context teardown"""
+    app.teardown_appcontext(close_request_connections)
 
 
 class MagicLink:
@@ -67,15 +309,11 @@ class MagicLink:
         Returns:
             token: The generated token
         """
-        db = Database()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-
         token = MagicLink.generate_token()
-        expires_at = datetime.utcnow() + timedelta(minutes=expiration_minutes)
+        expires_at = int(time.time()) + expiration_minutes * 60
 
-        try:
-            cursor.execute(
+        with get_db().connection() as conn:
+            conn.execute(
                 """
                 INSERT INTO magic_links (email, token, expires_at)
                 VALUES (?, ?, ?)
@@ -84,8 +322,49 @@ class MagicLink:
             )
             conn.commit()
             return token
-        finally:
-            conn.close()
+
+    @staticmethod
+    def create_many(emails: list[str], expiration_minutes: int = 15) -> dict[str, str]:
+        """
+        Create magic link tokens for many emails in a single transaction
+
+        Returns:
+            Dict mapping each email to its generated token
+        """
+        expires_at = int(time.time()) + expiration_minutes * 60
+        tokens = {email: MagicLink.generate_token() for email in emails}
+
+        with get_db().connection() as conn:
+            conn.executemany(
+                """
+                INSERT INTO magic_links (email, token, expires_at)
+                VALUES (?, ?, ?)
+                """,
+                [(email, token, expires_at) for email, token in tokens.items()]
+            )
+            conn.commit()
+            return tokens
+
+    @staticmethod
+    def find_recent(email: str, within_seconds: int) -> str | None:
+        """
+        Find an unused, unexpired token created for email in the last within_seconds
+
+        Returns:
+            token: The most recent matching token, or None
+        """
+        now = int(time.time())
+        with get_db().connection() as conn:
+            row = conn.execute(
+                """
+                SELECT token FROM magic_links
+                WHERE email = ? AND used = 0 AND expires_at >= ? AND created_at >= ?
+                ORDER BY created_at DESC
+                LIMIT 1
+                """,
+                (email, now, now - within_seconds)
+            ).fetchone()
+            return row['token'] if row else None
 
     @staticmethod
     def verify(token: str) -> tuple[bool, str | None]:
@@ -95,74 +374,504 @@ class MagicLink:
         Returns:
             (is_valid, email): Tuple of validity and email if valid
         """
-        db = Database()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute(
+        with get_db().connection() as conn:
+            row = conn.execute(
                 """
-                SELECT email, expires_at, used FROM magic_links
+                SELECT email, expires_at >= ? AS live, used FROM magic_links
                 WHERE token = ?
                 """,
-                (token,)
-            )
-            row = cursor.fetchone()
+                (int(time.time()), token)
+            ).fetchone()
 
-            if not row:
-                return False, None
+        if not row:
+            return False, None
 
-            email, expires_at, used = row
+        email, live, used = row
 
-            # Check if already used
-            if used:
-                return False, None
+        # Reject used or expired tokens
+        if used or not live:
+            return False, None
 
-            # Check if expired
-            expires_at_dt = datetime.fromisoformat(expires_at)
-            if datetime.utcnow() > expires_at_dt:
-                return False, None
+        return True, email
 
-            return True, email
-        finally:
-            conn.close()
+    @staticmethod
+    def redeem(token: str) -> tuple[str | None, str | None]:
+        """
+        Consume a magic link token and create a session in one transaction
+
+        The token is marked used with a single conditional UPDATE, so of two
+        concurrent clicks only one can succeed.
+
+        Returns:
+            (email, session_id): Both None if the token is invalid, used or expired
+        """
+        with get_db().connection() as conn:
+            try:
+                row = conn.execute(
+                    """
+                    UPDATE magic_links SET used = 1
+                    WHERE token = ? AND used = 0 AND expires_at >= ?
+                    RETURNING email
+                    """,
+                    (token, int(time.time()))
+                ).fetchone()
+
+                if not row:
+                    conn.rollback()
+                    return None, None
+
+                email = row['email']
+                session_id = Session._insert(conn, email)
+                conn.commit()
+                return email, session_id
+            except Exception:
+                conn.rollback()
+                raise
 
     @staticmethod
     def mark_used(token: str) -> bool:
         """Mark a token as used (prevent reuse)"""
-        db = Database()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute(
+        with get_db().connection() as conn:
+            cursor = conn.execute(
                 "UPDATE magic_links SET used = 1 WHERE token = ?",
                 (token,)
             )
             conn.commit()
             return cursor.rowcount > 0
-        finally:
-            conn.close()
 
     @staticmethod
     def delete_expired() -> int:
         """Delete expired tokens"""
-        db = Database()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute(
+        with get_db().connection() as conn:
+            cursor = conn.execute(
                 """
                 DELETE FROM magic_links
                 WHERE expires_at < ?
                 """,
-                (datetime.utcnow(),)
+                (int(time.time()),)
             )
             conn.commit()
             return cursor.rowcount
-        finally:
-            conn.close()
+
+
+class EmailOutbox:
+    """
+    Persistent queue of magic link emails
+
+    Messages move from ``pending`` to ``sending`` while a worker holds them,
+    then to ``sent``. Failed sends go back to ``pending`` with exponential
+    backoff until ``EMAIL_OUTBOX_MAX_ATTEMPTS`` is reached, at which point
+    they are parked as ``dead`` for inspection.
+    """
+
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    DEAD = 'dead'
+
+    @staticmethod
+    def enqueue(email: str, magic_link_url: str) -> int:
+        """
+        Queue a magic link email
+
+        Returns:
+            id: The outbox message ID
+        """
+        with get_db().connection() as conn:
+            cursor = conn.execute(
+                """
+                INSERT INTO email_outbox (email, magic_link_url)
+                VALUES (?, ?)
+                """,
+                (email, magic_link_url)
+            )
+            conn.commit()
+            return cursor.lastrowid
+
+    @staticmethod
+    def claim(limit: int = 1, lease_seconds: int = 60) -> list[sqlite3.Row]:
+        """
+        Lease up to limit due messages for sending
+
+        A claimed message is hidden from other workers for lease_seconds; if
+        the worker dies before reporting back it becomes due again.
+        """
+        now = int(time.time())
+        with get_db().connection() as conn:
+            rows = conn.execute(
+                """
+                UPDATE email_outbox
+                SET status = 'sending', attempts = attempts + 1, next_attempt_at = ?
+                WHERE id IN (
+                    SELECT id FROM email_outbox
+                    WHERE status IN ('pending', 'sending') AND next_attempt_at <= ?
+                    ORDER BY next_attempt_at
+                    LIMIT ?
+                )
+                RETURNING id, email, magic_link_url, attempts
+                """,
+                (now + lease_seconds, now, limit)
+            ).fetchall()
+            conn.commit()
+            return rows
+
+    @staticmethod
+    def mark_sent(message_id: int) -> bool:
+        """Record a successful send"""
+        with get_db().connection() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE email_outbox
+                SET status = 'sent', sent_at = ?, last_error = NULL
+                WHERE id = ?
+                """,
+                (int(time.time()), message_id)
+            )
+            conn.commit()
+            return cursor.rowcount > 0
+
+    @staticmethod
+    def mark_failed(message_id: int, error: str, permanent: bool = False) -> str:
+        """
+        Record a failed send and schedule a retry
+
+        Args:
+            message_id: Outbox message ID
+            error: Why the send failed
+            permanent: Dead-letter now instead of retrying
+
+        Returns:
+            The message's new status (pending or dead)
+        """
+        with get_db().connection() as conn:
+            row = conn.execute(
+                "SELECT attempts FROM email_outbox WHERE id = ?",
+                (message_id,)
+            ).fetchone()
+            if not row:
+                return EmailOutbox.DEAD
+
+            attempts = row['attempts']
+            if permanent or attempts >= Config.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                status = EmailOutbox.DEAD
+                next_attempt_at = int(time.time())
+            else:
+                status = EmailOutbox.PENDING
+                delay = min(
+                    Config.EMAIL_OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1),
+                    Config.EMAIL_OUTBOX_BACKOFF_MAX_SECONDS
+                )
+                next_attempt_at = int(time.time() + delay)
+
+            conn.execute(
+                """
+                UPDATE email_outbox
+                SET status = ?, next_attempt_at = ?, last_error = ?
+                WHERE id = ?
+                """,
+                (status, next_attempt_at, error, message_id)
+            )
+            conn.commit()
+            return status
+
+    @staticmethod
+    def get(message_id: int) -> sqlite3.Row | None:
+        """Get an outbox message by ID"""
+        with get_db().connection() as conn:
+            return conn.execute(
+                "SELECT * FROM email_outbox WHERE id = ?",
+                (message_id,)
+            ).fetchone()
+
+    @staticmethod
+    def counts() -> dict[str, int]:
+        """Number of messages in each status"""
+        with get_db().connection() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) FROM email_outbox GROUP BY status"
+            ).fetchall()
+            return {row[0]: row[1] for row in rows}
+
+    @staticmethod
+    def delete_sent(days: int = 7) -> int:
+        """Delete messages sent more than days ago"""
+        cutoff = int(time.time()) - days * 24 * 60 * 60
+        with get_db().connection() as conn:
+            cursor = conn.execute(
+                "DELETE FROM email_outbox WHERE status = 'sent' AND sent_at < ?",
+                (cutoff,)
+            )
+            conn.commit()
+            return cursor.rowcount
+
+
+class SessionCache:
+    """
+    Bounded LRU cache of recently validated session IDs
+
+    Sits in front of ``Session.validate`` so that the dozens of asset requests
+    behind a single page view don't each hit SQLite. Only positive results are
+    cached, for at most ``SESSION_CACHE_TTL_SECONDS``; deleting a session
+    invalidates its entry immediately in this process only, so other workers
+    may accept a logged-out session for up to the TTL.
+    """
+
+    def __init__(self, ttl_seconds: float = None, max_entries: int = None):
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def ttl_seconds(self) -> float:
+        if self._ttl_seconds is None:
+            return Config.SESSION_CACHE_TTL_SECONDS
+        return self._ttl_seconds
+
+    @property
+    def max_entries(self) -> int:
+        if self._max_entries is None:
+            return Config.SESSION_CACHE_MAX_ENTRIES
+        return self._max_entries
+
+    def get(self, session_id: str) -> bool:
+        """Return True if session_id was validated within the TTL"""
+        with self._lock:
+            expires = self._entries.get(session_id)
+            if expires is None:
+                self.misses += 1
+                return False
+            if time.monotonic() >= expires:
+                del self._entries[session_id]
+                self.misses += 1
+                return False
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return True
+
+    def add(self, session_id: str):
+        """Record session_id as valid, evicting least recently used entries"""
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[session_id] = time.monotonic() + self.ttl_seconds
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, session_id: str):
+        """Drop a single session from the cache"""
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def clear(self):
+        """Drop every cached session"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters for tuning the TTL"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+session_cache = SessionCache()
+
+
+class LastAccessedBuffer:
+    """
+    Write-behind buffer for ``sessions.last_accessed``
+
+    Requests record the latest access time per session in memory; a
+    background thread writes them to SQLite in one ``executemany``
+    transaction every ``SESSION_TOUCH_FLUSH_SECONDS``, or sooner once
+    ``SESSION_TOUCH_MAX_PENDING`` sessions are waiting. Sessions already
+    recorded within ``SESSION_TOUCH_GRANULARITY_SECONDS`` are skipped.
+    Pending writes are flushed at interpreter exit.
+    """
+
+    def __init__(self, flush_seconds: float = None, max_pending: int = None,
+                 granularity_seconds: float = None):
+        self._flush_seconds = flush_seconds
+        self._max_pending = max_pending
+        self._granularity_seconds = granularity_seconds
+        self._pending: dict[str, dict[str, int]] = {}
+        self._recent: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self.skipped = 0
+        self.flushed = 0
+
+    @property
+    def flush_seconds(self) -> float:
+        if self._flush_seconds is None:
+            return Config.SESSION_TOUCH_FLUSH_SECONDS
+        return self._flush_seconds
+
+    @property
+    def max_pending(self) -> int:
+        if self._max_pending is None:
+            return Config.SESSION_TOUCH_MAX_PENDING
+        return self._max_pending
+
+    @property
+    def granularity_seconds(self) -> float:
+        if self._granularity_seconds is None:
+            return Config.SESSION_TOUCH_GRANULARITY_SECONDS
+        return self._granularity_seconds
+
+    def touch(self, session_id: str, db_path: str = None) -> bool:
+        """
+        Record an access for session_id
+
+        Returns:
+            True if the access was buffered, False if skipped by granularity
+        """
+        db_path = db_path or Config.DATABASE_PATH
+        now = time.monotonic()
+
+        with self._lock:
+            recorded = self._recent.get(session_id)
+            if recorded is not None and now - recorded < self.granularity_seconds:
+                self.skipped += 1
+                return False
+
+            self._recent[session_id] = now
+            pending = self._pending.setdefault(db_path, {})
+            pending[session_id] = int(time.time())
+            full = sum(len(p) for p in self._pending.values()) >= self.max_pending
+
+        self._ensure_started()
+        if full:
+            self._wakeup.set()
+        return True
+
+    def flush(self) -> int:
+        """Write all pending access times; returns the number of sessions written"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                cutoff = time.monotonic() - self.granularity_seconds
+                self._recent = {
+                    sid: recorded for sid, recorded in self._recent.items()
+                    if recorded > cutoff
+                }
+
+            written = 0
+            for db_path, touches in pending.items():
+                try:
+                    with get_db(db_path).connection() as conn:
+                        conn.executemany(
+                            """
+                            UPDATE sessions
+                            SET last_accessed = ?
+                            WHERE session_id = ?
+                            """,
+                            [(accessed, sid) for sid, accessed in touches.items()]
+                        )
+                        conn.commit()
+                    written += len(touches)
+                except Exception as e:
+                    logger.error(f"Error flushing session access times: {e}")
+
+            self.flushed += written
+            return written
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='last-accessed-flusher', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'pending': sum(len(p) for p in self._pending.values()),
+                'skipped': self.skipped,
+                'flushed': self.flushed,
+            }
+
+
+last_accessed_buffer = LastAccessedBuffer()
+atexit.register(last_accessed_buffer.flush)
+
+
+class RevocationSet:
+    """
+    In-memory set of revoked session IDs for signed-session mode
+
+    Loaded from the ``revoked_sessions`` table and reloaded at most every
+    ``SESSION_REVOCATION_REFRESH_SECONDS``, so a logout in another worker takes
+    effect within that interval. Revocations made by this process apply
+    immediately.
+    """
+
+    def __init__(self, refresh_seconds: float = None):
+        self._refresh_seconds = refresh_seconds
+        self._revoked: set[str] = set()
+        self._db_path = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def refresh_seconds(self) -> float:
+        if self._refresh_seconds is None:
+            return Config.SESSION_REVOCATION_REFRESH_SECONDS
+        return self._refresh_seconds
+
+    def is_revoked(self, session_id: str) -> bool:
+        """Check session_id against the set, reloading it if stale"""
+        now = time.monotonic()
+        if (self._db_path != Config.DATABASE_PATH or self._loaded_at is None
+                or now - self._loaded_at >= self.refresh_seconds):
+            self.refresh()
+        return session_id in self._revoked
+
+    def add(self, session_id: str):
+        """Revoke session_id in this process without waiting for a refresh"""
+        with self._lock:
+            self._revoked.add(session_id)
+
+    def refresh(self):
+        """Reload revoked session IDs from the database"""
+        db_path = Config.DATABASE_PATH
+        with get_db(db_path).connection() as conn:
+            rows = conn.execute("SELECT session_id FROM revoked_sessions").fetchall()
+        with self._lock:
+            self._revoked = {row[0] for row in rows}
+            self._db_path = db_path
+            self._loaded_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {'size': len(self._revoked)}
+
+
+revocations = RevocationSet()
 
 
 class Session:
@@ -181,137 +890,150 @@ class Session:
         Returns:
             session_id: The generated session ID
         """
-        db = Database()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-
-        session_id = Session.generate_session_id()
-
-        try:
-            cursor.execute(
-                """
-                INSERT INTO sessions (session_id, email)
-                VALUES (?, ?)
-                """,
-                (session_id, email)
-            )
+        with get_db().connection() as conn:
+            session_id = Session._insert(conn, email)
             conn.commit()
             return session_id
-        finally:
-            conn.close()
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, email: str) -> str:
+        """Insert a new session row on conn without committing"""
+        session_id = Session.generate_session_id()
+        conn.execute(
+            """
+            INSERT INTO sessions (session_id, email)
+            VALUES (?, ?)
+            """,
+            (session_id, email)
+        )
+        return session_id
 
     @staticmethod
     def validate(session_id: str) -> bool:
         """Check if session is valid and not expired"""
-        db = Database()
-        conn = db.get_connection()
-        cursor = conn.cursor()
+        if session_cache.get(session_id):
+            return True
 
-        try:
-            cursor.execute(
+        # Check if session has timed out (7 days)
+        timeout_cutoff = int(time.time()) - Config.SESSION_TIMEOUT_DAYS * 24 * 60 * 60
+
+        with get_db().connection() as conn:
+            row = conn.execute(
                 """
-                SELECT created_at, last_accessed FROM sessions
+                SELECT last_accessed >= ? AS active FROM sessions
                 WHERE session_id = ?
                 """,
-                (session_id,)
-            )
-            row = cursor.fetchone()
+                (timeout_cutoff, session_id)
+            ).fetchone()
 
-            if not row:
-                return False
-
-            created_at, last_accessed = row
-
-            # Check if session has timed out (7 days)
-            last_accessed_dt = datetime.fromisoformat(last_accessed)
-            timeout_period = timedelta(days=Config.SESSION_TIMEOUT_DAYS)
+        if not row:
+            return False
 
-            if datetime.utcnow() - last_accessed_dt > timeout_period:
-                Session.delete(session_id)
-                return False
+        if not row['active']:
+            Session.delete(session_id)
+            return False
 
-            return True
-        finally:
-            conn.close()
+        session_cache.add(session_id)
+        return True
 
     @staticmethod
     def update_last_accessed(session_id: str) -> bool:
         """Update the last_accessed timestamp for a session"""
-        db = Database()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute(
+        with get_db().connection() as conn:
+            cursor = conn.execute(
                 """
                 UPDATE sessions
                 SET last_accessed = ?
                 WHERE session_id = ?
                 """,
-                (datetime.utcnow(), session_id)
+                (int(time.time()), session_id)
             )
             conn.commit()
             return cursor.rowcount > 0
-        finally:
-            conn.close()
+
+    @staticmethod
+    def touch(session_id: str) -> bool:
+        """
+        Record that a session was used
+
+        Buffers the write in ``last_accessed_buffer`` unless write-behind is
+        disabled, in which case last_accessed is updated immediately.
+        """
+        if Config.SESSION_WRITE_BEHIND:
+            return last_accessed_buffer.touch(session_id)
+        return Session.update_last_accessed(session_id)
 
     @staticmethod
     def get_email(session_id: str) -> str | None:
         """Get email associated with a session"""
-        db = Database()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute(
+        with get_db().connection() as conn:
+            row = conn.execute(
                 "SELECT email FROM sessions WHERE session_id = ?",
                 (session_id,)
-            )
-            row = cursor.fetchone()
+            ).fetchone()
             return row['email'] if row else None
-        finally:
-            conn.close()
 
     @staticmethod
     def delete(session_id: str) -> bool:
-        """Delete a session (logout)"""
-        db = Database()
-        conn = db.get_connection()
-        cursor = conn.cursor()
+        """Delete a session (logout) and revoke any signed cookie for it"""
+        session_cache.invalidate(session_id)
 
-        try:
-            cursor.execute(
+        with get_db().connection() as conn:
+            cursor = conn.execute(
                 "DELETE FROM sessions WHERE session_id = ?",
                 (session_id,)
             )
+            deleted = cursor.rowcount > 0
+            if deleted:
+                conn.execute(
+                    "INSERT OR REPLACE INTO revoked_sessions (session_id) VALUES (?)",
+                    (session_id,)
+                )
             conn.commit()
-            return cursor.rowcount > 0
-        finally:
-            conn.close()
+
+        if deleted:
+            revocations.add(session_id)
+        return deleted
 
     @staticmethod
     def delete_old(days: int = 30) -> int:
         """Delete sessions older than specified days"""
-        db = Database()
-        conn = db.get_connection()
-        cursor = conn.cursor()
+        now = int(time.time())
+        cutoff_date = now - days * 24 * 60 * 60
+        revocation_cutoff = now - Config.SESSION_TIMEOUT_DAYS * 24 * 60 * 60
 
-        try:
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
-            cursor.execute(
+        with get_db().connection() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO revoked_sessions (session_id)
+                SELECT session_id FROM sessions
+                WHERE created_at < ?
+                """,
+                (cutoff_date,)
+            )
+            cursor = conn.execute(
                 """
                 DELETE FROM sessions
                 WHERE created_at < ?
                 """,
                 (cutoff_date,)
             )
+            deleted = cursor.rowcount
+
+            # Signed cookies expire within the session timeout, so older
+            # tombstones can no longer match a usable cookie
+            conn.execute(
+                "DELETE FROM revoked_sessions WHERE revoked_at < ?",
+                (revocation_cutoff,)
+            )
             conn.commit()
-            return cursor.rowcount
-        finally:
-            conn.close()
+
+        if deleted:
+            session_cache.clear()
+        return deleted
 
 
 if __name__ == "__main__":
     # Initialize database when running this file directly
-    db = Database()
+    db = get_db()
     print(f"Database initialized at {Config.DATABASE_PATH}")
@@ -0,0 +1,111 @@
+"""
+Background sender for the email outbox
+
+/auth/request-link only queues a message with EmailOutbox.enqueue; a small
+pool of daemon threads claims due messages and hands them to Mailgun, so a
+slow or failing Mailgun never holds up a request worker.
+"""
+
+import logging
+import os
+import threading
+
+from config import Config
+from email_service import MailgunRejected, send_magic_link
+from models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxWorker:
+    """Pool of threads draining the email outbox"""
+
+    def __init__(self, workers: int = None, poll_seconds: float = None):
+        self._workers = workers
+        self._poll_seconds = poll_seconds
+        self._threads: list[threading.Thread] = []
+        self._pid = None
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self) -> int:
+        return Config.EMAIL_OUTBOX_WORKERS if self._workers is None else self._workers
+
+    @property
+    def poll_seconds(self) -> float:
+        return Config.EMAIL_OUTBOX_POLL_SECONDS if self._poll_seconds is None else self._poll_seconds
+
+    def process_due(self, limit: int = 10) -> int:
+        """
+        Send up to limit due messages in the calling thread
+
+        Returns:
+            Number of messages processed (sent or rescheduled)
+        """
+        messages = EmailOutbox.claim(limit=limit)
+        for message in messages:
+            permanent = False
+            try:
+                ok = send_magic_link(message['email'], message['magic_link_url'], raise_on_reject=True)
+                error = None if ok else 'Mailgun did not accept the message'
+            except MailgunRejected as e:
+                # A bad recipient or similar: retrying would only fail again
+                ok, error, permanent = False, str(e), True
+            except Exception as e:
+                ok, error = False, str(e)
+
+            if ok:
+                EmailOutbox.mark_sent(message['id'])
+                logger.info(f"Magic link sent to {message['email']}")
+            else:
+                status = EmailOutbox.mark_failed(message['id'], error, permanent=permanent)
+                log = logger.error if status == EmailOutbox.DEAD else logger.warning
+                log(f"Failed to send magic link to {message['email']} "
+                    f"(attempt {message['attempts']}, now {status}): {error}")
+        return len(messages)
+
+    def notify(self):
+        """Wake a worker because a message was just queued"""
+        self.start()
+        self._wakeup.set()
+
+    def start(self):
+        """Start the worker threads if they are not running in this process"""
+        if self._pid == os.getpid() and self._threads:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._threads:
+                return
+            # Threads do not survive fork, so a forked worker starts its own
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._run, name=f'email-outbox-{n}', daemon=True)
+                for n in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout: float = 5):
+        """Stop the worker threads after their current message"""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.process_due(limit=1):
+                    continue
+            except Exception as e:
+                logger.error(f"Error processing email outbox: {e}")
+
+            self._wakeup.wait(self.poll_seconds)
+            self._wakeup.clear()
+
+
+worker = OutboxWorker()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Precompress the built site
+
+Writes foo.html.gz (and foo.html.br when the optional ``brotli`` package is
+installed) next to every compressible file in public/, so static serving
+can send compressed bytes without compressing per request. Variants get the
+source file's mtime; the manifest only uses a variant whose mtime matches.
+
+Usage:
+    python3 precompress.py [public_dir] [workers]
+"""
+
+import gzip
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config import Config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {
+    '.html', '.css', '.js', '.mjs', '.json', '.xml', '.svg', '.txt',
+    '.map', '.webmanifest', '.ico', '.md',
+}
+
+# Smaller files are not worth a second round trip through the cache
+MIN_SIZE_BYTES = 512
+
+# Keep a variant only if it saves at least this fraction of the bytes
+MIN_SAVINGS = 0.1
+
+
+def encoders() -> dict:
+    """Content-Encoding -> (file suffix, compress function) for available codecs"""
+    available = {'gzip': ('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))}
+    if brotli is not None:
+        available['br'] = ('.br', lambda data: brotli.compress(data, quality=11))
+    return available
+
+
+def is_compressible(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def compress_file(path: str) -> dict:
+    """
+    Write compressed siblings of one file, skipping ones already up to date
+
+    Args:
+        path: Source file
+
+    Returns:
+        Mapping of encoding to 'written', 'current' or 'skipped'
+    """
+    st = os.stat(path)
+    results = {}
+    data = None
+
+    for encoding, (suffix, compress) in encoders().items():
+        target = path + suffix
+        try:
+            if os.stat(target).st_mtime_ns == st.st_mtime_ns:
+                results[encoding] = 'current'
+                continue
+        except OSError:
+            pass
+
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        compressed = compress(data)
+
+        if len(compressed) > len(data) * (1 - MIN_SAVINGS):
+            if os.path.exists(target):
+                os.remove(target)
+            results[encoding] = 'skipped'
+            continue
+
+        tmp = f"{target}.tmp{os.getpid()}"
+        with open(tmp, 'wb') as f:
+            f.write(compressed)
+        os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp, target)
+        results[encoding] = 'written'
+
+    return results
+
+
+def find_candidates(public_dir: str) -> list[str]:
+    """Compressible files in public_dir large enough to be worth it"""
+    candidates = []
+    for dirpath, _, filenames in os.walk(public_dir):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if is_compressible(name) and os.path.getsize(path) >= MIN_SIZE_BYTES:
+                candidates.append(path)
+    return candidates
+
+
+def precompress(public_dir: str = None, workers: int = None) -> dict:
+    """
+    Compress every candidate file in public_dir in parallel
+
+    Args:
+        public_dir: Site directory (defaults to Config.PUBLIC_DIR)
+        workers: Process count (defaults to the CPU count)
+
+    Returns:
+        Counts of 'written', 'current' and 'skipped' variants
+    """
+    candidates = find_candidates(public_dir or Config.PUBLIC_DIR)
+    counts = {'written': 0, 'current': 0, 'skipped': 0}
+    if not candidates:
+        return counts
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for results in pool.map(compress_file, candidates, chunksize=16):
+            for status in results.values():
+                counts[status] += 1
+    return counts
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 3:
+        print(__doc__)
+        sys.exit(2)
+
+    public_dir = sys.argv[1] if len(sys.argv) > 1 else Config.PUBLIC_DIR
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    if brotli is None:
+        print("brotli is not installed; writing gzip variants only")
+
+    start = time.perf_counter()
+    counts = precompress(public_dir, workers)
+    print(f"✓ Precompressed {public_dir} in {time.perf_counter() - start:.1f}s: "
+          f"{counts['written']} written, {counts['current']} up to date, "
+          f"{counts['skipped']} not worth compressing")
@@ -0,0 +1,134 @@
+"""
+SQLite storage backend for Flask-Limiter
+
+``memory://`` keeps counters inside each worker process, so with N workers
+the effective limit is N times the configured one. Importing this module
+registers a ``sqlite://`` scheme with the ``limits`` library whose fixed
+window counters live in a SQLite file shared by every worker on the host:
+
+    Limiter(storage_uri="sqlite:////var/lib/blog/ratelimit.db")
+
+As with SQLAlchemy, three slashes introduce a path relative to the working
+directory (``sqlite:///ratelimit.db``) and four an absolute one.
+
+Each hit is a single atomic UPSERT, so concurrent processes never lose
+increments.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from limits.errors import ConfigurationError
+from limits.storage import Storage
+
+
+def _db_path(uri: str) -> str:
+    """
+    Database file named by a sqlite:// URI
+
+    Raises ConfigurationError for an in-memory database: every thread has
+    its own connection, so counters would not even be shared in-process.
+    """
+    path = uri[len('sqlite:///'):] if uri.startswith('sqlite:///') else ''
+    if not path or path == ':memory:':
+        raise ConfigurationError(
+            f"{uri!r} needs a database file, e.g. sqlite:///ratelimit.db or "
+            "sqlite:////var/lib/blog/ratelimit.db"
+        )
+    return path
+
+
+class SQLiteStorage(Storage):
+    """Fixed-window rate limit counters in a shared SQLite database"""
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    # Expired windows are deleted at most this often
+    PURGE_INTERVAL_SECONDS = 60
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        self.db_path = _db_path(uri)
+        self.busy_timeout_ms = int(options.pop('busy_timeout_ms', 5000))
+        self._local = threading.local()
+        self._last_purge = 0.0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._connection()
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection, reopened after fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {self.busy_timeout_ms}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        # Counters are disposable; skip fsync on every hit
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ratelimit (
+                key TEXT PRIMARY KEY,
+                count INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        """Increment key's counter, starting a new window if the old one expired"""
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute(
+            """
+            INSERT INTO ratelimit (key, count, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                count = CASE WHEN expires_at <= ? THEN excluded.count
+                             ELSE count + excluded.count END,
+                expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at
+                                  ELSE expires_at END
+            RETURNING count
+            """,
+            (key, amount, now + expiry, now, now)
+        ).fetchone()
+
+        if now - self._last_purge > self.PURGE_INTERVAL_SECONDS:
+            self._last_purge = now
+            conn.execute("DELETE FROM ratelimit WHERE expires_at <= ?", (now,))
+
+        return row[0]
+
+    def get(self, key: str) -> int:
+        row = self._connection().execute(
+            "SELECT count FROM ratelimit WHERE key = ? AND expires_at > ?",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        row = self._connection().execute(
+            "SELECT expires_at FROM ratelimit WHERE key = ? AND expires_at > ?",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self) -> bool:
+        try:
+            self._connection().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int | None:
+        cursor = self._connection().execute("DELETE FROM ratelimit")
+        return cursor.rowcount
+
+    def clear(self, key: str) -> None:
+        self._connection().execute("DELETE FROM ratelimit WHERE key = ?", (key,))
@@ -1,25 +1,92 @@
-from flask import session, redirect, url_for, send_from_directory, current_app
-from models import Session
+from flask import g, session, redirect, url_for, request, current_app
+from werkzeug.datastructures import Headers
+from werkzeug.http import http_date, is_resource_modified, parse_range_header, quote_etag
+from werkzeug.wsgi import wrap_file
+from models import Session, revocations
+from static_files import manifest, file_cache, select_variant, encoding_headers
+from config import Config
+import io
 import os
+import secrets
+from urllib.parse import quote
+import time
+from datetime import datetime, timezone
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Read size for streamed ranges and the file wrapper's block size
+STREAM_CHUNK_BYTES = 256 * 1024
+
+# More ranges than this in one request are ignored and the whole file is sent
+MAX_RANGES = 16
+
+
+def stamp_session_expiry(login: bool = False):
+    """
+    Write issued-at and sliding expiry into the signed session cookie
+
+    Flask signs the cookie with SECRET_KEY, so in signed-session mode these
+    fields can be trusted without a database lookup.
+
+    Args:
+        login: Reset issued-at because a new session was just created
+    """
+    now = int(time.time())
+    if login:
+        session['issued_at'] = now
+    else:
+        session.setdefault('issued_at', now)
+    session['expires_at'] = now + Config.SESSION_TIMEOUT_DAYS * 24 * 60 * 60
+
+
+def _validate_signed_session(session_id: str) -> bool:
+    """Validate a signed session record using only the cookie and revocation set"""
+    expires_at = session.get('expires_at')
+
+    if expires_at is None:
+        # Cookie issued before signed mode was enabled: check the database once
+        if not Session.validate(session_id):
+            return False
+        stamp_session_expiry()
+        return True
+
+    now = time.time()
+    if now >= expires_at or revocations.is_revoked(session_id):
+        return False
+
+    # Slide the expiry forward, but only re-issue the cookie occasionally
+    timeout = Config.SESSION_TIMEOUT_DAYS * 24 * 60 * 60
+    if expires_at - now < timeout - Config.SESSION_TOUCH_GRANULARITY_SECONDS:
+        stamp_session_expiry()
+
+    return True
+
 
 def is_authenticated() -> bool:
     """
     Check if user has a valid session
 
+    The result is computed once per request and stored on ``flask.g``, so the
+    before_request hook, static serving, error handlers and API routes all
+    share a single session lookup.
+
     Returns:
         True if authenticated with valid session, False otherwise
     """
+    if 'authenticated' in g:
+        return g.authenticated
+
     session_id = session.get('session_id')
 
     if not session_id:
-        return False
-
-    # Validate session in database
-    return Session.validate(session_id)
+        g.authenticated = False
+    elif Config.SESSION_MODE == 'signed':
+        g.authenticated = _validate_signed_session(session_id)
+    else:
+        # Validate session in database
+        g.authenticated = Session.validate(session_id)
+    return g.authenticated
 
 
 def serve_protected_static(path: str):
@@ -35,37 +102,226 @@ def serve_protected_static(path: str):
     Returns:
         Flask response with the file, or redirect to login
     """
-    # Check authentication
+    # Check authentication (reuses the result computed in before_request)
     if not is_authenticated():
         logger.info(f"Unauthenticated access attempt to {path}, redirecting to login")
         return redirect(url_for('auth.login'))
 
-    # Update session last_accessed time
-    session_id = session.get('session_id')
-    if session_id:
-        Session.update_last_accessed(session_id)
+    try:
+        return _send_static(path)
+    except OSError as e:
+        # public/ changed under the manifest (e.g. rebuilt in place): rescan
+        # and try once more instead of failing the request
+        logger.info(f"Rescanning public/ after {e}")
+        manifest.invalidate()
+        try:
+            return _send_static(path)
+        except OSError:
+            return "Not found", 404
+
 
-    # Build the full path to the public directory
-    public_dir = os.path.join(os.path.dirname(__file__), '..', 'public')
-    public_dir = os.path.abspath(public_dir)
+def _send_static(path: str):
+    """Resolve path through the manifest and send it (OSError if a file vanished)"""
+    # Resolve against the manifest of public/; anything not in it (including
+    # traversal attempts) falls back to the site's index.html
+    entry = manifest.lookup(path)
+    if entry is None:
+        logger.info(f"File not found: {path}")
+        entry = manifest.lookup('index.html')
+        if entry is None:
+            return "Not found", 404
 
-    # Security: prevent directory traversal
-    requested_file = os.path.join(public_dir, path)
-    requested_file = os.path.abspath(requested_file)
+    # The front proxy sends the bytes (and handles ranges and conditionals)
+    if entry.offload:
+        return offload_response(entry)
 
-    if not requested_file.startswith(public_dir):
-        logger.warning(f"Directory traversal attempt: {path}")
-        return "Access denied", 403
+    # Send precompressed bytes if public/ has a variant the client accepts
+    entry = select_variant(entry, request.accept_encodings)
 
-    # If path is a directory, serve index.html
-    if os.path.isdir(requested_file):
-        requested_file = os.path.join(requested_file, 'index.html')
-        path = os.path.join(path, 'index.html')
+    # Small files are answered from memory; large ones stream from disk
+    cached = file_cache.get(entry)
+    if cached is None:
+        return send_with_ranges(entry)
+    if 'Range' in request.headers:
+        # Same Range handling (multipart, invalid headers) as files on disk
+        return send_with_ranges(entry, cached)
+
+    response = current_app.response_class(cached.body, headers=cached.headers)
+    return response.make_conditional(request, accept_ranges=True, complete_length=cached.size)
+
+
+def offload_response(entry):
+    """
+    Empty response telling the front proxy which file to send
+
+    Flask has already authenticated the request and resolved the path
+    through the manifest, so only files inside public/ can be named.
+
+    Args:
+        entry: Manifest entry to send
+
+    Returns:
+        Response with an X-Accel-Redirect or X-Sendfile header
+    """
+    headers = Headers([
+        ('Content-Type', entry.content_type),
+        ('Cache-Control', entry.cache_control),
+    ])
+    if Config.STATIC_OFFLOAD == 'x-sendfile':
+        headers['X-Sendfile'] = entry.path
+    else:
+        headers['X-Accel-Redirect'] = Config.STATIC_OFFLOAD_PREFIX + quote(entry.relpath)
+    return current_app.response_class(headers=headers)
+
+
+def _satisfiable_ranges(header: str, length: int):
+    """
+    Byte ranges of a Range header clipped to the file length
+
+    Returns:
+        List of (start, stop) pairs, [] if none are satisfiable, or None to
+        ignore the header and send the whole file
+    """
+    parsed = parse_range_header(header)
+    if parsed is None or parsed.units != 'bytes' or len(parsed.ranges) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for start, stop in parsed.ranges:
+        if start < 0:
+            start, stop = max(length + start, 0), length
+        else:
+            stop = length if stop is None else min(stop, length)
+        if start < stop:
+            ranges.append((start, stop))
+    return ranges
+
+
+def _read_range(f, start: int, stop: int):
+    """Yield stop - start bytes of f in fixed-size chunks"""
+    f.seek(start)
+    remaining = stop - start
+    while remaining > 0:
+        chunk = f.read(min(STREAM_CHUNK_BYTES, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _multipart_ranges(f, ranges, boundary: str, content_type: str, length: int):
+    """Yield a multipart/byteranges body, then close f"""
+    try:
+        for start, stop in ranges:
+            yield (
+                f"\r\n--{boundary}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Range: bytes {start}-{stop - 1}/{length}\r\n\r\n"
+            ).encode()
+            yield from _read_range(f, start, stop)
+        yield f"\r\n--{boundary}--\r\n".encode()
+    finally:
+        f.close()
+
+
+def send_with_ranges(entry, cached=None):
+    """
+    Send a file with conditional and Range support
+
+    From disk, whole files and ranges that run to the end of the file are
+    handed to the server's ``wsgi.file_wrapper``, so gunicorn sends them
+    with sendfile() without copying through Python. Other ranges are read
+    in fixed-size chunks; memory per download stays constant either way.
+    Size, Last-Modified and ETag come from the opened file, not the
+    manifest entry, so a file rewritten since the last scan is described
+    correctly.
+
+    A Range header that cannot be parsed, uses another unit or asks for
+    more than MAX_RANGES ranges is ignored and the whole file sent.
+
+    Args:
+        entry: Manifest entry (or precompressed variant) to send
+        cached: The file's CachedFile, if already in memory
+
+    Returns:
+        200, 206, 304 or 416 response (OSError if the file cannot be opened)
+    """
+    if cached is None:
+        f = open(entry.path, 'rb')
+        try:
+            st = os.fstat(f.fileno())
+            etag = manifest.etag(entry, f)
+        except BaseException:
+            f.close()
+            raise
+        size, mtime, body = st.st_size, st.st_mtime, None
+    else:
+        f = io.BytesIO(cached.body)
+        size, mtime, etag, body = cached.size, cached.mtime, cached.etag, cached.body
+
+    last_modified = datetime.fromtimestamp(mtime, timezone.utc)
+    headers = Headers([
+        ('Last-Modified', http_date(mtime)),
+        ('ETag', quote_etag(etag)),
+        ('Cache-Control', entry.cache_control),
+        ('Accept-Ranges', 'bytes'),
+        *encoding_headers(entry),
+    ])
+    response_class = current_app.response_class
+    environ = request.environ
+
+    if not is_resource_modified(environ, etag=etag, last_modified=last_modified):
+        f.close()
+        return response_class(status=304, headers=headers)
+
+    ranges = None
+    if 'Range' in request.headers and not (
+        'If-Range' in request.headers
+        and is_resource_modified(environ, etag=etag, last_modified=last_modified,
+                                 ignore_if_range=False)
+    ):
+        ranges = _satisfiable_ranges(request.headers['Range'], size)
+
+    if ranges == []:
+        f.close()
+        headers['Content-Range'] = f"bytes */{size}"
+        return response_class(status=416, headers=headers)
+
+    if ranges is None or len(ranges) == 1:
+        start, stop = ranges[0] if ranges else (0, size)
+        headers['Content-Type'] = entry.content_type
+        headers['Content-Length'] = str(stop - start)
+        if body is not None:
+            body = body[start:stop]
+        elif stop == size:
+            # Runs to EOF: positioned file object, eligible for sendfile()
+            f.seek(start)
+            body = wrap_file(environ, f, STREAM_CHUNK_BYTES)
+        else:
+            body = _closing(f, _read_range(f, start, stop))
+        status = 200
+        if ranges:
+            status = 206
+            headers['Content-Range'] = f"bytes {start}-{stop - 1}/{size}"
+        return response_class(body, status=status, headers=headers, direct_passthrough=True)
+
+    boundary = secrets.token_hex(16)
+    body = _multipart_ranges(f, ranges, boundary, entry.content_type, size)
+    length = sum(
+        len(
+            f"\r\n--{boundary}\r\nContent-Type: {entry.content_type}\r\n"
+            f"Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n"
+        ) + stop - start
+        for start, stop in ranges
+    ) + len(f"\r\n--{boundary}--\r\n")
+    headers['Content-Type'] = f"multipart/byteranges; boundary={boundary}"
+    headers['Content-Length'] = str(length)
+    return response_class(body, status=206, headers=headers, direct_passthrough=True)
 
-    # Check if file exists
-    if not os.path.isfile(requested_file):
-        logger.info(f"File not found: {path}")
-        return send_from_directory(public_dir, 'index.html')
 
-    # Serve the file
-    return send_from_directory(public_dir, path)
+def _closing(f, chunks):
+    """Yield from chunks, closing f when the response is done"""
+    try:
+        yield from chunks
+    finally:
+        f.close()
@@ -0,0 +1,464 @@
+"""
+In-memory index of the built site in public/
+
+Quartz writes every page as a file, so the set of servable URLs only
+changes when the site is rebuilt. StaticManifest walks public/ once and maps
+each URL, including Quartz's extension-less page URLs, to the resolved file
+with its size, mtime and content type. Resolving a request is then a dict
+lookup instead of abspath/isdir/isfile probing.
+
+The manifest notices a rebuild by re-checking, at most every
+STATIC_MANIFEST_REFRESH_SECONDS, the BUILD_MARKER file scripts/build.sh
+writes once the build and precompression are finished (it builds in a
+staging directory and renames it over public/). While the marker is
+missing (a build in progress) the previous manifest stays in use. Without
+any marker (e.g. a manual ``npx quartz build``) it falls back to the
+public/ directory and its index.html, and a URL that misses is re-checked
+on disk so pages added since the last build are still found.
+
+Files with .br/.gz siblings written by precompress.py carry them as
+variants, chosen per request from Accept-Encoding.
+
+Each entry also carries its Cache-Control policy (first matching pattern in
+STATIC_CACHE_CONTROL) and a strong ETag hashed from the content once per
+file version.
+
+StaticFileCache keeps the bodies of small, hot files in memory under a byte
+budget so repeated requests skip the disk entirely.
+"""
+
+import fnmatch
+import hashlib
+import logging
+import mimetypes
+import os
+import stat
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from werkzeug.http import http_date, quote_etag
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class StaticFile(NamedTuple):
+    """A servable file in public/"""
+    path: str
+    relpath: str
+    size: int
+    mtime: float
+    content_type: str
+    cache_control: str
+    # Content-Encoding of a precompressed variant ('' for the file itself)
+    encoding: str = ''
+    # Precompressed variants of this file, in order of preference
+    variants: tuple = ()
+    # Sent by the front proxy (STATIC_OFFLOAD) rather than by Python
+    offload: bool = False
+
+
+# Precompressed sibling suffixes written by precompress.py, best first
+VARIANT_SUFFIXES = (('.br', 'br'), ('.gz', 'gzip'))
+
+# Written to public/ by scripts/build.sh after a complete build
+BUILD_MARKER = '.build-complete'
+
+
+def select_variant(entry: StaticFile, accept_encodings) -> StaticFile:
+    """
+    Pick the precompressed variant the client prefers
+
+    Args:
+        entry: Manifest entry for the requested file
+        accept_encodings: The request's parsed Accept-Encoding header
+
+    Returns:
+        A variant of entry, or entry itself for an uncompressed response
+    """
+    best, best_quality = entry, 0
+    for variant in entry.variants:
+        quality = accept_encodings[variant.encoding]
+        if quality > best_quality:
+            best, best_quality = variant, quality
+    return best
+
+
+def encoding_headers(entry: StaticFile) -> tuple:
+    """Content-Encoding and Vary headers for a file or one of its variants"""
+    headers = ()
+    if entry.encoding:
+        headers += (('Content-Encoding', entry.encoding),)
+    if entry.encoding or entry.variants:
+        headers += (('Vary', 'Accept-Encoding'),)
+    return headers
+
+
+def offload_for(relpath: str) -> bool:
+    """Whether relpath matches an STATIC_OFFLOAD_PATTERNS glob (with offload enabled)"""
+    return bool(Config.STATIC_OFFLOAD) and any(
+        fnmatch.fnmatchcase(relpath, pattern) for pattern in Config.STATIC_OFFLOAD_PATTERNS
+    )
+
+
+def cache_control_for(relpath: str) -> str:
+    """Cache-Control value of the first STATIC_CACHE_CONTROL pattern matching relpath"""
+    for pattern, value in Config.STATIC_CACHE_CONTROL:
+        if fnmatch.fnmatchcase(relpath, pattern):
+            return value
+    return 'no-cache'
+
+
+class StaticManifest:
+    """URL -> StaticFile map for public/, rebuilt when the site changes"""
+
+    def __init__(self, public_dir: str = None, refresh_seconds: float = None):
+        self._public_dir = public_dir
+        self._refresh_seconds = refresh_seconds
+        self._entries: dict[str, StaticFile] = {}
+        self._etags: dict[str, tuple[float, str]] = {}
+        self._built_for = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._built_at_ns = 0
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    @property
+    def public_dir(self) -> str:
+        return os.path.abspath(self._public_dir or Config.PUBLIC_DIR)
+
+    @property
+    def refresh_seconds(self) -> float:
+        if self._refresh_seconds is None:
+            return Config.STATIC_MANIFEST_REFRESH_SECONDS
+        return self._refresh_seconds
+
+    def _current_signature(self, public_dir: str):
+        """Cheap fingerprint of a build: its BUILD_MARKER, else the directory and its index.html"""
+        try:
+            marker = os.stat(os.path.join(public_dir, BUILD_MARKER))
+            return ('marker', marker.st_ino, marker.st_mtime_ns, marker.st_size)
+        except OSError:
+            pass
+        try:
+            root = os.stat(public_dir)
+        except OSError:
+            return None
+        try:
+            index_mtime = os.stat(os.path.join(public_dir, 'index.html')).st_mtime_ns
+        except OSError:
+            index_mtime = None
+        return ('dir', root.st_ino, root.st_mtime_ns, index_mtime)
+
+    def _building(self, signature) -> bool:
+        """Whether a marked build is being replaced (its marker is gone)"""
+        return (self._signature is not None and self._signature[0] == 'marker'
+                and (signature is None or signature[0] != 'marker'))
+
+    def build(self) -> int:
+        """
+        Walk public/ and replace the manifest
+
+        Returns:
+            Number of files indexed
+        """
+        with self._lock:
+            public_dir = self.public_dir
+            started_ns = time.time_ns()
+            signature = self._current_signature(public_dir)
+            entries: dict[str, StaticFile] = {}
+            pages: dict[str, StaticFile] = {}
+            folders: dict[str, StaticFile] = {}
+            real_root = os.path.realpath(public_dir)
+
+            files = {}
+            for dirpath, dirnames, filenames in os.walk(public_dir):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    path = os.path.join(dirpath, name)
+                    if name == BUILD_MARKER and dirpath == public_dir:
+                        continue
+                    # Never serve anything a symlink points at outside public/
+                    real = os.path.realpath(path)
+                    if os.path.commonpath([real_root, real]) != real_root:
+                        logger.warning(f"Skipping {path}: resolves outside {public_dir}")
+                        continue
+                    try:
+                        st = os.stat(real)
+                    except OSError:
+                        continue
+                    files[os.path.relpath(path, public_dir).replace(os.sep, '/')] = (real, st)
+
+            for relpath, (real, st) in files.items():
+                # foo.html.gz is served as an encoding of foo.html, not on its own
+                if any(relpath.endswith(suffix) and relpath[:-len(suffix)] in files
+                       for suffix, _ in VARIANT_SUFFIXES):
+                    continue
+
+                name = relpath.rsplit('/', 1)[-1]
+                content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+                cache_control = cache_control_for(relpath)
+                variants = tuple(
+                    StaticFile(
+                        variant[0], relpath + suffix, variant[1].st_size,
+                        variant[1].st_mtime, content_type, cache_control, encoding
+                    )
+                    for suffix, encoding in VARIANT_SUFFIXES
+                    # A variant left over from an older build has a different mtime
+                    if (variant := files.get(relpath + suffix))
+                    and variant[1].st_mtime_ns == st.st_mtime_ns
+                )
+                entry = StaticFile(
+                    real, relpath, st.st_size, st.st_mtime, content_type,
+                    cache_control, variants=variants, offload=offload_for(relpath)
+                )
+                entries[relpath] = entry
+
+                if name == 'index.html':
+                    folder = relpath[:-len('index.html')].rstrip('/')
+                    if folder:
+                        folders[folder] = entry
+                elif name.endswith('.html'):
+                    pages[relpath[:-len('.html')]] = entry
+
+            # /foo serves foo.html when both foo.html and foo/index.html exist,
+            # /foo/ always serves the folder page (matches Quartz's own server)
+            aliases = {**folders, **pages}
+            for url, entry in aliases.items():
+                entries.setdefault(url, entry)
+            for folder, entry in folders.items():
+                entries.setdefault(folder + '/', entry)
+
+            self._entries = entries
+            self._built_for = public_dir
+            self._signature = signature
+            self._checked_at = time.monotonic()
+            self._built_at_ns = started_ns
+            self.builds += 1
+
+        logger.info(f"Indexed {len(entries)} static URLs in {public_dir}")
+        return len(entries)
+
+    def _ensure_current(self):
+        """Rebuild if never built, public_dir changed, or the site was rebuilt"""
+        if self._built_for != self.public_dir:
+            self.build()
+            return
+
+        now = time.monotonic()
+        if now - self._checked_at < self.refresh_seconds:
+            return
+        self._checked_at = now
+        signature = self._current_signature(self._built_for)
+        if signature != self._signature and not self._building(signature):
+            self.build()
+
+    def _added_since_build(self, path: str) -> bool:
+        """Whether a file that path could resolve to appeared after the last build"""
+        if self._building(self._current_signature(self._built_for)):
+            return False
+        root = self._built_for
+        for candidate in (path, path + '.html', path.rstrip('/') + '/index.html'):
+            full = os.path.normpath(os.path.join(root, candidate))
+            if not full.startswith(root + os.sep):
+                continue
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode) and st.st_mtime_ns >= self._built_at_ns:
+                return True
+        return False
+
+    def lookup(self, path: str) -> Optional[StaticFile]:
+        """
+        Resolve a URL path to a file in public/
+
+        Args:
+            path: Request path relative to the site root
+
+        Returns:
+            The StaticFile to serve, or None if no file matches
+        """
+        self._ensure_current()
+        entry = self._entries.get(path)
+        if entry is None and path and self._added_since_build(path):
+            self.build()
+            entry = self._entries.get(path)
+        return entry
+
+    def etag(self, entry: StaticFile, f, body: bytes = None) -> str:
+        """
+        Strong ETag for the file being sent, hashed once per file version
+
+        The version is taken from ``os.fstat`` of the open file rather than
+        from the manifest entry, which may be older than what is on disk.
+
+        Args:
+            entry: Manifest entry
+            f: The file opened for sending
+            body: Its contents, if already read
+
+        Returns:
+            Unquoted ETag value
+        """
+        st = os.fstat(f.fileno())
+        version = (st.st_mtime_ns, st.st_size)
+        known = self._etags.get(entry.path)
+        if known is not None and known[0] == version:
+            return known[1]
+
+        digest = hashlib.blake2b(digest_size=16)
+        if body is not None:
+            digest.update(body)
+        else:
+            f.seek(0)
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+
+        etag = digest.hexdigest()
+        self._etags[entry.path] = (version, etag)
+        return etag
+
+    def invalidate(self):
+        """Force a rebuild on the next lookup"""
+        self._built_for = None
+
+    def stats(self) -> dict:
+        return {
+            'urls': len(self._entries),
+            'builds': self.builds,
+            'public_dir': self._built_for,
+        }
+
+
+manifest = StaticManifest()
+
+
+class CachedFile(NamedTuple):
+    """A file body held in memory with its precomputed response headers"""
+    body: bytes
+    headers: tuple
+    entry: StaticFile
+    size: int
+    # Of the file as read, which may be newer than the manifest entry
+    mtime: float
+    etag: str
+
+
+class StaticFileCache:
+    """
+    LRU cache of small static file bodies bounded by total bytes
+
+    Entries are keyed by file path and checked against the manifest
+    entry, so a rebuilt file is re-read without any per-request
+    stat. Files larger than ``STATIC_CACHE_MAX_FILE_BYTES`` are never cached.
+    """
+
+    def __init__(self, max_bytes: int = None, max_file_bytes: int = None):
+        self._max_bytes = max_bytes
+        self._max_file_bytes = max_file_bytes
+        self._entries: OrderedDict[str, CachedFile] = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bypasses = 0
+
+    @property
+    def max_bytes(self) -> int:
+        return Config.STATIC_CACHE_MAX_BYTES if self._max_bytes is None else self._max_bytes
+
+    @property
+    def max_file_bytes(self) -> int:
+        if self._max_file_bytes is None:
+            return Config.STATIC_CACHE_MAX_FILE_BYTES
+        return self._max_file_bytes
+
+    def get(self, entry: StaticFile) -> Optional[CachedFile]:
+        """
+        Return the cached body for entry, reading it on a miss
+
+        Args:
+            entry: Manifest entry to serve
+
+        Returns:
+            CachedFile, or None if the file should be streamed from disk
+        """
+        if entry.size > min(self.max_file_bytes, self.max_bytes):
+            with self._lock:
+                self.bypasses += 1
+            return None
+
+        with self._lock:
+            cached = self._entries.get(entry.path)
+            if cached is not None and cached.entry == entry:
+                self._entries.move_to_end(entry.path)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        # An OSError (the file went away in a rebuild) is left to the caller
+        with open(entry.path, 'rb') as f:
+            body = f.read()
+            mtime = os.fstat(f.fileno()).st_mtime
+            etag = manifest.etag(entry, f, body)
+
+        cached = CachedFile(
+            body=body,
+            headers=(
+                ('Content-Type', entry.content_type),
+                ('Last-Modified', http_date(mtime)),
+                ('ETag', quote_etag(etag)),
+                ('Cache-Control', entry.cache_control),
+                *encoding_headers(entry),
+            ),
+            entry=entry,
+            size=len(body),
+            mtime=mtime,
+            etag=etag,
+        )
+        self._store(entry.path, cached)
+        return cached
+
+    def _store(self, path: str, cached: CachedFile):
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self.size_bytes -= old.size
+            self._entries[path] = cached
+            self.size_bytes += cached.size
+            while self.size_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= evicted.size
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached file"""
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> dict:
+        """Hit/miss counters for tuning the byte budget"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'files': len(self._entries),
+                'size_bytes': self.size_bytes,
+                'max_bytes': self.max_bytes,
+                'max_file_bytes': self.max_file_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'bypasses': self.bypasses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+file_cache = StaticFileCache()
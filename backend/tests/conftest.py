@@ -2,24 +2,46 @@ import os
 import pytest
 from pathlib import Path
 
+import models
+import static_files
 from models import Database, Session
 
 
+@pytest.fixture(autouse=True)
+def reset_email_service():
+    """Start every test with a closed circuit breaker and empty send metrics."""
+    import email_service
+
+    email_service.breaker.reset()
+    email_service.send_metrics.reset()
+
+
 @pytest.fixture
 def test_db(tmp_path, monkeypatch):
     """Patch Config.DATABASE_PATH to a temp file and initialize tables."""
     db_path = str(tmp_path / "test.db")
     monkeypatch.setattr("config.Config.DATABASE_PATH", db_path)
     Database(db_path)
-    return db_path
+    yield db_path
+    models.last_accessed_buffer.flush()
+    models.session_cache.clear()
+    models.close_all()
 
 
 @pytest.fixture
-def app(test_db):
+def app(test_db, monkeypatch):
     """Create Flask app configured for testing."""
-    from app import app as flask_app
+    from app import create_app
     from auth import limiter as auth_limiter
 
+    # Outbox messages are sent explicitly by tests, not by background threads
+    monkeypatch.setattr("config.Config.EMAIL_OUTBOX_WORKERS", 0)
+    monkeypatch.setattr(
+        "config.Config.DISCOVERY_INDEX_PATH", str(Path(test_db).parent / "discovery.db")
+    )
+
+    flask_app = create_app()
+
     flask_app.config["TESTING"] = True
     flask_app.config["SECRET_KEY"] = "test-secret-key"
     auth_limiter.enabled = False
@@ -45,6 +67,19 @@ def authenticated_client(client, test_db):
     return client
 
 
+@pytest.fixture
+def fake_mailgun(monkeypatch):
+    """Local fake Mailgun API with credentials pointed at it."""
+    from tests.fake_mailgun import FakeMailgun
+
+    server = FakeMailgun().start()
+    monkeypatch.setattr("config.Config.MAILGUN_API_KEY", "test-key")
+    monkeypatch.setattr("config.Config.MAILGUN_DOMAIN", "mg.example.com")
+    monkeypatch.setattr("config.Config.MAILGUN_API_BASE", server.api_base)
+    yield server
+    server.stop()
+
+
 @pytest.fixture
 def content_dir(tmp_path):
     """Temp content directory with sample markdown files."""
@@ -82,8 +117,8 @@ def content_dir(tmp_path):
 
 
 @pytest.fixture
-def public_dir(tmp_path):
-    """Temp public directory with sample static files."""
+def public_dir(tmp_path, monkeypatch):
+    """Temp public directory with sample static files, served by the app."""
     d = tmp_path / "public"
     d.mkdir()
     (d / "index.html").write_text("<html><body>Home</body></html>")
@@ -94,4 +129,7 @@ def public_dir(tmp_path):
 
     (d / "style.css").write_text("body { color: black; }")
 
-    return d
+    monkeypatch.setattr("config.Config.PUBLIC_DIR", str(d))
+    yield d
+    static_files.manifest.invalidate()
+    static_files.file_cache.clear()
@@ -0,0 +1,86 @@
+"""Local stand-in for the Mailgun messages API, served over real HTTP."""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class FakeMailgun:
+    """
+    Minimal Mailgun lookalike on 127.0.0.1
+
+    Accepts POST /v3/<domain>/messages and records the form fields. Set
+    ``fail_next`` to answer that many requests with ``fail_status`` (HTTP
+    500 by default) and, if ``retry_after`` is set, a Retry-After header.
+    Set ``delay`` to simulate a slow API.
+    """
+
+    def __init__(self):
+        self.messages: list[dict] = []
+        self.requests = 0
+        self.connections: set[tuple] = set()
+        self.fail_next = 0
+        self.fail_status = 500
+        self.retry_after = None
+        self.delay = 0.0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True
+        )
+
+    @property
+    def api_base(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v3"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                fields = parse_qs(self.rfile.read(length).decode())
+                if fake.delay:
+                    time.sleep(fake.delay)
+
+                with fake._lock:
+                    fake.requests += 1
+                    fake.connections.add(self.client_address)
+                    failing = fake.fail_next > 0
+                    if failing:
+                        fake.fail_next -= 1
+                    elif self.path.endswith('/messages'):
+                        fake.messages.append({k: v[0] if len(v) == 1 else v for k, v in fields.items()})
+
+                status = 200
+                if failing:
+                    status = fake.fail_status
+                elif not self.path.endswith('/messages'):
+                    status = 500
+                body = b'{"message": "Internal error"}' if status != 200 else \
+                    b'{"id": "<fake@mailgun>", "message": "Queued. Thank you."}'
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                if failing and fake.retry_after is not None:
+                    self.send_header('Retry-After', str(fake.retry_after))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,130 @@
+from unittest.mock import patch
+
+import pytest
+
+import discovery
+
+
+class TestStatsEndpoint:
+    @pytest.fixture(autouse=True)
+    def admin(self, monkeypatch):
+        monkeypatch.setattr("config.Config.ADMIN_EMAILS", {"test@example.com"})
+
+    def test_requires_auth(self, client, test_db):
+        resp = client.get("/api/stats")
+        assert resp.status_code == 302
+
+    def test_requires_admin(self, authenticated_client, test_db, monkeypatch):
+        monkeypatch.setattr("config.Config.ADMIN_EMAILS", {"admin@example.com"})
+        resp = authenticated_client.get("/api/stats")
+        assert resp.status_code == 403
+
+    def test_reports_session_cache(self, authenticated_client, test_db):
+        resp = authenticated_client.get("/api/stats")
+        assert resp.status_code == 200
+        stats = resp.get_json()["session_cache"]
+        assert {"hits", "misses", "evictions", "size"} <= set(stats)
+
+    def test_reports_static_file_cache(self, authenticated_client, test_db):
+        resp = authenticated_client.get("/api/stats")
+        stats = resp.get_json()["static_file_cache"]
+        assert {"hits", "misses", "evictions", "bypasses", "size_bytes"} <= set(stats)
+
+    def test_reports_discovery_index(self, authenticated_client, test_db):
+        resp = authenticated_client.get("/api/stats")
+        assert {"pages", "published", "generation"} <= set(resp.get_json()["discovery_index"])
+
+
+class TestInvitesEndpoint:
+    def test_requires_admin(self, authenticated_client, test_db):
+        resp = authenticated_client.post("/api/invites", json={"emails": ["a@example.com"]})
+        assert resp.status_code == 403
+
+    def test_admin_can_invite(self, authenticated_client, test_db, fake_mailgun, monkeypatch):
+        monkeypatch.setattr("config.Config.ADMIN_EMAILS", {"test@example.com"})
+        resp = authenticated_client.post(
+            "/api/invites", json={"emails": ["a@example.com", "bad"]}
+        )
+        assert resp.status_code == 200
+        body = resp.get_json()
+        assert body["sent"] == 1
+        assert body["failed"] == 1
+        assert body["results"][1] == {"email": "bad", "status": "invalid"}
+
+    def test_rejects_malformed_body(self, authenticated_client, test_db, monkeypatch):
+        monkeypatch.setattr("config.Config.ADMIN_EMAILS", {"test@example.com"})
+        resp = authenticated_client.post("/api/invites", json={"emails": "a@example.com"})
+        assert resp.status_code == 400
+
+
+class TestCreateApp:
+    def test_no_app_created_at_import(self):
+        import app as app_module
+
+        assert not hasattr(app_module, "app")
+
+    def test_config_override(self, test_db):
+        from app import create_app
+        from config import Config
+
+        class TestConfig:
+            SECRET_KEY = "override-key"
+            SESSION_TIMEOUT_DAYS = 1
+
+        secret_key = Config.SECRET_KEY
+        flask_app = create_app(TestConfig)
+        assert flask_app.config["SECRET_KEY"] == "override-key"
+        assert flask_app.permanent_session_lifetime.days == 1
+        # Overrides stay with this app instead of leaking into Config
+        assert Config.SECRET_KEY == secret_key
+        assert create_app().config["SECRET_KEY"] == secret_key
+
+    def test_migrates_on_startup(self, tmp_path, monkeypatch):
+        import sqlite3
+        import models
+        from app import create_app
+
+        db_path = str(tmp_path / "startup.db")
+        monkeypatch.setattr("config.Config.DATABASE_PATH", db_path)
+        create_app()
+        conn = sqlite3.connect(db_path)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        conn.close()
+        assert version == models.SCHEMA_VERSION
+
+    def test_rejects_unknown_static_offload(self, test_db, monkeypatch):
+        from app import create_app
+
+        monkeypatch.setattr("config.Config.STATIC_OFFLOAD", "x-accel-redirect")
+        with pytest.raises(ValueError, match="STATIC_OFFLOAD"):
+            create_app()
+
+
+class TestOrphansEndpoint:
+    def test_lists_orphans_with_metadata(self, authenticated_client, content_dir, monkeypatch):
+        monkeypatch.setattr("discovery.default_content_dir", lambda: content_dir)
+        resp = authenticated_client.get("/api/orphans")
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert data["count"] == 2
+        assert {
+            "path": "orphan.md",
+            "title": "Orphan Page",
+            "tags": ["lonely"],
+            "date": "2024-06-15",
+        } in data["orphans"]
+
+    def test_watcher_serves_from_memory(self, authenticated_client, content_dir, monkeypatch):
+        monkeypatch.setattr("discovery.default_content_dir", lambda: content_dir)
+        monkeypatch.setattr("config.Config.DISCOVERY_WATCH", True)
+        watcher = discovery.VaultWatcher(backend="poll", poll_seconds=60)
+        monkeypatch.setattr(discovery, "watcher", watcher)
+        try:
+            assert authenticated_client.get("/api/orphans").get_json()["count"] == 2
+            assert watcher.running
+
+            with patch.object(discovery.VaultIndex, "_stat_tree", side_effect=AssertionError):
+                resp = authenticated_client.get("/api/orphans")
+            assert resp.get_json()["count"] == 2
+        finally:
+            watcher.stop()
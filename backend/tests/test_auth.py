@@ -1,6 +1,9 @@
 from unittest.mock import patch
 
-from models import MagicLink, Session
+import pytest
+
+import outbox
+from models import EmailOutbox, MagicLink, Session
 
 
 class TestLoginPage:
@@ -10,6 +13,10 @@ class TestLoginPage:
 
 
 class TestRequestLink:
+    @pytest.fixture(autouse=True)
+    def synchronous_email(self, monkeypatch):
+        monkeypatch.setattr("config.Config.EMAIL_OUTBOX_ENABLED", False)
+
     def test_valid_email(self, client, test_db):
         with patch("auth.send_magic_link", return_value=True) as mock_send:
             resp = client.post(
@@ -43,6 +50,69 @@ class TestRequestLink:
         assert resp.status_code == 500
 
 
+class TestRequestLinkOutbox:
+    def test_queues_without_sending(self, client, test_db):
+        with patch("auth.send_magic_link") as mock_send:
+            resp = client.post(
+                "/auth/request-link",
+                data={"email": "user@example.com"},
+            )
+        assert resp.status_code == 200
+        mock_send.assert_not_called()
+        assert EmailOutbox.counts() == {"pending": 1}
+
+    def test_slow_mailgun_does_not_block(self, client, test_db, fake_mailgun):
+        fake_mailgun.delay = 2
+        resp = client.post(
+            "/auth/request-link",
+            data={"email": "user@example.com"},
+        )
+        assert resp.status_code == 200
+        assert fake_mailgun.requests == 0
+
+    def test_worker_delivers_queued_link(self, client, test_db, fake_mailgun):
+        client.post("/auth/request-link", data={"email": "user@example.com"})
+        assert outbox.worker.process_due() == 1
+        assert EmailOutbox.counts() == {"sent": 1}
+        assert fake_mailgun.messages[0]["to"] == "user@example.com"
+        assert "/auth/verify/" in fake_mailgun.messages[0]["text"]
+
+
+class TestRequestLinkReuse:
+    def _request(self, client):
+        return client.post("/auth/request-link", data={"email": "user@example.com"})
+
+    def _link_count(self, test_db):
+        import sqlite3
+
+        conn = sqlite3.connect(test_db)
+        count = conn.execute("SELECT COUNT(*) FROM magic_links").fetchone()[0]
+        conn.close()
+        return count
+
+    def test_off_mints_every_time(self, client, test_db):
+        self._request(client)
+        self._request(client)
+        assert self._link_count(test_db) == 2
+        assert EmailOutbox.counts() == {"pending": 2}
+
+    def test_resend_reuses_token(self, client, test_db, monkeypatch):
+        monkeypatch.setattr("config.Config.MAGIC_LINK_REUSE", "resend")
+        self._request(client)
+        self._request(client)
+        assert self._link_count(test_db) == 1
+        messages = [EmailOutbox.get(i)["magic_link_url"] for i in (1, 2)]
+        assert messages[0] == messages[1]
+
+    def test_suppress_sends_nothing(self, client, test_db, monkeypatch):
+        monkeypatch.setattr("config.Config.MAGIC_LINK_REUSE", "suppress")
+        self._request(client)
+        resp = self._request(client)
+        assert resp.status_code == 200
+        assert self._link_count(test_db) == 1
+        assert EmailOutbox.counts() == {"pending": 1}
+
+
 class TestVerifyToken:
     def test_valid_token(self, client, test_db):
         token = MagicLink.create("user@example.com")
@@ -81,3 +151,26 @@ class TestLogout:
     def test_logout_without_session(self, client, test_db):
         resp = client.post("/auth/logout")
         assert resp.status_code == 302
+
+
+class TestRateLimits:
+    @pytest.fixture
+    def limiter(self, app):
+        from auth import limiter
+
+        limiter.enabled = True
+        limiter.reset()
+        yield limiter
+        limiter.reset()
+        limiter.enabled = False
+
+    def test_request_link_limited(self, client, limiter, test_db):
+        statuses = [
+            client.post("/auth/request-link", data={"email": "not-an-email"}).status_code
+            for _ in range(6)
+        ]
+        assert statuses[-1] == 429
+
+    def test_static_files_not_limited(self, authenticated_client, public_dir, limiter, test_db):
+        statuses = {authenticated_client.get("/style.css").status_code for _ in range(60)}
+        assert statuses == {200}
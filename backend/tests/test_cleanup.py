@@ -1,5 +1,5 @@
 import sqlite3
-from datetime import datetime, timedelta
+import time
 
 from models import MagicLink, Session
 from cleanup import cleanup_database
@@ -10,19 +10,19 @@ class TestCleanupDatabase:
         # Create an expired token
         token = MagicLink.create("expired@example.com")
         conn = sqlite3.connect(test_db)
-        past = datetime.utcnow() - timedelta(hours=1)
+        past = int(time.time()) - 60 * 60
         conn.execute(
             "UPDATE magic_links SET expires_at = ? WHERE token = ?",
-            (str(past), token),
+            (past, token),
         )
         conn.commit()
 
         # Create an old session
         sid = Session.create("old@example.com")
-        old_date = datetime.utcnow() - timedelta(days=60)
+        old_date = int(time.time()) - 60 * 24 * 60 * 60
         conn.execute(
             "UPDATE sessions SET created_at = ? WHERE session_id = ?",
-            (str(old_date), sid),
+            (old_date, sid),
         )
         conn.commit()
         conn.close()
@@ -1,4 +1,16 @@
-from discovery import find_orphaned_pages, get_page_metadata
+import builtins
+import os
+import random
+import sqlite3
+import time
+from unittest.mock import patch
+
+import pytest
+
+from discovery import (
+    Inotify, LinkResolver, PageRecord, VaultIndex, VaultWatcher, find_orphaned_pages,
+    get_page_metadata, parse_page, slugify_path,
+)
 
 
 class TestFindOrphanedPages:
@@ -89,3 +101,351 @@ class TestGetPageMetadata:
         # raise or return empty depending on implementation
         meta = get_page_metadata(str(tmp_path / "nope"))
         assert meta == {}
+
+
+class TestVaultIndex:
+    def test_reads_each_file_once(self, content_dir):
+        real_open = builtins.open
+        opened = []
+
+        def counting_open(file, *args, **kwargs):
+            opened.append(str(file))
+            return real_open(file, *args, **kwargs)
+
+        with patch("builtins.open", side_effect=counting_open):
+            index = VaultIndex(str(content_dir)).scan()
+            orphans = index.orphans()
+            metadata = index.metadata()
+
+        assert sorted(opened) == sorted(str(p) for p in content_dir.rglob("*.md"))
+        assert orphans == find_orphaned_pages(str(content_dir))
+        assert metadata == get_page_metadata(str(content_dir))
+
+    def test_records_unpublished_pages_without_parsing(self, content_dir):
+        index = VaultIndex(str(content_dir)).scan()
+        assert index.records["draft.md"].published is False
+        assert index.records["draft.md"].title is None
+        assert "draft.md" not in {r.path for r in index.published()}
+
+    def test_backlinks(self, content_dir):
+        backlinks = VaultIndex(str(content_dir)).scan().backlinks()
+        assert backlinks["page-b.md"] == {"page-a.md"}
+        assert backlinks["orphan.md"] == set()
+
+
+class TestParsePage:
+    def test_extracts_record(self):
+        record = parse_page(
+            "notes/a.md",
+            "---\ntitle: A\npublish: true\ntags: [x, \"y\"]\ndate: 2024-02-02\n---\n"
+            "See [[B#intro]] and [[C]].\n",
+        )
+        assert record.title == "A"
+        assert record.tags == ("x", "y")
+        assert record.date == "2024-02-02"
+        assert record.links == ("B", "C")
+
+    def test_unpublished(self):
+        assert parse_page("a.md", "---\ntitle: A\n---\n[[B]]").published is False
+
+
+def page(path, title=None, aliases=(), published=True):
+    return PageRecord(path, published, title=title, aliases=tuple(aliases))
+
+
+class TestLinkResolver:
+    def test_unique_filename_in_subfolder(self):
+        resolver = LinkResolver([page("notes/deep/Some Note.md")])
+        assert resolver.resolve("Some Note") == "notes/deep/Some Note.md"
+        assert resolver.resolve("Some Note.md") == "notes/deep/Some Note.md"
+
+    def test_ambiguous_filename_resolves_from_vault_root(self):
+        resolver = LinkResolver([page("a/todo.md"), page("b/todo.md"), page("todo.md")])
+        assert resolver.resolve("todo") == "todo.md"
+        assert resolver.resolve("b/todo") == "b/todo.md"
+
+    def test_ambiguous_without_root_page(self):
+        resolver = LinkResolver([page("a/Todo.md"), page("b/Todo.md")])
+        # Not resolvable on the site; falls back to the first filename match
+        assert resolver.resolve("Todo") == "a/Todo.md"
+
+    def test_unpublished_page_counts_towards_ambiguity(self):
+        resolver = LinkResolver([page("a/x.md"), page("drafts/x.md", published=False)])
+        assert resolver.names["x"] == {"a/x", "drafts/x"}
+        # Only the filename fallback finds it
+        assert resolver.resolve("x") == "a/x.md"
+
+    def test_relative_segments_dropped(self):
+        resolver = LinkResolver([page("a/x.md"), page("b/x.md")])
+        assert resolver.resolve("../b/x") == "b/x.md"
+
+    def test_folder_index(self):
+        resolver = LinkResolver([page("projects/index.md")])
+        assert resolver.resolve("projects") == "projects/index.md"
+        assert resolver.resolve("projects/index") == "projects/index.md"
+
+    def test_aliases(self):
+        resolver = LinkResolver([page("long-name.md", aliases=["Short", "other name"])])
+        assert resolver.resolve("Short") == "long-name.md"
+        assert resolver.resolve("other name") == "long-name.md"
+
+    def test_filename_wins_over_title(self):
+        resolver = LinkResolver([page("Alpha.md", title="Beta"), page("Beta.md", title="Gamma")])
+        assert resolver.resolve("Beta") == "Beta.md"
+        assert resolver.resolve("Gamma") == "Beta.md"
+
+    def test_case_insensitive_filename_fallback(self):
+        resolver = LinkResolver([page("notes/Page-B.md")])
+        assert resolver.resolve("page-b") == "notes/Page-B.md"
+
+    def test_unknown(self):
+        assert LinkResolver([page("a.md")]).resolve("missing") is None
+
+    def test_slugify_matches_quartz(self):
+        assert slugify_path("Notes/Q&A 100%?.md") == "Notes/Q-and-A-100-percent"
+        assert slugify_path("folder/_index.md") == "folder/index"
+
+
+class TestAliasesAndDisplayText:
+    def test_inline_aliases(self):
+        record = parse_page("a.md", "---\npublish: true\naliases: [One, \"Two\"]\n---\n")
+        assert record.aliases == ("One", "Two")
+
+    def test_block_aliases(self):
+        record = parse_page("a.md", "---\npublish: true\naliases:\n  - One\n  - Two\n---\n")
+        assert record.aliases == ("One", "Two")
+
+    def test_single_alias(self):
+        record = parse_page("a.md", "---\npublish: true\nalias: One\n---\n")
+        assert record.aliases == ("One",)
+
+    def test_display_text_stripped(self):
+        record = parse_page("a.md", "publish: true\n[[Target|shown]] and [[Other\\|cell]]")
+        assert record.links == ("Target", "Other")
+
+    def test_alias_link_resolves(self, content_dir):
+        (content_dir / "orphan.md").write_text(
+            "---\ntitle: Orphan Page\npublish: true\naliases: [Lonely]\n---\nNobody.\n"
+        )
+        (content_dir / "page-b.md").write_text("---\ntitle: Page B\npublish: true\n---\n[[Lonely]]\n")
+        assert "orphan.md" not in find_orphaned_pages(str(content_dir))
+
+
+def touch_later(path, seconds=10):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + seconds * 10**9))
+
+
+class TestIncrementalIndex:
+    def test_refresh_reparses_only_changed_files(self, content_dir, tmp_path):
+        index = VaultIndex(str(content_dir), store_path=str(tmp_path / "idx.db"))
+        index.refresh()
+
+        (content_dir / "orphan.md").write_text(
+            "---\ntitle: Orphan Page\npublish: true\n---\nNow links [[Page A]].\n"
+        )
+        touch_later(content_dir / "orphan.md")
+
+        parsed = []
+        real_parse = parse_page
+        with patch("discovery.parse_page", side_effect=lambda p, c: parsed.append(p) or real_parse(p, c)):
+            changes = index.refresh()
+
+        assert parsed == ["orphan.md"]
+        assert changes == {"added": 0, "changed": 1, "removed": 0}
+        assert "page-a.md" not in index.orphans()
+        assert "orphan.md" in index.orphans()
+
+    def test_added_and_removed_files(self, content_dir, tmp_path):
+        index = VaultIndex(str(content_dir), store_path=str(tmp_path / "idx.db"))
+        index.refresh()
+        generation = index.generation
+
+        (content_dir / "page-a.md").unlink()
+        (content_dir / "new.md").write_text("---\ntitle: New\npublish: true\n---\n[[orphan]]\n")
+
+        assert index.refresh() == {"added": 1, "changed": 0, "removed": 1}
+        assert index.generation == generation + 1
+        assert "page-a.md" not in index.records
+        # page-b lost its only backlink, orphan gained one
+        assert index.backlinks()["page-b.md"] == set()
+        assert index.backlinks()["orphan.md"] == {"new.md"}
+
+    def test_warm_restart_is_stat_only(self, content_dir, tmp_path):
+        store = str(tmp_path / "idx.db")
+        cold = VaultIndex(str(content_dir), store_path=store)
+        cold.refresh()
+
+        warm = VaultIndex(str(content_dir), store_path=store)
+        with patch("discovery.parse_page", side_effect=AssertionError("parsed")), \
+                patch("discovery.LinkResolver.resolve", side_effect=AssertionError("resolved")):
+            assert warm.refresh() == {"added": 0, "changed": 0, "removed": 0}
+
+        assert warm.orphans() == cold.orphans()
+        assert warm.metadata() == cold.metadata()
+        assert warm.backlinks() == cold.backlinks()
+
+    def test_store_for_other_directory_ignored(self, content_dir, tmp_path):
+        store = str(tmp_path / "idx.db")
+        VaultIndex(str(content_dir), store_path=store).refresh()
+
+        other = tmp_path / "other"
+        other.mkdir()
+        (other / "solo.md").write_text("---\npublish: true\n---\n")
+        assert VaultIndex(str(other), store_path=store).refresh()["added"] == 1
+
+    def test_touched_file_with_same_content_not_reparsed(self, content_dir, tmp_path):
+        index = VaultIndex(str(content_dir), store_path=str(tmp_path / "idx.db"), hash_content=True)
+        index.refresh()
+        touch_later(content_dir / "page-b.md")
+
+        with patch("discovery.LinkResolver.add", side_effect=AssertionError("re-indexed")):
+            index.refresh()
+        assert index.generation == 1
+
+    def test_refresh_paths_only_stats_given_files(self, content_dir):
+        index = VaultIndex(str(content_dir))
+        index.refresh()
+        (content_dir / "page-a.md").unlink()
+        (content_dir / "other.md").write_text("---\npublish: true\n---\n")
+
+        with patch.object(VaultIndex, "_stat_tree", side_effect=AssertionError("walked")):
+            changes = index.refresh(["other.md", "page-a.md", "notes.txt"])
+        assert changes == {"added": 1, "changed": 0, "removed": 1}
+
+    def test_unusable_store_falls_back_to_memory(self, content_dir, tmp_path):
+        index = VaultIndex(str(content_dir), store_path=str(tmp_path / "missing" / "idx.db"))
+        index.refresh()
+        assert "orphan.md" in index.orphans()
+        assert index.store is None
+
+        (content_dir / "new.md").write_text("---\npublish: true\n---\n[[orphan]]\n")
+        assert index.refresh()["added"] == 1
+        assert "orphan.md" not in index.orphans()
+
+    def test_failed_save_forces_rescan_on_restart(self, content_dir, tmp_path):
+        store = str(tmp_path / "idx.db")
+        index = VaultIndex(str(content_dir), store_path=store)
+        index.refresh()
+
+        (content_dir / "new.md").write_text("---\npublish: true\n---\n[[orphan]]\n")
+        with patch("discovery.IndexStore.save", side_effect=sqlite3.OperationalError("disk full")):
+            index.refresh()
+        assert "orphan.md" not in index.orphans()
+
+        assert VaultIndex(str(content_dir), store_path=store).refresh()["added"] == 6
+
+    def test_incremental_matches_full_rebuild(self, tmp_path):
+        rng = random.Random(7)
+        vault = tmp_path / "vault"
+        (vault / "sub").mkdir(parents=True)
+        names = [f"n{i}" for i in range(12)]
+        index = VaultIndex(str(vault), store_path=str(tmp_path / "idx.db"))
+
+        for step in range(60):
+            name = rng.choice(names)
+            path = vault / rng.choice(["", "sub"]) / f"{name}.md"
+            if path.exists() and rng.random() < 0.3:
+                path.unlink()
+            else:
+                links = " ".join(f"[[{rng.choice(names + ['sub/' + n for n in names])}]]" for _ in range(3))
+                publish = "true" if rng.random() < 0.8 else "false"
+                alias = f"aliases: [{rng.choice(names)}x]\n" if rng.random() < 0.3 else ""
+                path.write_text(f"---\ntitle: T{rng.choice(names)}\n{alias}publish: {publish}\n---\n{links}\n")
+                touch_later(path, step + 1)
+
+            index.refresh()
+            fresh = VaultIndex(str(vault)).scan()
+            assert index.backlinks() == fresh.backlinks(), step
+            assert index.orphans() == fresh.orphans()
+
+
+def inotify_available():
+    try:
+        Inotify().close()
+        return True
+    except OSError:
+        return False
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+@pytest.fixture(params=[
+    "poll",
+    pytest.param("inotify", marks=pytest.mark.skipif(
+        not inotify_available(), reason="inotify not available")),
+])
+def watcher(request, content_dir):
+    index = VaultIndex(str(content_dir))
+    w = VaultWatcher(index, backend=request.param, debounce_seconds=0.2, poll_seconds=0.05)
+    w.start()
+    yield w
+    w.stop()
+
+
+class TestVaultWatcher:
+    def test_start_indexes_vault(self, watcher):
+        assert watcher.running
+        assert "orphan.md" in watcher.index.orphans()
+
+    def test_applies_changes(self, watcher, content_dir):
+        generation = watcher.index.generation
+        (content_dir / "new.md").write_text("---\npublish: true\n---\n[[orphan]]\n")
+        (content_dir / "page-b.md").unlink()
+
+        wait_for(lambda: watcher.index.generation > generation)
+        assert "orphan.md" not in watcher.index.orphans()
+        assert "page-b.md" not in watcher.index.records
+
+    def test_burst_is_one_update(self, watcher, content_dir):
+        generation, before = watcher.index.generation, len(watcher.index.records)
+        for i in range(20):
+            (content_dir / f"burst-{i}.md").write_text("---\npublish: true\n---\n")
+
+        wait_for(lambda: len(watcher.index.records) == before + 20)
+        time.sleep(0.3)
+        assert watcher.index.generation == generation + 1
+        assert watcher.batches == 1
+
+    def test_new_directory(self, watcher, content_dir):
+        sub = content_dir / "sub"
+        sub.mkdir()
+        (sub / "deep.md").write_text("---\npublish: true\n---\n[[orphan]]\n")
+
+        wait_for(lambda: "sub/deep.md" in watcher.index.records)
+        # Files added to the new directory later are seen too
+        (sub / "deeper.md").write_text("---\npublish: true\n---\n")
+        wait_for(lambda: "sub/deeper.md" in watcher.index.records)
+
+    def test_stop(self, watcher, content_dir):
+        watcher.stop()
+        assert not watcher.running
+        (content_dir / "late.md").write_text("---\npublish: true\n---\n")
+        time.sleep(0.3)
+        assert "late.md" not in watcher.index.records
+
+
+class TestParallelScan:
+    def test_matches_serial_scan(self, content_dir):
+        (content_dir / "sub").mkdir()
+        for i in range(10):
+            (content_dir / "sub" / f"n{i}.md").write_text(
+                f"---\ntitle: N{i}\npublish: true\n---\n[[n{(i + 1) % 10}]] [[orphan]]\n"
+            )
+        serial = VaultIndex(str(content_dir), scan_workers=1).scan()
+        parallel = VaultIndex(str(content_dir), scan_workers=2, scan_chunk_size=3).scan()
+
+        assert parallel.records == serial.records
+        assert parallel._stats == serial._stats
+        assert parallel.backlinks() == serial.backlinks()
+
+    def test_small_vault_parsed_in_process(self, content_dir):
+        index = VaultIndex(str(content_dir), scan_workers=4, scan_chunk_size=100)
+        with patch("discovery.ProcessPoolExecutor", side_effect=AssertionError("pool")):
+            index.scan()
+        assert "orphan.md" in index.orphans()
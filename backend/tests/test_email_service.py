@@ -1,8 +1,11 @@
+import time
 from unittest.mock import patch
 
+import pytest
 import responses
 
-from email_service import is_valid_email, send_magic_link
+import email_service
+from email_service import CircuitBreaker, MailgunRejected, is_valid_email, send_magic_link
 
 
 class TestIsValidEmail:
@@ -59,3 +62,155 @@ class TestSendMagicLink:
 
         result = send_magic_link("user@example.com", "https://example.com/auth/verify/tok123")
         assert result is False
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+        for _ in range(3):
+            assert breaker.allow() is True
+            breaker.record_failure()
+        assert breaker.state == "open"
+        assert breaker.allow() is False
+
+    def test_success_resets_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == "closed"
+
+    def test_half_open_single_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+        with patch("email_service.time.monotonic", return_value=100.0):
+            breaker.record_failure()
+        with patch("email_service.time.monotonic", return_value=131.0):
+            assert breaker.state == "half_open"
+            assert breaker.allow() is True
+            assert breaker.allow() is False
+            breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+        with patch("email_service.time.monotonic", return_value=100.0):
+            breaker.record_failure()
+        with patch("email_service.time.monotonic", return_value=131.0):
+            assert breaker.allow() is True
+            breaker.record_failure()
+            assert breaker.allow() is False
+
+
+class TestSendResilience:
+    @responses.activate
+    def test_fails_fast_when_open(self, monkeypatch):
+        monkeypatch.setattr("config.Config.MAILGUN_API_KEY", "test-key")
+        monkeypatch.setattr("config.Config.MAILGUN_DOMAIN", "mg.example.com")
+        monkeypatch.setattr("config.Config.MAILGUN_BREAKER_THRESHOLD", 2)
+        responses.add(
+            responses.POST,
+            "https://api.mailgun.net/v3/mg.example.com/messages",
+            status=500,
+        )
+
+        for _ in range(4):
+            send_magic_link("user@example.com", "https://example.com/auth/verify/tok")
+
+        assert len(responses.calls) == 2
+        stats = email_service.metrics()
+        assert stats["breaker"]["state"] == "open"
+        assert stats["failed"] == 2
+        assert stats["rejected_by_breaker"] == 2
+
+    @responses.activate
+    def test_rejected_messages_do_not_open_breaker(self, monkeypatch):
+        monkeypatch.setattr("config.Config.MAILGUN_API_KEY", "test-key")
+        monkeypatch.setattr("config.Config.MAILGUN_DOMAIN", "mg.example.com")
+        monkeypatch.setattr("config.Config.MAILGUN_BREAKER_THRESHOLD", 2)
+        responses.add(
+            responses.POST,
+            "https://api.mailgun.net/v3/mg.example.com/messages",
+            status=400,
+            json={"message": "'to' parameter is not a valid address"},
+        )
+
+        for _ in range(4):
+            assert send_magic_link("bad@example.com", "https://example.com/auth/verify/tok") is False
+
+        assert len(responses.calls) == 4
+        assert email_service.metrics()["breaker"]["state"] == "closed"
+
+    @responses.activate
+    def test_bad_credentials_open_breaker(self, monkeypatch):
+        monkeypatch.setattr("config.Config.MAILGUN_API_KEY", "wrong-key")
+        monkeypatch.setattr("config.Config.MAILGUN_DOMAIN", "mg.example.com")
+        monkeypatch.setattr("config.Config.MAILGUN_BREAKER_THRESHOLD", 2)
+        responses.add(
+            responses.POST, "https://api.mailgun.net/v3/mg.example.com/messages", status=401,
+        )
+
+        for _ in range(3):
+            assert send_magic_link(
+                "user@example.com", "https://x/auth/verify/t", raise_on_reject=True
+            ) is False
+
+        assert len(responses.calls) == 2
+        assert email_service.metrics()["breaker"]["state"] == "open"
+
+    @responses.activate
+    def test_raise_on_reject(self, monkeypatch):
+        monkeypatch.setattr("config.Config.MAILGUN_API_KEY", "test-key")
+        monkeypatch.setattr("config.Config.MAILGUN_DOMAIN", "mg.example.com")
+        responses.add(
+            responses.POST, "https://api.mailgun.net/v3/mg.example.com/messages", status=400,
+        )
+
+        with pytest.raises(MailgunRejected) as excinfo:
+            send_magic_link("bad@example.com", "https://x/auth/verify/t", raise_on_reject=True)
+        assert excinfo.value.status_code == 400
+
+    @responses.activate
+    def test_throttling_counts_toward_breaker(self, monkeypatch):
+        monkeypatch.setattr("config.Config.MAILGUN_API_KEY", "test-key")
+        monkeypatch.setattr("config.Config.MAILGUN_DOMAIN", "mg.example.com")
+        monkeypatch.setattr("config.Config.MAILGUN_BREAKER_THRESHOLD", 2)
+        responses.add(
+            responses.POST, "https://api.mailgun.net/v3/mg.example.com/messages", status=429,
+        )
+
+        for _ in range(2):
+            send_magic_link("user@example.com", "https://x/auth/verify/t", raise_on_reject=True)
+        assert email_service.metrics()["breaker"]["state"] == "open"
+
+    @responses.activate
+    def test_records_latency(self, monkeypatch):
+        monkeypatch.setattr("config.Config.MAILGUN_API_KEY", "test-key")
+        monkeypatch.setattr("config.Config.MAILGUN_DOMAIN", "mg.example.com")
+        responses.add(
+            responses.POST,
+            "https://api.mailgun.net/v3/mg.example.com/messages",
+            status=200,
+        )
+        send_magic_link("user@example.com", "https://example.com/auth/verify/tok")
+        stats = email_service.metrics()
+        assert stats["sent"] == 1
+        assert stats["latency_max_ms"] >= 0
+
+    def test_http_session_reused(self):
+        assert email_service.get_http_session() is email_service.get_http_session()
+
+    def test_keep_alive_against_local_server(self, fake_mailgun):
+        for _ in range(3):
+            assert send_magic_link("user@example.com", "https://example.com/auth/verify/tok")
+        # All three sends reused one TCP connection
+        assert len(fake_mailgun.connections) == 1
+
+    def test_retry_after_not_honoured(self, fake_mailgun):
+        fake_mailgun.fail_next = 1
+        fake_mailgun.fail_status = 429
+        fake_mailgun.retry_after = 10
+
+        start = time.monotonic()
+        assert send_magic_link("user@example.com", "https://example.com/auth/verify/tok")
+        assert time.monotonic() - start < 5
+        assert fake_mailgun.requests == 2
@@ -0,0 +1,51 @@
+import json
+import sqlite3
+
+from invite import _describe_minutes, invite
+
+
+class TestInvite:
+    def test_sends_one_batch(self, test_db, fake_mailgun):
+        results = invite(["a@example.com", "b@example.com", "c@example.com"])
+        assert [r["status"] for r in results] == ["sent", "sent", "sent"]
+        assert fake_mailgun.requests == 1
+
+        message = fake_mailgun.messages[0]
+        assert message["to"] == ["a@example.com", "b@example.com", "c@example.com"]
+        variables = json.loads(message["recipient-variables"])
+        assert "/auth/verify/" in variables["b@example.com"]["link"]
+        assert "%recipient.link%" in message["text"]
+
+    def test_tokens_inserted(self, test_db, fake_mailgun):
+        invite(["a@example.com", "b@example.com"])
+        conn = sqlite3.connect(test_db)
+        count = conn.execute("SELECT COUNT(*) FROM magic_links").fetchone()[0]
+        conn.close()
+        assert count == 2
+
+    def test_batches_by_size(self, test_db, fake_mailgun, monkeypatch):
+        monkeypatch.setattr("config.Config.MAILGUN_BATCH_SIZE", 2)
+        progress = []
+        invite(
+            [f"user{i}@example.com" for i in range(5)],
+            progress=lambda done, total: progress.append((done, total)),
+        )
+        assert fake_mailgun.requests == 3
+        assert progress == [(2, 5), (4, 5), (5, 5)]
+
+    def test_reports_invalid_and_duplicate(self, test_db, fake_mailgun):
+        results = invite(["a@example.com", "not-an-email", "A@example.com"])
+        assert [r["status"] for r in results] == ["sent", "invalid", "duplicate"]
+
+    def test_failed_batch_reported_per_recipient(self, test_db, fake_mailgun, monkeypatch):
+        monkeypatch.setattr("config.Config.MAILGUN_BATCH_SIZE", 1)
+        fake_mailgun.fail_next = 1
+        results = invite(["a@example.com", "b@example.com"])
+        assert [r["status"] for r in results] == ["failed", "sent"]
+
+
+class TestDescribeMinutes:
+    def test_units(self):
+        assert _describe_minutes(15) == "15 minutes"
+        assert _describe_minutes(60) == "1 hour"
+        assert _describe_minutes(7 * 24 * 60) == "7 days"
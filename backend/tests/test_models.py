@@ -1,8 +1,10 @@
 import string
 import sqlite3
-from datetime import datetime, timedelta
+import threading
+import time
 from unittest.mock import patch
 
+import models
 from models import Database, MagicLink, Session
 
 
@@ -67,10 +69,10 @@ class TestMagicLinkVerify:
         token = MagicLink.create("user@example.com", expiration_minutes=0)
         # Force expiration by backdating
         conn = sqlite3.connect(test_db)
-        past = datetime.utcnow() - timedelta(hours=1)
+        past = int(time.time()) - 60 * 60
         conn.execute(
             "UPDATE magic_links SET expires_at = ? WHERE token = ?",
-            (str(past), token),
+            (past, token),
         )
         conn.commit()
         conn.close()
@@ -95,10 +97,10 @@ class TestDeleteExpired:
 
         expired_token = MagicLink.create("expired@example.com")
         conn = sqlite3.connect(test_db)
-        past = datetime.utcnow() - timedelta(hours=1)
+        past = int(time.time()) - 60 * 60
         conn.execute(
             "UPDATE magic_links SET expires_at = ? WHERE token = ?",
-            (str(past), expired_token),
+            (past, expired_token),
         )
         conn.commit()
         conn.close()
@@ -141,10 +143,10 @@ class TestSessionValidate:
         sid = Session.create("user@example.com")
         # Backdate last_accessed beyond timeout
         conn = sqlite3.connect(test_db)
-        old = datetime.utcnow() - timedelta(days=30)
+        old = int(time.time()) - 30 * 24 * 60 * 60
         conn.execute(
             "UPDATE sessions SET last_accessed = ? WHERE session_id = ?",
-            (str(old), sid),
+            (old, sid),
         )
         conn.commit()
         conn.close()
@@ -177,10 +179,10 @@ class TestSessionDeleteOld:
 
         old_sid = Session.create("old@example.com")
         conn = sqlite3.connect(test_db)
-        old_date = datetime.utcnow() - timedelta(days=60)
+        old_date = int(time.time()) - 60 * 24 * 60 * 60
         conn.execute(
             "UPDATE sessions SET created_at = ? WHERE session_id = ?",
-            (str(old_date), old_sid),
+            (old_date, old_sid),
         )
         conn.commit()
         conn.close()
@@ -210,3 +212,399 @@ class TestDatabase:
         count = conn.execute("SELECT COUNT(*) FROM magic_links").fetchone()[0]
         conn.close()
         assert count == 1
+
+
+class TestConnectionPool:
+    def test_get_db_is_shared(self, test_db):
+        assert models.get_db() is models.get_db(test_db)
+
+    def test_connections_reused_across_calls(self, test_db):
+        db = models.get_db()
+        sid = Session.create("user@example.com")
+        opened = db.connections_opened
+        for _ in range(10):
+            Session.validate(sid)
+            Session.update_last_accessed(sid)
+        assert db.connections_opened == opened
+
+    def test_pool_size_zero_closes_connections(self, tmp_path):
+        db = Database(str(tmp_path / "nopool.db"), pool_size=0)
+        opened = db.connections_opened
+        with db.connection() as conn:
+            conn.execute("SELECT 1")
+        with db.connection() as conn:
+            conn.execute("SELECT 1")
+        assert db.connections_opened == opened + 2
+
+    def test_request_shares_one_connection(self, app, test_db):
+        db = models.get_db()
+        with app.test_request_context():
+            with db.connection() as first:
+                pass
+            with db.connection() as second:
+                pass
+            assert first is second
+        # Released back to the pool on teardown
+        with db.connection() as conn:
+            assert conn is first
+
+    def test_uncommitted_work_rolled_back_on_release(self, test_db):
+        db = models.get_db()
+        with db.connection() as conn:
+            conn.execute(
+                "INSERT INTO sessions (session_id, email) VALUES ('x', 'a@b.c')"
+            )
+        assert Session.get_email("x") is None
+
+
+class TestSessionCache:
+    def test_validate_hits_cache(self, test_db):
+        sid = Session.create("user@example.com")
+        assert Session.validate(sid) is True
+        hits = models.session_cache.hits
+        with patch("models.get_db") as mock_get_db:
+            assert Session.validate(sid) is True
+        mock_get_db.assert_not_called()
+        assert models.session_cache.hits == hits + 1
+
+    def test_delete_invalidates(self, test_db):
+        sid = Session.create("user@example.com")
+        assert Session.validate(sid) is True
+        Session.delete(sid)
+        assert Session.validate(sid) is False
+
+    def test_delete_old_clears(self, test_db):
+        sid = Session.create("old@example.com")
+        assert Session.validate(sid) is True
+        conn = sqlite3.connect(test_db)
+        conn.execute(
+            "UPDATE sessions SET created_at = ? WHERE session_id = ?",
+            (int(time.time()) - 60 * 24 * 60 * 60, sid),
+        )
+        conn.commit()
+        conn.close()
+        Session.delete_old(days=30)
+        assert Session.validate(sid) is False
+
+    def test_delete_in_other_worker_seen_after_ttl(self, test_db):
+        sid = Session.create("user@example.com")
+        with patch("models.time.monotonic", return_value=100.0):
+            assert Session.validate(sid) is True
+        # Another worker logs out: the row is gone but this cache is untouched
+        conn = sqlite3.connect(test_db)
+        conn.execute("DELETE FROM sessions WHERE session_id = ?", (sid,))
+        conn.commit()
+        conn.close()
+        ttl = models.session_cache.ttl_seconds
+        with patch("models.time.monotonic", return_value=100.0 + ttl - 1):
+            assert Session.validate(sid) is True
+        with patch("models.time.monotonic", return_value=100.0 + ttl):
+            assert Session.validate(sid) is False
+
+    def test_ttl_expiry(self):
+        cache = models.SessionCache(ttl_seconds=10, max_entries=10)
+        with patch("models.time.monotonic", return_value=100.0):
+            cache.add("sid")
+            assert cache.get("sid") is True
+        with patch("models.time.monotonic", return_value=111.0):
+            assert cache.get("sid") is False
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_lru_eviction(self):
+        cache = models.SessionCache(ttl_seconds=60, max_entries=2)
+        cache.add("a")
+        cache.add("b")
+        cache.get("a")
+        cache.add("c")
+        assert cache.get("a") is True
+        assert cache.get("b") is False
+        assert cache.get("c") is True
+        assert cache.stats()["evictions"] == 1
+
+    def test_zero_ttl_disables(self):
+        cache = models.SessionCache(ttl_seconds=0, max_entries=10)
+        cache.add("sid")
+        assert cache.get("sid") is False
+
+
+class TestLastAccessedBuffer:
+    def _backdate(self, test_db, sid):
+        conn = sqlite3.connect(test_db)
+        conn.execute(
+            "UPDATE sessions SET last_accessed = last_accessed - 3600 WHERE session_id = ?",
+            (sid,),
+        )
+        conn.commit()
+        conn.close()
+
+    def _last_accessed(self, test_db, sid):
+        conn = sqlite3.connect(test_db)
+        row = conn.execute(
+            "SELECT last_accessed FROM sessions WHERE session_id = ?", (sid,)
+        ).fetchone()
+        conn.close()
+        return row[0]
+
+    def test_touch_is_deferred_until_flush(self, test_db):
+        buffer = models.LastAccessedBuffer(flush_seconds=3600, max_pending=100, granularity_seconds=0)
+        sid = Session.create("user@example.com")
+        self._backdate(test_db, sid)
+        before = self._last_accessed(test_db, sid)
+
+        assert buffer.touch(sid) is True
+        assert self._last_accessed(test_db, sid) == before
+
+        assert buffer.flush() == 1
+        assert self._last_accessed(test_db, sid) != before
+
+    def test_batches_many_sessions(self, test_db):
+        buffer = models.LastAccessedBuffer(flush_seconds=3600, max_pending=100, granularity_seconds=0)
+        sids = [Session.create(f"user{i}@example.com") for i in range(5)]
+        for sid in sids:
+            buffer.touch(sid)
+            buffer.touch(sid)
+        assert buffer.stats()["pending"] == 5
+        assert buffer.flush() == 5
+        assert buffer.stats()["pending"] == 0
+
+    def test_granularity_skips_recent(self, test_db):
+        buffer = models.LastAccessedBuffer(flush_seconds=3600, max_pending=100, granularity_seconds=60)
+        sid = Session.create("user@example.com")
+        assert buffer.touch(sid) is True
+        assert buffer.touch(sid) is False
+        buffer.flush()
+        # Still within granularity after the flush
+        assert buffer.touch(sid) is False
+        assert buffer.stats()["skipped"] == 2
+
+    def test_full_buffer_wakes_flusher(self, test_db):
+        buffer = models.LastAccessedBuffer(flush_seconds=3600, max_pending=2, granularity_seconds=0)
+        sids = [Session.create(f"user{i}@example.com") for i in range(2)]
+        with patch.object(buffer, "_wakeup") as wakeup, patch.object(buffer, "_ensure_started"):
+            buffer.touch(sids[0])
+            wakeup.set.assert_not_called()
+            buffer.touch(sids[1])
+            wakeup.set.assert_called_once()
+
+    def test_touch_writes_through_when_disabled(self, test_db, monkeypatch):
+        monkeypatch.setattr("config.Config.SESSION_WRITE_BEHIND", False)
+        sid = Session.create("user@example.com")
+        self._backdate(test_db, sid)
+        before = self._last_accessed(test_db, sid)
+        assert Session.touch(sid) is True
+        assert self._last_accessed(test_db, sid) != before
+
+
+class TestSessionRevocation:
+    def test_delete_records_revocation(self, test_db):
+        sid = Session.create("user@example.com")
+        Session.delete(sid)
+        conn = sqlite3.connect(test_db)
+        row = conn.execute(
+            "SELECT 1 FROM revoked_sessions WHERE session_id = ?", (sid,)
+        ).fetchone()
+        conn.close()
+        assert row is not None
+        assert models.revocations.is_revoked(sid) is True
+
+    def test_delete_old_revokes_deleted_sessions(self, test_db):
+        sid = Session.create("old@example.com")
+        conn = sqlite3.connect(test_db)
+        conn.execute(
+            "UPDATE sessions SET created_at = ? WHERE session_id = ?",
+            (int(time.time()) - 60 * 24 * 60 * 60, sid),
+        )
+        conn.commit()
+        conn.close()
+        Session.delete_old(days=30)
+        models.revocations.refresh()
+        assert models.revocations.is_revoked(sid) is True
+
+
+class TestMigrations:
+    def _legacy_db(self, path):
+        """Create a database with the original text-timestamp schema."""
+        conn = sqlite3.connect(path)
+        for statement in models.MIGRATIONS[0]:
+            conn.execute(statement)
+        conn.execute(
+            "INSERT INTO magic_links (email, token, expires_at) VALUES (?, ?, ?)",
+            ("user@example.com", "legacy-token", "2099-01-01 00:00:00.000000"),
+        )
+        conn.execute(
+            "INSERT INTO sessions (session_id, email, created_at, last_accessed) "
+            "VALUES ('legacy-sid', 'user@example.com', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+        )
+        conn.commit()
+        conn.close()
+
+    def test_new_database_at_current_version(self, test_db):
+        conn = sqlite3.connect(test_db)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        conn.close()
+        assert version == models.SCHEMA_VERSION
+
+    def test_migrates_legacy_database_in_place(self, tmp_path, monkeypatch):
+        db_path = str(tmp_path / "legacy.db")
+        self._legacy_db(db_path)
+        monkeypatch.setattr("config.Config.DATABASE_PATH", db_path)
+
+        Database(db_path)
+
+        conn = sqlite3.connect(db_path)
+        expires_at = conn.execute(
+            "SELECT expires_at FROM magic_links WHERE token = 'legacy-token'"
+        ).fetchone()[0]
+        last_accessed = conn.execute(
+            "SELECT last_accessed FROM sessions WHERE session_id = 'legacy-sid'"
+        ).fetchone()[0]
+        conn.close()
+
+        assert expires_at == 4070908800
+        assert abs(last_accessed - time.time()) < 60
+        assert MagicLink.verify("legacy-token") == (True, "user@example.com")
+        assert Session.validate("legacy-sid") is True
+        models.close_all()
+
+    def test_migration_is_idempotent(self, test_db):
+        conn = sqlite3.connect(test_db)
+        assert models.migrate(conn) == models.SCHEMA_VERSION
+        conn.close()
+
+    def test_indexes_created(self, test_db):
+        conn = sqlite3.connect(test_db)
+        indexes = {
+            row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            )
+        }
+        conn.close()
+        assert {
+            "idx_magic_links_expires_at",
+            "idx_magic_links_email",
+            "idx_sessions_created_at",
+            "idx_sessions_last_accessed",
+            "idx_sessions_email",
+        } <= indexes
+
+    def test_cleanup_queries_use_indexes(self, test_db):
+        conn = sqlite3.connect(test_db)
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN DELETE FROM sessions WHERE created_at < 0"
+        ).fetchall()
+        conn.close()
+        assert any("idx_sessions_created_at" in row[-1] for row in plan)
+
+
+class TestPragmaProfile:
+    def test_default_profile_applied(self, test_db):
+        with models.get_db().connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+            assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+
+    def test_custom_profile(self, tmp_path):
+        db = Database(
+            str(tmp_path / "custom.db"),
+            pragmas={"journal_mode": "DELETE", "busy_timeout": 250},
+        )
+        with db.connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+            assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 250
+        db.close_all()
+
+
+class TestMagicLinkRedeem:
+    def test_redeem_creates_session(self, test_db):
+        token = MagicLink.create("user@example.com")
+        email, sid = MagicLink.redeem(token)
+        assert email == "user@example.com"
+        assert Session.get_email(sid) == "user@example.com"
+        assert MagicLink.verify(token) == (False, None)
+
+    def test_redeem_twice(self, test_db):
+        token = MagicLink.create("user@example.com")
+        MagicLink.redeem(token)
+        assert MagicLink.redeem(token) == (None, None)
+
+    def test_redeem_expired(self, test_db):
+        token = MagicLink.create("user@example.com")
+        conn = sqlite3.connect(test_db)
+        conn.execute(
+            "UPDATE magic_links SET expires_at = ? WHERE token = ?",
+            (int(time.time()) - 60, token),
+        )
+        conn.commit()
+        conn.close()
+        assert MagicLink.redeem(token) == (None, None)
+
+    def test_redeem_unknown(self, test_db):
+        assert MagicLink.redeem("no-such-token") == (None, None)
+
+    def test_concurrent_redeem_single_winner(self, test_db):
+        token = MagicLink.create("user@example.com")
+        barrier = threading.Barrier(8)
+        results = []
+
+        def click():
+            barrier.wait()
+            results.append(MagicLink.redeem(token))
+
+        threads = [threading.Thread(target=click) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        winners = [r for r in results if r[1] is not None]
+        assert len(winners) == 1
+
+        conn = sqlite3.connect(test_db)
+        count = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        conn.close()
+        assert count == 1
+
+
+class TestMagicLinkCreateMany:
+    def test_creates_all_tokens(self, test_db):
+        tokens = MagicLink.create_many(["a@example.com", "b@example.com"])
+        assert set(tokens) == {"a@example.com", "b@example.com"}
+        for email, token in tokens.items():
+            assert MagicLink.verify(token) == (True, email)
+
+
+class TestMagicLinkFindRecent:
+    def test_finds_outstanding(self, test_db):
+        token = MagicLink.create("user@example.com")
+        assert MagicLink.find_recent("user@example.com", 300) == token
+
+    def test_ignores_used(self, test_db):
+        token = MagicLink.create("user@example.com")
+        MagicLink.mark_used(token)
+        assert MagicLink.find_recent("user@example.com", 300) is None
+
+    def test_ignores_outside_cooldown(self, test_db):
+        token = MagicLink.create("user@example.com")
+        conn = sqlite3.connect(test_db)
+        conn.execute(
+            "UPDATE magic_links SET created_at = created_at - 600 WHERE token = ?", (token,)
+        )
+        conn.commit()
+        conn.close()
+        assert MagicLink.find_recent("user@example.com", 300) is None
+
+    def test_other_email(self, test_db):
+        MagicLink.create("user@example.com")
+        assert MagicLink.find_recent("other@example.com", 300) is None
+
+    def test_lookup_uses_email_index(self, test_db):
+        conn = sqlite3.connect(test_db)
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT token FROM magic_links "
+            "WHERE email = ? AND used = 0 AND expires_at >= 0 AND created_at >= 0",
+            ("user@example.com",),
+        ).fetchall()
+        conn.close()
+        assert any("idx_magic_links_email" in row[-1] for row in plan)
@@ -0,0 +1,135 @@
+import os
+import runpy
+import time
+from unittest.mock import patch
+
+from models import EmailOutbox
+from outbox import OutboxWorker
+
+
+def _make_due(test_db, message_id):
+    import sqlite3
+
+    conn = sqlite3.connect(test_db)
+    conn.execute(
+        "UPDATE email_outbox SET next_attempt_at = 0 WHERE id = ?", (message_id,)
+    )
+    conn.commit()
+    conn.close()
+
+
+class TestEmailOutbox:
+    def test_enqueue_pending(self, test_db):
+        message_id = EmailOutbox.enqueue("user@example.com", "https://x/auth/verify/t")
+        message = EmailOutbox.get(message_id)
+        assert message["status"] == "pending"
+        assert message["attempts"] == 0
+
+    def test_claim_leases_message(self, test_db):
+        EmailOutbox.enqueue("user@example.com", "https://x/auth/verify/t")
+        claimed = EmailOutbox.claim(limit=5)
+        assert len(claimed) == 1
+        assert claimed[0]["attempts"] == 1
+        # Leased messages are hidden from other workers
+        assert EmailOutbox.claim(limit=5) == []
+
+    def test_expired_lease_reclaimed(self, test_db):
+        message_id = EmailOutbox.enqueue("user@example.com", "https://x/auth/verify/t")
+        EmailOutbox.claim(limit=1)
+        _make_due(test_db, message_id)
+        assert len(EmailOutbox.claim(limit=1)) == 1
+
+    def test_backoff_grows(self, test_db, monkeypatch):
+        monkeypatch.setattr("config.Config.EMAIL_OUTBOX_BACKOFF_SECONDS", 10)
+        message_id = EmailOutbox.enqueue("user@example.com", "https://x/auth/verify/t")
+
+        delays = []
+        for _ in range(3):
+            EmailOutbox.claim(limit=1)
+            before = int(time.time())
+            EmailOutbox.mark_failed(message_id, "boom")
+            delays.append(EmailOutbox.get(message_id)["next_attempt_at"] - before)
+            _make_due(test_db, message_id)
+
+        assert delays[0] < delays[1] < delays[2]
+
+    def test_dead_letter_after_max_attempts(self, test_db, monkeypatch):
+        monkeypatch.setattr("config.Config.EMAIL_OUTBOX_MAX_ATTEMPTS", 2)
+        message_id = EmailOutbox.enqueue("user@example.com", "https://x/auth/verify/t")
+
+        EmailOutbox.claim(limit=1)
+        assert EmailOutbox.mark_failed(message_id, "boom") == "pending"
+        _make_due(test_db, message_id)
+        EmailOutbox.claim(limit=1)
+        assert EmailOutbox.mark_failed(message_id, "boom") == "dead"
+
+        _make_due(test_db, message_id)
+        assert EmailOutbox.claim(limit=1) == []
+        assert EmailOutbox.get(message_id)["last_error"] == "boom"
+
+
+class TestOutboxWorker:
+    def test_sends_via_mailgun(self, test_db, fake_mailgun):
+        message_id = EmailOutbox.enqueue("user@example.com", "https://x/auth/verify/t")
+        assert OutboxWorker(workers=0).process_due() == 1
+        assert EmailOutbox.get(message_id)["status"] == "sent"
+        assert len(fake_mailgun.messages) == 1
+
+    def test_retries_after_failure(self, test_db, fake_mailgun):
+        fake_mailgun.fail_next = 1
+        worker = OutboxWorker(workers=0)
+        message_id = EmailOutbox.enqueue("user@example.com", "https://x/auth/verify/t")
+
+        worker.process_due()
+        assert EmailOutbox.get(message_id)["status"] == "pending"
+        assert fake_mailgun.messages == []
+
+        _make_due(test_db, message_id)
+        worker.process_due()
+        assert EmailOutbox.get(message_id)["status"] == "sent"
+        assert len(fake_mailgun.messages) == 1
+
+    def test_rejected_message_dead_lettered_at_once(self, test_db, fake_mailgun):
+        fake_mailgun.fail_next = 1
+        fake_mailgun.fail_status = 400
+        message_id = EmailOutbox.enqueue("bad@example.com", "https://x/auth/verify/t")
+
+        OutboxWorker(workers=0).process_due()
+        message = EmailOutbox.get(message_id)
+        assert message["status"] == "dead"
+        assert "400" in message["last_error"]
+
+    def test_bad_credentials_retried(self, test_db, fake_mailgun):
+        fake_mailgun.fail_next = 1
+        fake_mailgun.fail_status = 401
+        message_id = EmailOutbox.enqueue("user@example.com", "https://x/auth/verify/t")
+
+        worker = OutboxWorker(workers=0)
+        worker.process_due()
+        assert EmailOutbox.get(message_id)["status"] == "pending"
+
+        _make_due(test_db, message_id)
+        worker.process_due()
+        assert EmailOutbox.get(message_id)["status"] == "sent"
+
+    def test_background_threads_drain_queue(self, test_db, fake_mailgun):
+        worker = OutboxWorker(workers=2, poll_seconds=0.05)
+        for i in range(5):
+            EmailOutbox.enqueue(f"user{i}@example.com", "https://x/auth/verify/t")
+        worker.notify()
+        try:
+            deadline = time.time() + 5
+            while EmailOutbox.counts().get("sent", 0) < 5 and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            worker.stop()
+        assert EmailOutbox.counts() == {"sent": 5}
+        assert len(fake_mailgun.messages) == 5
+
+    def test_gunicorn_worker_starts_sender_on_fork(self, monkeypatch):
+        monkeypatch.setattr("config.Config.EMAIL_OUTBOX_ENABLED", True)
+        monkeypatch.setattr("config.Config.DISCOVERY_WATCH", False)
+        hooks = runpy.run_path(os.path.join(os.path.dirname(__file__), "..", "gunicorn.conf.py"))
+        with patch("outbox.worker.start") as start:
+            hooks["post_fork"](None, None)
+        start.assert_called_once()
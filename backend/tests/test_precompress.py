@@ -0,0 +1,51 @@
+import gzip
+import os
+
+import precompress
+
+
+def write_site(root):
+    (root / "index.html").write_text("<p>hello world</p>" * 100)
+    (root / "tiny.css").write_text("a{}")
+    (root / "photo.png").write_bytes(b"\x89PNG" + os.urandom(2000))
+    (root / "static").mkdir()
+    (root / "static" / "contentIndex.json").write_text('{"k": "v"}' * 200)
+    return root
+
+
+class TestCompressFile:
+    def test_writes_gzip_with_source_mtime(self, tmp_path):
+        path = write_site(tmp_path) / "index.html"
+
+        assert precompress.compress_file(str(path))["gzip"] == "written"
+
+        variant = tmp_path / "index.html.gz"
+        assert gzip.decompress(variant.read_bytes()) == path.read_bytes()
+        assert os.stat(variant).st_mtime_ns == os.stat(path).st_mtime_ns
+
+    def test_up_to_date_variant_not_rewritten(self, tmp_path):
+        path = write_site(tmp_path) / "index.html"
+        precompress.compress_file(str(path))
+        assert precompress.compress_file(str(path))["gzip"] == "current"
+
+    def test_incompressible_content_skipped(self, tmp_path):
+        path = tmp_path / "random.js"
+        path.write_bytes(os.urandom(4000))
+        assert precompress.compress_file(str(path))["gzip"] == "skipped"
+        assert not (tmp_path / "random.js.gz").exists()
+
+
+class TestPrecompress:
+    def test_candidates(self, tmp_path):
+        write_site(tmp_path)
+        found = {os.path.relpath(p, tmp_path) for p in precompress.find_candidates(str(tmp_path))}
+        assert found == {"index.html", os.path.join("static", "contentIndex.json")}
+
+    def test_parallel_run(self, tmp_path):
+        write_site(tmp_path)
+        counts = precompress.precompress(str(tmp_path), workers=2)
+        assert counts["written"] == len(precompress.encoders()) * 2
+        assert (tmp_path / "static" / "contentIndex.json.gz").exists()
+
+        again = precompress.precompress(str(tmp_path), workers=2)
+        assert again["written"] == 0
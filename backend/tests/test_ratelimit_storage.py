@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import runpy
+
+import pytest
+from limits import RateLimitItemPerMinute
+from limits.errors import ConfigurationError
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+from unittest.mock import patch
+
+from ratelimit_storage import SQLiteStorage
+
+
+def _hit_many(uri, count):
+    limiter = FixedWindowRateLimiter(storage_from_string(uri))
+    item = RateLimitItemPerMinute(1000)
+    for _ in range(count):
+        limiter.hit(item, "shared")
+
+
+class TestSQLiteStorage:
+    def test_scheme_registered(self, tmp_path):
+        storage = storage_from_string(f"sqlite:///{tmp_path}/rl.db")
+        assert isinstance(storage, SQLiteStorage)
+        assert storage.check() is True
+
+    def test_three_slashes_relative_four_absolute(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        assert storage_from_string("sqlite:///rl.db").db_path == "rl.db"
+        assert storage_from_string(f"sqlite:///{tmp_path}/rl.db").db_path == f"{tmp_path}/rl.db"
+        assert (tmp_path / "rl.db").exists()
+
+    @pytest.mark.parametrize("uri", ["sqlite://", "sqlite:///", "sqlite:///:memory:"])
+    def test_in_memory_rejected(self, uri):
+        with pytest.raises(ConfigurationError):
+            storage_from_string(uri)
+
+    def test_fixed_window_limit(self, tmp_path):
+        limiter = FixedWindowRateLimiter(storage_from_string(f"sqlite:///{tmp_path}/rl.db"))
+        item = RateLimitItemPerMinute(3)
+        assert [limiter.hit(item, "k") for _ in range(5)] == [True, True, True, False, False]
+        assert limiter.get_window_stats(item, "k").remaining == 0
+
+    def test_window_expires(self, tmp_path):
+        storage = storage_from_string(f"sqlite:///{tmp_path}/rl.db")
+        with patch("ratelimit_storage.time.time", return_value=1000.0):
+            assert storage.incr("k", 60) == 1
+            assert storage.incr("k", 60) == 2
+        with patch("ratelimit_storage.time.time", return_value=1061.0):
+            assert storage.get("k") == 0
+            assert storage.incr("k", 60) == 1
+
+    def test_clear_and_reset(self, tmp_path):
+        storage = storage_from_string(f"sqlite:///{tmp_path}/rl.db")
+        storage.incr("a", 60)
+        storage.incr("b", 60)
+        storage.clear("a")
+        assert storage.get("a") == 0
+        assert storage.reset() == 1
+
+    def test_shared_between_processes(self, tmp_path):
+        uri = f"sqlite:///{tmp_path}/rl.db"
+        ctx = multiprocessing.get_context("spawn")
+        procs = [ctx.Process(target=_hit_many, args=(uri, 50)) for _ in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        assert storage_from_string(uri).get(
+            RateLimitItemPerMinute(1000).key_for("shared")
+        ) == 200
+
+
+class TestGunicornDefault:
+    CONF = os.path.join(os.path.dirname(__file__), "..", "gunicorn.conf.py")
+
+    def _load(self, monkeypatch, tmp_path, workers):
+        monkeypatch.delenv("RATELIMIT_STORAGE_URI", raising=False)
+        monkeypatch.setattr("config.Config.WEB_WORKERS", workers)
+        monkeypatch.setattr("config.Config.DATABASE_PATH", str(tmp_path / "data" / "blog.db"))
+        monkeypatch.setattr("config.Config.RATELIMIT_STORAGE_URI", "memory://")
+        runpy.run_path(self.CONF)
+        from config import Config
+        return Config.RATELIMIT_STORAGE_URI
+
+    def test_several_workers_share_sqlite_store(self, monkeypatch, tmp_path):
+        uri = self._load(monkeypatch, tmp_path, 3)
+        assert uri == f"sqlite:///{tmp_path}/data/ratelimit.db"
+        storage_from_string(uri).incr("k", 60)
+
+    def test_single_worker_keeps_memory(self, monkeypatch, tmp_path):
+        assert self._load(monkeypatch, tmp_path, 1) == "memory://"
+
+    def test_explicit_uri_wins(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("RATELIMIT_STORAGE_URI", "memory://")
+        monkeypatch.setattr("config.Config.WEB_WORKERS", 3)
+        monkeypatch.setattr("config.Config.RATELIMIT_STORAGE_URI", "memory://")
+        runpy.run_path(self.CONF)
+        from config import Config
+        assert Config.RATELIMIT_STORAGE_URI == "memory://"
@@ -0,0 +1,230 @@
+import os
+import time
+from unittest.mock import patch
+
+from static_files import BUILD_MARKER, StaticFileCache, StaticManifest
+
+
+def make_site(root):
+    (root / "index.html").write_text("home")
+    (root / "style.css").write_text("body {}")
+    (root / "notes").mkdir()
+    (root / "notes" / "index.html").write_text("notes folder")
+    (root / "notes" / "first.html").write_text("first note")
+    (root / "notes.html").write_text("notes page")
+    (root / "tags").mkdir()
+    (root / "tags" / "index.html").write_text("tags folder")
+    return root
+
+
+class TestLookup:
+    def test_exact_files(self, tmp_path):
+        m = StaticManifest(str(make_site(tmp_path)))
+        entry = m.lookup("style.css")
+        assert entry.relpath == "style.css"
+        assert entry.size == len("body {}")
+        assert entry.content_type == "text/css"
+
+    def test_extensionless_page(self, tmp_path):
+        m = StaticManifest(str(make_site(tmp_path)))
+        assert m.lookup("notes/first").relpath == "notes/first.html"
+
+    def test_folder_index(self, tmp_path):
+        m = StaticManifest(str(make_site(tmp_path)))
+        assert m.lookup("tags").relpath == "tags/index.html"
+        assert m.lookup("tags/").relpath == "tags/index.html"
+
+    def test_page_preferred_over_folder_without_slash(self, tmp_path):
+        m = StaticManifest(str(make_site(tmp_path)))
+        assert m.lookup("notes").relpath == "notes.html"
+        assert m.lookup("notes/").relpath == "notes/index.html"
+
+    def test_unknown_and_traversal(self, tmp_path):
+        m = StaticManifest(str(make_site(tmp_path)))
+        assert m.lookup("missing.html") is None
+        assert m.lookup("../secret") is None
+
+    def test_symlink_outside_skipped(self, tmp_path):
+        secret = tmp_path / "secret.txt"
+        secret.write_text("secret")
+        public = tmp_path / "public"
+        public.mkdir()
+        (public / "index.html").write_text("home")
+        os.symlink(secret, public / "leak.txt")
+
+        m = StaticManifest(str(public))
+        assert m.lookup("leak.txt") is None
+
+    def test_lookup_makes_no_syscalls(self, tmp_path):
+        m = StaticManifest(str(make_site(tmp_path)), refresh_seconds=60)
+        m.build()
+        with patch("static_files.os.stat", side_effect=AssertionError("stat")):
+            assert m.lookup("notes/first") is not None
+
+
+class TestETag:
+    def test_hashed_once_per_version(self, tmp_path):
+        m = StaticManifest(str(make_site(tmp_path)))
+        entry = m.lookup("style.css")
+        with open(entry.path, "rb") as f:
+            etag = m.etag(entry, f)
+            with patch("static_files.hashlib.blake2b", side_effect=AssertionError("hashed again")):
+                assert m.etag(entry, f) == etag
+
+        # A new version on disk is hashed even if the manifest entry is stale
+        (tmp_path / "style.css").write_text("body { margin: 0 }")
+        with open(entry.path, "rb") as f:
+            assert m.etag(entry, f) != etag
+
+    def test_body_and_file_hash_agree(self, tmp_path):
+        m = StaticManifest(str(make_site(tmp_path)))
+        entry = m.lookup("style.css")
+        with open(entry.path, "rb") as f:
+            from_body = StaticManifest(str(tmp_path)).etag(entry, f, b"body {}")
+            assert from_body == m.etag(entry, f)
+
+
+class TestRebuild:
+    def test_picks_up_rebuilt_site(self, tmp_path):
+        public = make_site(tmp_path)
+        m = StaticManifest(str(public), refresh_seconds=0)
+        assert m.lookup("new.html") is None
+
+        (public / "new.html").write_text("new page")
+        index = public / "index.html"
+        later = time.time() + 10
+        os.utime(index, (later, later))
+
+        assert m.lookup("new").relpath == "new.html"
+        assert m.builds == 2
+
+    def test_unchanged_site_not_rebuilt(self, tmp_path):
+        m = StaticManifest(str(make_site(tmp_path)), refresh_seconds=0)
+        m.lookup("index.html")
+        m.lookup("index.html")
+        assert m.builds == 1
+
+    def test_refresh_interval_throttles_checks(self, tmp_path):
+        public = make_site(tmp_path)
+        m = StaticManifest(str(public), refresh_seconds=60)
+        m.lookup("index.html")
+        (public / "style.css").write_text("body { color: red; }")
+        touch_later(public / "index.html")
+        assert m.lookup("style.css").size == len("body {}")
+
+        m.invalidate()
+        assert m.lookup("style.css").size == len("body { color: red; }")
+
+    def test_page_added_in_subdirectory(self, tmp_path):
+        public = make_site(tmp_path)
+        m = StaticManifest(str(public), refresh_seconds=60)
+        m.lookup("index.html")
+
+        (public / "notes" / "b.html").write_text("new note")
+        assert m.lookup("notes/b").relpath == "notes/b.html"
+        assert m.builds == 2
+
+    def test_missing_url_does_not_rebuild(self, tmp_path):
+        public = make_site(tmp_path)
+        # A stale variant is never served on its own, but is not new either
+        (public / "style.css.gz").write_bytes(b"stale variant")
+        os.utime(public / "style.css.gz", (0, 0))
+        m = StaticManifest(str(public), refresh_seconds=60)
+        m.build()
+
+        assert m.lookup("nope") is None
+        assert m.lookup("style.css.gz") is None
+        assert m.lookup("../etc/passwd") is None
+        assert m.builds == 1
+
+
+def touch_later(path, seconds=10):
+    later = time.time() + seconds
+    os.utime(path, (later, later))
+
+
+class TestBuildMarker:
+    def test_marker_change_rebuilds_edited_files(self, tmp_path):
+        public = make_site(tmp_path)
+        (public / BUILD_MARKER).write_text("1")
+        m = StaticManifest(str(public), refresh_seconds=0)
+        assert m.lookup("notes/first").size == len("first note")
+        assert m.lookup(BUILD_MARKER) is None
+
+        (public / "notes" / "first.html").write_text("first note, edited")
+        (public / BUILD_MARKER).write_text("2")
+        touch_later(public / BUILD_MARKER)
+        assert m.lookup("notes/first").size == len("first note, edited")
+
+    def test_build_in_progress_keeps_previous_manifest(self, tmp_path):
+        public = make_site(tmp_path)
+        (public / BUILD_MARKER).write_text("1")
+        m = StaticManifest(str(public), refresh_seconds=0)
+        m.lookup("index.html")
+
+        # Quartz has started writing the next build
+        (public / BUILD_MARKER).unlink()
+        (public / "index.html").write_text("half built")
+        (public / "notes" / "second.html").write_text("second note")
+        touch_later(public / "index.html")
+        assert m.lookup("notes/second") is None
+        assert m.builds == 1
+
+        (public / BUILD_MARKER).write_text("2")
+        assert m.lookup("notes/second") is not None
+        assert m.builds == 2
+
+
+class TestStaticFileCache:
+    def _entry(self, tmp_path, name, body):
+        path = tmp_path / name
+        path.write_bytes(body)
+        return StaticManifest(str(tmp_path)).lookup(name)
+
+    def test_hit_after_miss(self, tmp_path):
+        cache = StaticFileCache(max_bytes=1000, max_file_bytes=100)
+        entry = self._entry(tmp_path, "a.css", b"body {}")
+
+        assert cache.get(entry).body == b"body {}"
+        with patch("builtins.open", side_effect=AssertionError("read from disk")):
+            assert cache.get(entry).body == b"body {}"
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert ("Content-Type", "text/css") in cache.get(entry).headers
+
+    def test_large_files_bypass(self, tmp_path):
+        cache = StaticFileCache(max_bytes=1000, max_file_bytes=10)
+        entry = self._entry(tmp_path, "big.js", b"x" * 11)
+
+        assert cache.get(entry) is None
+        assert cache.bypasses == 1
+        assert cache.size_bytes == 0
+
+    def test_evicts_least_recently_used_within_budget(self, tmp_path):
+        cache = StaticFileCache(max_bytes=25, max_file_bytes=10)
+        a = self._entry(tmp_path, "a.txt", b"a" * 10)
+        b = self._entry(tmp_path, "b.txt", b"b" * 10)
+        c = self._entry(tmp_path, "c.txt", b"c" * 10)
+
+        cache.get(a)
+        cache.get(b)
+        cache.get(a)
+        cache.get(c)
+
+        assert cache.evictions == 1
+        assert cache.size_bytes == 20
+        stats = cache.stats()
+        assert stats["files"] == 2
+        cache.get(a)
+        assert cache.hits == 2
+
+    def test_changed_mtime_rereads(self, tmp_path):
+        cache = StaticFileCache(max_bytes=1000, max_file_bytes=100)
+        entry = self._entry(tmp_path, "a.css", b"old")
+        cache.get(entry)
+
+        (tmp_path / "a.css").write_bytes(b"new!")
+        updated = entry._replace(mtime=entry.mtime + 1, size=4)
+
+        assert cache.get(updated).body == b"new!"
+        assert cache.size_bytes == 4
+        assert cache.misses == 2
@@ -18,8 +18,24 @@ else
     git clone "$CONTENT_REPO" content
 fi
 
+# Build into a staging directory and swap it in with renames, so the backend
+# never serves from a half-written public/
+rm -rf public.next public.old
+
 echo "Building Quartz static site..."
-npx quartz build
+npx quartz build --output public.next
+
+echo "Precompressing static site..."
+python3 backend/precompress.py public.next
+
+# Tells the backend the new build is complete (it rescans when this changes)
+date +%s > public.next/.build-complete
+
+if [ -d public ]; then
+    mv public public.old
+fi
+mv public.next public
+rm -rf public.old
 
 echo "✓ Build complete"
 ls -lh public/index.html